@@ -0,0 +1,75 @@
+"""
+Startup time and memory of the service with different sets of enabled agents.
+
+Each measurement runs in a fresh interpreter, which imports the service (as uvicorn does on
+startup), then loads the graphs of the enabled agents (as their first requests do) and reports
+the time of both steps and the peak resident memory. "all agents" is what importing the service
+cost before the registry was lazy. Run from the repository root:
+
+    python benchmarks/agent_startup.py --repeat 3
+    python benchmarks/agent_startup.py --agents '["chatbot"]' '["research-assistant"]'
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+CHILD = """
+import json, resource, time
+start = time.perf_counter()
+import service
+imported = time.perf_counter()
+from agents.agents import agents
+for agent in agents.values():
+    agent.load()
+loaded = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "load": loaded - imported,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def measure(enabled_agents: str | None) -> dict[str, float]:
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    env.pop("ENABLED_AGENTS", None)
+    if enabled_agents is not None:
+        env["ENABLED_AGENTS"] = enabled_agents
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--agents",
+        nargs="*",
+        default=['["resolutions-agent"]', '["chatbot"]'],
+        help="ENABLED_AGENTS values to measure, besides all agents",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setup, medians shown")
+    args = parser.parse_args()
+
+    print(f"{'ENABLED_AGENTS':<32} {'import':>8} {'load':>8} {'total':>8} {'peak RSS':>10}")
+    for enabled_agents in [None, *args.agents]:
+        runs = [measure(enabled_agents) for _ in range(args.repeat)]
+        imported = statistics.median(run["import"] for run in runs)
+        loaded = statistics.median(run["load"] for run in runs)
+        rss = statistics.median(run["rss_mb"] for run in runs)
+        print(
+            f"{enabled_agents or 'all agents':<32} {imported:7.2f}s {loaded:7.2f}s "
+            f"{imported + loaded:7.2f}s {rss:8.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test of the PostgreSQL checkpointer with many conversation threads at once.
+
+Each simulated thread writes a checkpoint and reads it back, like an agent turn does, for a
+number of rounds. The same load runs against:
+
+- a single connection (AsyncPostgresSaver.from_conn_string, the previous setup),
+- the upstream saver on the connection pool, which still serializes queries on its lock,
+- PooledPostgresSaver on the connection pool, which runs queries concurrently.
+
+Uses the POSTGRES_* settings and writes to the checkpoint tables of that database, with thread
+IDs prefixed by "load-test-". Run from the repository root:
+
+    python benchmarks/postgres_checkpointer_load.py --threads 50 --rounds 20 --pool-size 10
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver  # noqa: E402
+
+from core.settings import settings  # noqa: E402
+from memory.postgres import (  # noqa: E402
+    PooledPostgresSaver,
+    create_postgres_pool,
+    get_postgres_connection_string,
+    validate_postgres_config,
+)
+
+
+@asynccontextmanager
+async def single_connection() -> AsyncIterator[BaseCheckpointSaver]:
+    async with AsyncPostgresSaver.from_conn_string(get_postgres_connection_string()) as saver:
+        yield saver
+
+
+def pooled(saver_class: type[AsyncPostgresSaver]) -> Callable:
+    @asynccontextmanager
+    async def saver() -> AsyncIterator[BaseCheckpointSaver]:
+        pool = create_postgres_pool()
+        await pool.open(wait=True)
+        try:
+            yield saver_class(pool)
+        finally:
+            print(f"    pool stats: {pool.stats()}")
+            await pool.close()
+
+    return saver
+
+
+async def conversation(saver: BaseCheckpointSaver, rounds: int) -> None:
+    config = {"configurable": {"thread_id": f"load-test-{uuid4()}", "checkpoint_ns": ""}}
+    for step in range(rounds):
+        metadata = {"source": "loop", "step": step, "writes": {}, "parents": {}}
+        config = await saver.aput(config, empty_checkpoint(), metadata, {})
+        await saver.aget_tuple(config)
+
+
+async def run(
+    name: str, saver: Callable[[], AbstractAsyncContextManager], threads: int, rounds: int
+) -> None:
+    print(f"{name}:")
+    async with saver() as checkpointer:
+        await checkpointer.setup()
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(checkpointer, rounds) for _ in range(threads)))
+        elapsed = time.perf_counter() - start
+    queries = 2 * threads * rounds
+    print(f"    {elapsed:.2f}s, {queries / elapsed:,.0f} checkpoint reads and writes/s")
+
+
+async def amain(args: argparse.Namespace) -> None:
+    validate_postgres_config()
+    settings.POSTGRES_POOL_SIZE = args.pool_size
+    settings.POSTGRES_MIN_SIZE = args.pool_size
+    print(f"{args.threads} threads x {args.rounds} rounds, pool size {args.pool_size}")
+    await run("single connection", single_connection, args.threads, args.rounds)
+    await run("pool, AsyncPostgresSaver", pooled(AsyncPostgresSaver), args.threads, args.rounds)
+    await run("pool, PooledPostgresSaver", pooled(PooledPostgresSaver), args.threads, args.rounds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--rounds", type=int, default=20, help="Turns per conversation")
+    parser.add_argument(
+        "--pool-size", type=int, default=settings.POSTGRES_POOL_SIZE, help="Pool connections"
+    )
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
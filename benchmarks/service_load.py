@@ -0,0 +1,220 @@
+"""
+Offline load benchmark of the service: latency, throughput and memory of /invoke, /stream, /history.
+
+Boots `service.app` in-process, lifespan included, behind an httpx ASGI transport. The agents
+use the fake model of `core.llm.get_model`, checkpoints go to a SQLite database in a temporary
+directory, and an in-memory vector store with deterministic fake embeddings replaces PGVector.
+No provider, network or database server is involved.
+
+The fake model simulates a provider (core.fake_llm): it streams its answers and calls the
+retrieval tool of resolutions-agent, without latency by default, so the numbers are the
+service's own overhead: routing, validation, the graph, checkpointing, streaming,
+serialization and middleware. Set FAKE_MODEL_FIRST_TOKEN_LATENCY and FAKE_MODEL_TOKEN_DELAY
+to measure streaming under realistic token rates, and FAKE_MODEL_ERROR_RATE for failures.
+
+Each of --concurrency workers holds a conversation of its own and sends requests one after
+the other until --requests requests of the scenario were sent. The scenarios run in order, so
+/history reads the conversations written by /invoke and /stream. Settings not forced to stay
+offline (SQLITE_TUNED, LOG_LEVEL, ...) are read from the environment as usual, so runs can
+compare them. Run from the repository root:
+
+    python benchmarks/service_load.py --concurrency 20 --requests 500 --json before.json
+    python benchmarks/service_load.py --concurrency 20 --requests 500 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+DATA_DIR = tempfile.TemporaryDirectory(prefix="service-load-")
+# Forced, so that the benchmark never reaches a provider or database server
+os.environ.update(
+    {
+        "USE_FAKE_MODEL": "true",
+        "DEFAULT_MODEL": "fake",
+        "DATABASE_TYPE": "sqlite",
+        "SQLITE_DB_PATH": str(Path(DATA_DIR.name) / "checkpoints.db"),
+        "RESOLUTIONS_INGEST_ON_STARTUP": "false",
+        "LANGCHAIN_TRACING_V2": "false",
+        "AUTH_SECRET": "",
+    }
+)
+# One access line per request would mostly measure the terminal
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+for name, value in {
+    "FAKE_MODEL_SIMULATED": "true",
+    "FAKE_MODEL_FIRST_TOKEN_LATENCY": "0",
+    "FAKE_MODEL_TOKEN_DELAY": "0",
+    "FAKE_MODEL_RESPONSE_TOKENS": "50",
+    "FAKE_MODEL_TOOL_CALL_RATE": "1",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.vectorstores import InMemoryVectorStore  # noqa: E402
+
+from service import app  # noqa: E402
+
+SCENARIOS = ("invoke", "stream", "history")
+
+
+def rss_mb() -> float:
+    """Current resident memory, or the peak where the current one can't be read."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def fake_vector_store(documents: int) -> InMemoryVectorStore:
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=768))
+    store.add_documents(
+        [
+            Document(
+                page_content=f"Resolução nº {i}: " + "disposições sobre telecomunicações " * 20,
+                metadata={"source": f"resolucao-{i}"},
+            )
+            for i in range(documents)
+        ]
+    )
+    return store
+
+
+def request(scenario: str, agent: str, thread_id: str) -> tuple[str, dict[str, Any]]:
+    message = {"message": "Quais são as regras de numeração?", "model": "fake"}
+    if scenario == "invoke":
+        return f"/{agent}/invoke", {**message, "thread_id": thread_id}
+    if scenario == "stream":
+        return f"/{agent}/stream", {**message, "thread_id": thread_id, "stream_tokens": True}
+    return f"/{agent}/history", {"thread_id": thread_id, "limit": 20}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: str, args: argparse.Namespace
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = args.requests
+
+    async def worker(index: int) -> None:
+        nonlocal remaining, errors
+        thread_id = f"load-{index}"
+        while remaining > 0:
+            remaining -= 1
+            path, body = request(scenario, args.agent, thread_id)
+            start = time.perf_counter()
+            # The whole body is read, so streamed responses are timed until [DONE]
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+            # A stream that fails after it started is cut short, without [DONE]
+            if response.status_code != 200 or (
+                scenario == "stream" and not response.text.rstrip().endswith("[DONE]")
+            ):
+                errors += 1
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+        "rss_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - rss_before,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    results: dict[str, dict[str, Any]] = {}
+    database_manager = SimpleNamespace(
+        get_vector_store=lambda collection: vector_store,
+    )
+    vector_store = fake_vector_store(args.documents)
+    # Agents import get_database_manager when they are first used, so this replaces PGVector
+    with patch("db.agent_model.get_database_manager", return_value=database_manager):
+        async with app.router.lifespan_context(app):
+            # Errors of the app are answered with a 500 or end the stream, as with a server
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                # Loads the agent and its model before anything is timed
+                path, body = request("invoke", args.agent, "warmup")
+                await client.post(path, json=body)
+                for scenario in args.scenarios:
+                    results[scenario] = await run_scenario(client, scenario, args)
+    return results
+
+
+def print_results(results: dict[str, dict[str, Any]], baseline: dict[str, Any] | None) -> None:
+    columns = ("rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "rss_mb")
+    print(f"{'scenario':<10} {'errors':>6} " + " ".join(f"{c:>10}" for c in columns))
+    for scenario, result in results.items():
+        print(
+            f"{scenario:<10} {result['errors']:>6} "
+            + " ".join(f"{result[c]:>10.1f}" for c in columns)
+        )
+        if baseline and scenario in baseline["results"]:
+            before = baseline["results"][scenario]
+            changes = (
+                f"{(result[c] - before[c]) / before[c]:>+10.1%}" if before[c] else f"{'':>10}"
+                for c in columns
+            )
+            print(f"{'  vs base':<10} {'':>6} " + " ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--agent", default="resolutions-agent", help="Agent to send the requests to"
+    )
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Run in order"
+    )
+    parser.add_argument(
+        "--documents", type=int, default=200, help="Documents in the fake vector store"
+    )
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--compare", type=Path, help="Results of an earlier run to compare to")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        DATA_DIR.cleanup()
+    print(
+        f"{args.agent}: {args.requests} requests per scenario, {args.concurrency} concurrent, "
+        f"Python {platform.python_version()}"
+    )
+    print_results(results, baseline)
+    if args.json:
+        config = {k: str(v) for k, v in vars(args).items() if k not in ("json", "compare")}
+        args.json.write_text(json.dumps({"config": config, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Concurrency benchmark of the SQLite checkpointer, default setup against the tuned mode.
+
+Simulated conversations run at once. Each turn reads the state of its thread, saves a
+checkpoint with pending writes and reads the state again, like an agent turn followed by a
+/history request. The same load runs against:
+
+- AsyncSqliteSaver.from_conn_string, the default setup,
+- TunedSqliteSaver without readers (synchronous=NORMAL and mmap only),
+- TunedSqliteSaver with a pool of read-only connections.
+
+Each setup uses a fresh database in a temporary directory, created in --dir if given (use a
+directory on the disk to measure, /tmp may be in memory). Run from the repository root:
+
+    python benchmarks/sqlite_checkpointer.py --threads 50 --rounds 20 --readers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver  # noqa: E402
+
+from memory.sqlite import TunedSqliteSaver  # noqa: E402
+
+
+async def conversation(
+    saver: BaseCheckpointSaver, rounds: int, size: int, read_latencies: list[float]
+) -> None:
+    thread_id = f"load-test-{uuid4()}"
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(rounds):
+        start = time.perf_counter()
+        await saver.aget_tuple({"configurable": {"thread_id": thread_id}})
+        read_latencies.append(time.perf_counter() - start)
+
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": "x" * size}
+        metadata = {"source": "loop", "step": step, "writes": {}, "parents": {}}
+        config = await saver.aput(config, checkpoint, metadata, {})
+        await saver.aput_writes(config, [("messages", "y" * size)], task_id=str(uuid4()))
+
+        start = time.perf_counter()
+        await saver.aget_tuple({"configurable": {"thread_id": thread_id}})
+        read_latencies.append(time.perf_counter() - start)
+
+
+async def run(
+    name: str,
+    saver: Callable[[str], AbstractAsyncContextManager[BaseCheckpointSaver]],
+    args: argparse.Namespace,
+) -> None:
+    read_latencies: list[float] = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        async with saver(str(Path(directory) / "checkpoints.db")) as checkpointer:
+            await checkpointer.setup()
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    conversation(checkpointer, args.rounds, args.size, read_latencies)
+                    for _ in range(args.threads)
+                )
+            )
+            elapsed = time.perf_counter() - start
+    turns = args.threads * args.rounds
+    p95 = statistics.quantiles(read_latencies, n=20)[-1]
+    print(
+        f"{name:<28} {elapsed:6.2f}s  {turns / elapsed:8,.0f} turns/s  "
+        f"read p50 {statistics.median(read_latencies) * 1000:6.2f}ms  p95 {p95 * 1000:6.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--rounds", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--size", type=int, default=4096, help="Bytes of state per checkpoint")
+    parser.add_argument("--readers", type=int, default=4, help="Read-only connections")
+    parser.add_argument(
+        "--dir", help="Directory of the temporary databases (default: system temp dir)"
+    )
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.rounds} rounds, {args.size} bytes per checkpoint")
+    asyncio.run(run("default", AsyncSqliteSaver.from_conn_string, args))
+    asyncio.run(
+        run("tuned, no readers", lambda path: TunedSqliteSaver.from_conn_string(path, 0), args)
+    )
+    asyncio.run(
+        run(
+            f"tuned, {args.readers} readers",
+            lambda path: TunedSqliteSaver.from_conn_string(path, args.readers),
+            args,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the SSE framing done by the /stream endpoint.
+
+Compares the original framing (`json.dumps` of `model_dump()` inside an f-string per event)
+with `service.sse`, with and without token coalescing. Everything runs in one thread, so the
+numbers are events per second per core.
+
+Run from the repository root:
+
+    python benchmarks/sse_serialization.py --tokens 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from schemas import ChatMessage  # noqa: E402
+from service.sse import TokenCoalescer, encode_message  # noqa: E402
+
+
+def make_stream(tokens: int) -> tuple[list[str], ChatMessage]:
+    words = ["The", " weather", " in", " Tokyo", " is", " sunny", ",", " 23", "°C", "."]
+    stream = [words[i % len(words)] for i in range(tokens)]
+    message = ChatMessage(type="ai", content="".join(stream), run_id="bench")
+    return stream, message
+
+
+def json_dumps_framing(stream: list[str], message: ChatMessage) -> Iterable[str | bytes]:
+    for token in stream:
+        yield f"data: {json.dumps({'type': 'token', 'content': token})}\n\n"
+    yield f"data: {json.dumps({'type': 'message', 'content': message.model_dump()})}\n\n"
+
+
+def sse_framing(
+    stream: list[str], message: ChatMessage, flush_interval: float = 0, max_chars: int = 64
+) -> Iterable[str | bytes]:
+    coalescer = TokenCoalescer(flush_interval=flush_interval, max_chars=max_chars)
+    for token in stream:
+        if frame := coalescer.add(token):
+            yield frame
+    if frame := coalescer.flush():
+        yield frame
+    yield encode_message(message)
+
+
+def measure(
+    framing: Callable[[], Iterable[str | bytes]], events: int, repeat: int
+) -> tuple[float, int, int]:
+    """Return the best events per second over `repeat` runs, plus the frames and bytes sent."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = list(framing())
+        best = max(best, events / (time.perf_counter() - start))
+    sent = sum(len(f.encode() if isinstance(f, str) else f) for f in frames)
+    return best, len(frames), sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=20_000, help="Tokens per stream")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant, best is kept")
+    args = parser.parse_args()
+
+    stream, message = make_stream(args.tokens)
+    # Tokens plus the final message: the events the graph produced, however they are framed
+    events = len(stream) + 1
+    variants = {
+        "json.dumps f-strings": lambda: json_dumps_framing(stream, message),
+        "service.sse": lambda: sse_framing(stream, message),
+        # An interval that never expires, so only max_chars bounds the frames
+        "service.sse, coalesced to 64 chars": lambda: sse_framing(
+            stream, message, flush_interval=3600, max_chars=64
+        ),
+    }
+    print(f"{'variant':<36} {'events/s':>12} {'frames':>8} {'bytes':>10}")
+    for name, framing in variants.items():
+        rate, frames, sent = measure(framing, events, args.repeat)
+        print(f"{name:<36} {rate:>12,.0f} {frames:>8,} {sent:>10,}")
+
+
+if __name__ == "__main__":
+    main()
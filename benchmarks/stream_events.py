@@ -0,0 +1,179 @@
+"""
+Benchmark of the event filtering in the /stream endpoint on a long, tool-heavy run.
+
+Runs a graph whose model calls several tools per turn for many turns through
+`service.service.message_generator`, with and without the astream_events filters, and reports
+the graph events the generator had to process, the SSE frames it sent, the time per run and
+the time the generator itself spent handling the events. No model provider is called; the
+model is a scripted fake.
+
+Run from the repository root:
+
+    python benchmarks/stream_events.py --turns 20 --tools-per-turn 3
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGenerationChunk  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.graph import START, MessagesState, StateGraph  # noqa: E402
+from langgraph.graph.state import CompiledStateGraph  # noqa: E402
+from langgraph.prebuilt import ToolNode, tools_condition  # noqa: E402
+
+from schemas import StreamInput  # noqa: E402
+from service import service  # noqa: E402
+
+
+class ScriptedToolModel(GenericFakeChatModel):
+    """GenericFakeChatModel that also streams the tool calls of its scripted messages."""
+
+    def _chunks(self, messages, stop, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message = self._generate(messages, stop=stop, **kwargs).generations[0].message
+        for token in re.split(r"(\s)", message.content):
+            if token:
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token, id=message.id))
+        if message.tool_calls:
+            tool_call_chunks = [
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="", id=message.id, tool_call_chunks=tool_call_chunks)
+            )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator:
+        for chunk in self._chunks(messages, stop, **kwargs):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator:
+        # Streamed natively, rather than through a thread, so the timing is the event handling
+        for chunk in self._chunks(messages, stop, **kwargs):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look up a fact."""
+    return f"Result for {query}: " + "lorem ipsum " * 20
+
+
+def script(turns: int, tools_per_turn: int) -> list[AIMessage]:
+    messages = [
+        AIMessage(
+            content=f"Let me look up part {turn} of the answer.",
+            tool_calls=[
+                {"name": "lookup", "args": {"query": f"{turn}-{i}"}, "id": f"call-{turn}-{i}"}
+                for i in range(tools_per_turn)
+            ],
+        )
+        for turn in range(turns)
+    ]
+    messages.append(AIMessage(content=" ".join(["The answer is forty-two."] * 40)))
+    return messages
+
+
+def build_graph(turns: int, tools_per_turn: int) -> CompiledStateGraph:
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", "You are a research assistant."), MessagesPlaceholder("messages")]
+    )
+    model = ScriptedToolModel(messages=iter(script(turns, tools_per_turn)))
+    chain = prompt | model
+
+    async def agent(state: MessagesState) -> MessagesState:
+        return {"messages": [await chain.ainvoke(state)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", ToolNode([lookup]))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", tools_condition)
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+async def stream(agent: Any, stream_tokens: bool) -> tuple[int, float]:
+    """Stream a run of `agent` through message_generator, returning frames sent and seconds."""
+    user_input = StreamInput(message="What is the answer?", stream_tokens=stream_tokens)
+    start = time.perf_counter()
+    with patch.object(service, "get_agent", return_value=agent):
+        frames = [frame async for frame in service.message_generator(user_input)]
+    return len(frames), time.perf_counter() - start
+
+
+async def run_once(args: argparse.Namespace, stream_tokens: bool) -> tuple[list, int, float]:
+    """Stream one run, returning the graph events received, SSE frames sent and seconds taken."""
+    graph = build_graph(args.turns, args.tools_per_turn)
+    astream_events = graph.astream_events
+    received = []
+
+    async def recording_astream_events(*a: Any, **kw: Any) -> AsyncIterator[dict]:
+        # Each turn takes two steps, the model and the tools
+        kw["config"]["recursion_limit"] = 2 * args.turns + 10
+        async for event in astream_events(*a, **kw):
+            received.append(event)
+            yield event
+
+    graph.astream_events = recording_astream_events
+    frames, seconds = await stream(graph, stream_tokens)
+    return received, frames, seconds
+
+
+async def replay(events: list, stream_tokens: bool) -> float:
+    """Seconds message_generator spends on `events` alone, without running the graph."""
+
+    async def replay_astream_events(**kwargs: Any) -> AsyncIterator[dict]:
+        for event in events:
+            yield event
+
+    _, seconds = await stream(SimpleNamespace(astream_events=replay_astream_events), stream_tokens)
+    return seconds
+
+
+async def amain(args: argparse.Namespace) -> None:
+    # "run" is the whole run including the graph; "handling" replays the recorded events, so it
+    # is only the work message_generator does per event.
+    print(f"{'variant':<34} {'events':>8} {'frames':>8} {'run ms':>8} {'handling ms':>12}")
+    for stream_tokens in (True, False):
+        for filtered in (False, True):
+            filters = service._stream_event_filters if filtered else lambda _: {}
+            with patch.object(service, "_stream_event_filters", filters):
+                runs = [await run_once(args, stream_tokens) for _ in range(args.repeat)]
+            events, frames, _ = runs[0]
+            run = min(seconds for _, _, seconds in runs)
+            handling = min([await replay(events, stream_tokens) for _ in range(args.repeat)])
+            name = f"{'filtered' if filtered else 'unfiltered'}, stream_tokens={stream_tokens}"
+            print(
+                f"{name:<34} {len(events):>8,} {frames:>8,} {run * 1000:>8.1f}"
+                f" {handling * 1000:>12.2f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20, help="Model turns that call tools")
+    parser.add_argument("--tools-per-turn", type=int, default=3, help="Tool calls per turn")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per variant, best is kept")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,76 @@
 from dataclasses import dataclass
+from importlib import import_module
 
 from langgraph.graph.state import CompiledStateGraph
 
-from agents.bg_task_agent.bg_task_agent import bg_task_agent
-from agents.chatbot import chatbot
-from agents.code_reviewer import code_reviewer
-from agents.command_agent import command_agent
-from agents.research_assistant import research_assistant
-from agents.resolutions_agent import resolutions_graph
+from core import settings
 from schemas import AgentInfo
 
-DEFAULT_AGENT = "resolutions-agent"
-
 
 @dataclass
 class Agent:
     description: str
-    graph: CompiledStateGraph
+    graph: CompiledStateGraph | None = None
+    # "module:attribute" of the compiled graph, imported the first time the agent is used
+    factory: str | None = None
+
+    def load(self) -> CompiledStateGraph:
+        if self.graph is None:
+            module, attribute = self.factory.split(":")
+            self.graph = getattr(import_module(module), attribute)
+        return self.graph
 
 
-agents: dict[str, Agent] = {
-    "command-agent": Agent(description="A command agent.", graph=command_agent),
-    "bg-task-agent": Agent(description="A background task agent.", graph=bg_task_agent),
-    "code-reviewer": Agent(description="A Pytho Code Reviewer.", graph=code_reviewer),
-    "chatbot": Agent(description="A simple chatbot.", graph=chatbot),
-    "resolutions-agent": Agent(description="A chatbot over Anatel's Resoluções.", graph=resolutions_graph),
+# Every agent the service can serve. Agent modules build their tools, models and graphs when
+# they are imported, so only the modules of enabled agents are imported: when the service
+# starts (see service.preload_agents), or on first use.
+AGENTS: dict[str, Agent] = {
+    "command-agent": Agent(
+        description="A command agent.", factory="agents.command_agent:command_agent"
+    ),
+    "bg-task-agent": Agent(
+        description="A background task agent.",
+        factory="agents.bg_task_agent.bg_task_agent:bg_task_agent",
+    ),
+    "code-reviewer": Agent(
+        description="A Pytho Code Reviewer.", factory="agents.code_reviewer:code_reviewer"
+    ),
+    "chatbot": Agent(description="A simple chatbot.", factory="agents.chatbot:chatbot"),
+    "resolutions-agent": Agent(
+        description="A chatbot over Anatel's Resoluções.",
+        factory="agents.resolutions_agent:resolutions_graph",
+    ),
     "research-assistant": Agent(
-        description="A research assistant with web search and calculator.", graph=research_assistant
+        description="A research assistant with web search and calculator.",
+        factory="agents.research_assistant:research_assistant",
     ),
 }
 
 
+def enabled_agents(enabled: list[str] | None) -> dict[str, Agent]:
+    """The agents named in `enabled`, in the order of AGENTS, or all of them if it is None."""
+    if enabled is None:
+        return dict(AGENTS)
+    unknown = set(enabled) - AGENTS.keys()
+    if unknown:
+        raise ValueError(
+            f"Unknown agents in ENABLED_AGENTS: {', '.join(sorted(unknown))}. "
+            f"Available agents: {', '.join(AGENTS)}"
+        )
+    return {agent_id: agent for agent_id, agent in AGENTS.items() if agent_id in enabled}
+
+
+def default_agent(enabled: dict[str, Agent]) -> str:
+    """The agent of requests that don't name one: the first enabled one if this one isn't."""
+    return "resolutions-agent" if "resolutions-agent" in enabled else next(iter(enabled))
+
+
+agents = enabled_agents(settings.ENABLED_AGENTS)
+DEFAULT_AGENT = default_agent(agents)
+
+
 def get_agent(agent_id: str) -> CompiledStateGraph:
-    return agents[agent_id].graph
+    return agents[agent_id].load()
 
 
 def get_all_agent_info() -> list[AgentInfo]:
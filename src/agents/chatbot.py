@@ -1,10 +1,11 @@
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 
+from agents.context import ContextSummary, ContextWindow, get_context_window
 from core import get_model, settings
+from memory.checkpointer import get_checkpointer
 
 
 class AgentState(MessagesState, total=False):
@@ -13,10 +14,14 @@ class AgentState(MessagesState, total=False):
     documentation: https://typing.readthedocs.io/en/latest/spec/typeddict.html#totality
     """
 
+    context_summary: ContextSummary
 
-def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
+
+def wrap_model(
+    model: BaseChatModel, context: ContextWindow
+) -> RunnableSerializable[AgentState, AIMessage]:
     preprocessor = RunnableLambda(
-        lambda state: state["messages"],
+        context.build,
         name="StateModifier",
     )
     return preprocessor | model
@@ -24,11 +29,14 @@ def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessa
 
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
     m = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_runnable = wrap_model(m)
+    context = get_context_window("chatbot")
+    summary = await context.asummarize_state(state, m, config)
+    state = {**state, **summary}
+    model_runnable = wrap_model(m, context)
     response = await model_runnable.ainvoke(state, config)
 
     # We return a list, because this will get added to the existing list
-    return {"messages": [response]}
+    return {"messages": [response], **summary}
 
 
 # Define the graph
@@ -40,5 +48,5 @@ agent.set_entry_point("model")
 agent.add_edge("model", END)
 
 chatbot = agent.compile(
-    checkpointer=MemorySaver(),
+    checkpointer=get_checkpointer(),
 )
@@ -1,4 +1,3 @@
-import logging
 import warnings
 from datetime import datetime
 from typing import Literal
@@ -7,31 +6,23 @@ from langchain_community.tools import DuckDuckGoSearchResults, OpenWeatherMapQue
 from langchain_community.utilities import OpenWeatherMapAPIWrapper
 from langchain_core._api import LangChainBetaWarning
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.managed import RemainingSteps
 from langgraph.prebuilt import ToolNode
 
-from agents.llama_guard import LlamaGuard, LlamaGuardOutput, SafetyAssessment
+from agents.context import ContextSummary, ContextWindow, get_context_window
+from agents.llama_guard import LlamaGuardOutput, SafetyAssessment, get_llama_guard
+from agents.safety import aguarded_model_call
 from agents.tools import calculator
 from core import get_model, settings
+from core.log import get_logger
+from memory.checkpointer import get_checkpointer
 
 warnings.filterwarnings("ignore", category=LangChainBetaWarning)
 
-logger = logging.getLogger(__name__)
-# Set the log level to INFO
-logger.setLevel(logging.INFO)
-# Prevent duplicate logs
-logger.propagate = False  
-# Check if the logger already has handlers to prevent duplicate entries
-if not logger.handlers:
-    # Add a handler (e.g., to console) if one doesn't already exist.
-    handler = logging.StreamHandler()  # Sends logs to the console
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+logger = get_logger(__name__)
 
 class AgentState(MessagesState, total=False):
     """`total=False` is PEP589 specs.
@@ -41,6 +32,7 @@ class AgentState(MessagesState, total=False):
 
     safety: LlamaGuardOutput
     remaining_steps: RemainingSteps
+    context_summary: ContextSummary
 
 
 web_search = DuckDuckGoSearchResults(name="WebSearch")
@@ -71,18 +63,20 @@ instructions = """
         refuse any requests that violate this constraint.
     """
 
-def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
-    logger.info("#> wrap_model")
+def wrap_model(
+    model: BaseChatModel, context: ContextWindow
+) -> RunnableSerializable[AgentState, AIMessage]:
+    logger.debug("#> wrap_model")
     model = model.bind_tools(tools)
     preprocessor = RunnableLambda(
-        lambda state: [SystemMessage(content=instructions)] + state["messages"],
+        lambda state: context.build(state, instructions),
         name="StateModifier",
     )
     return preprocessor | model
 
 
 def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
-    logger.info("#> format_safety_message")
+    logger.debug("#> format_safety_message")
     content = (
         f"This conversation was flagged for unsafe content: {', '.join(safety.unsafe_categories)}"
     )
@@ -90,16 +84,21 @@ def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
 
 
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
-    logger.info("#> acall_model")
+    logger.debug("#> acall_model")
     m = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_runnable = wrap_model(m)
-    response = await model_runnable.ainvoke(state, config)
-
+    context = get_context_window("code-reviewer")
+    summary = await context.asummarize_state(state, m, config, instructions)
+    state = {**state, **summary}
+    model_runnable = wrap_model(m, context)
     # Run llama guard check here to avoid returning the message if it's unsafe
-    llama_guard = LlamaGuard()
-    safety_output = await llama_guard.ainvoke("Agent", state["messages"] + [response])
+    # (and, in parallel mode, to check the user input while the model is generating)
+    response, safety_output = await aguarded_model_call(model_runnable, state, config)
     if safety_output.safety_assessment == SafetyAssessment.UNSAFE:
-        return {"messages": [format_safety_message(safety_output)], "safety": safety_output}
+        return {
+            "messages": [format_safety_message(safety_output)],
+            "safety": safety_output,
+            **summary,
+        }
 
     if state["remaining_steps"] < 2 and response.tool_calls:
         return {
@@ -108,21 +107,22 @@ async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
                     id=response.id,
                     content="Sorry, need more steps to process this request.",
                 )
-            ]
+            ],
+            **summary,
         }
     # We return a list, because this will get added to the existing list
-    return {"messages": [response]}
+    return {"messages": [response], **summary}
 
 
 async def llama_guard_input(state: AgentState, config: RunnableConfig) -> AgentState:
-    logger.info("#> llama_guard_input")
-    llama_guard = LlamaGuard()
+    logger.debug("#> llama_guard_input")
+    llama_guard = get_llama_guard()
     safety_output = await llama_guard.ainvoke("User", state["messages"])
     return {"safety": safety_output}
 
 
 async def block_unsafe_content(state: AgentState, config: RunnableConfig) -> AgentState:
-    logger.info("#> block_unsafe_content")
+    logger.debug("#> block_unsafe_content")
     safety: LlamaGuardOutput = state["safety"]
     return {"messages": [format_safety_message(safety)]}
 
@@ -131,14 +131,18 @@ async def block_unsafe_content(state: AgentState, config: RunnableConfig) -> Age
 agent = StateGraph(AgentState)
 agent.add_node("model", acall_model)
 agent.add_node("tools", ToolNode(tools))
-agent.add_node("guard_input", llama_guard_input)
-agent.add_node("block_unsafe_content", block_unsafe_content)
-agent.set_entry_point("guard_input")
+if settings.LLAMA_GUARD_MODE == "parallel":
+    # The input is checked by "model" itself, concurrently with the first model call
+    agent.set_entry_point("model")
+else:
+    agent.add_node("guard_input", llama_guard_input)
+    agent.add_node("block_unsafe_content", block_unsafe_content)
+    agent.set_entry_point("guard_input")
 
 
 # Check for unsafe input and block further processing if found
 def check_safety(state: AgentState) -> Literal["unsafe", "safe"]:
-    logger.info("#> check_safety")
+    logger.debug("#> check_safety")
     safety: LlamaGuardOutput = state["safety"]
     match safety.safety_assessment:
         case SafetyAssessment.UNSAFE:
@@ -147,12 +151,13 @@ def check_safety(state: AgentState) -> Literal["unsafe", "safe"]:
             return "safe"
 
 
-agent.add_conditional_edges(
-    "guard_input", check_safety, {"unsafe": "block_unsafe_content", "safe": "model"}
-)
+if settings.LLAMA_GUARD_MODE != "parallel":
+    agent.add_conditional_edges(
+        "guard_input", check_safety, {"unsafe": "block_unsafe_content", "safe": "model"}
+    )
 
-# Always END after blocking unsafe content
-agent.add_edge("block_unsafe_content", END)
+    # Always END after blocking unsafe content
+    agent.add_edge("block_unsafe_content", END)
 
 # Always run "model" after "tools"
 agent.add_edge("tools", "model")
@@ -160,7 +165,7 @@ agent.add_edge("tools", "model")
 
 # After "model", if there are tool calls, run "tools". Otherwise END.
 def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
-    logger.info("#> pending_too_calls")
+    logger.debug("#> pending_too_calls")
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage):
         raise TypeError(f"Expected AIMessage, got {type(last_message)}")
@@ -170,4 +175,4 @@ def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
 
 agent.add_conditional_edges("model", pending_tool_calls, {"tools": "tools", "done": END})
 
-code_reviewer = agent.compile(checkpointer=MemorySaver())
+code_reviewer = agent.compile(checkpointer=get_checkpointer())
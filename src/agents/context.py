@@ -0,0 +1,194 @@
+"""
+Bounded context windows for the messages agents send to their model.
+
+Every model call builds its prompt with a `ContextWindow`, which keeps the system prompt and
+the newest user turns that fit in the agent's token budget (`CONTEXT_MAX_TOKENS`, overridden
+per agent by `CONTEXT_AGENT_MAX_TOKENS`) and at most `CONTEXT_MAX_TURNS` turns. With
+`CONTEXT_SUMMARIZE`, the trimmed messages are folded into a rolling summary that is stored
+in the graph state under `context_summary` and sent in place of the messages it covers.
+"""
+
+import json
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TypedDict
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    trim_messages,
+)
+from langchain_core.runnables import RunnableConfig
+
+from core import settings
+
+# Model calls tagged with this are internal and not streamed to the client
+CONTEXT_SUMMARY_TAG = "context_summary"
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+summary_instructions = """
+You maintain a running summary of a conversation between a user and an AI assistant.
+Extend the existing summary with the new messages. Keep facts, decisions, open questions and
+anything the assistant promised to do; drop small talk. Answer with the summary only.
+"""
+
+
+class ContextSummary(TypedDict):
+    content: str
+    # Id of the last message covered by the summary
+    until: str | None
+
+
+def count_tokens_approximately(messages: Sequence[BaseMessage]) -> int:
+    """Estimate prompt tokens without a model-specific tokenizer."""
+    tokens = 0
+    for message in messages:
+        content = message.content
+        text = content if isinstance(content, str) else json.dumps(content, default=str)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            text += json.dumps(message.tool_calls, default=str)
+        tokens += math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+    return tokens
+
+
+def _render(messages: Sequence[BaseMessage]) -> str:
+    return "\n\n".join(f"{m.type}: {m.text()}" for m in messages if m.text())
+
+
+@dataclass(frozen=True)
+class ContextWindow:
+    max_tokens: int | None = None
+    max_turns: int | None = None
+    summarize: bool = False
+
+    def trim(self, messages: Sequence[AnyMessage], reserved_tokens: int = 0) -> list[AnyMessage]:
+        """
+        Keep the newest messages within the turn and token limits.
+
+        The result always starts at a user message, so no tool result is separated from the
+        tool call it answers, and always includes the latest user turn even if it alone is
+        over budget.
+        """
+        kept = list(messages)
+        human_indexes = [i for i, m in enumerate(kept) if m.type == "human"]
+        if self.max_turns and len(human_indexes) > self.max_turns:
+            kept = kept[human_indexes[-self.max_turns] :]
+        if self.max_tokens and count_tokens_approximately(kept) + reserved_tokens > self.max_tokens:
+            trimmed = trim_messages(
+                kept,
+                max_tokens=max(self.max_tokens - reserved_tokens, 0),
+                token_counter=count_tokens_approximately,
+                strategy="last",
+                start_on="human",
+                allow_partial=False,
+            )
+            if not trimmed and human_indexes:
+                trimmed = list(messages)[human_indexes[-1] :]
+            kept = trimmed
+        return kept
+
+    def _window(
+        self, state: dict, system_prompt: str | None = None
+    ) -> tuple[list[AnyMessage], list[AnyMessage]]:
+        """The prefix (system prompt and summary) and the newest messages of a model call."""
+        messages = state["messages"]
+        prefix: list[AnyMessage] = [SystemMessage(content=system_prompt)] if system_prompt else []
+        summary: ContextSummary | None = state.get("context_summary")
+        if summary:
+            summary_message = SystemMessage(
+                content=f"Summary of the earlier conversation:\n{summary['content']}"
+            )
+            kept = self.trim(messages, count_tokens_approximately([*prefix, summary_message]))
+            if len(kept) < len(messages):
+                prefix.append(summary_message)
+            return prefix, kept
+        return prefix, self.trim(messages, count_tokens_approximately(prefix))
+
+    def build(self, state: dict, system_prompt: str | None = None) -> list[AnyMessage]:
+        """Build the prompt for a model call: system prompt, summary and newest messages."""
+        prefix, kept = self._window(state, system_prompt)
+        return prefix + kept
+
+    def _unsummarized(self, state: dict, system_prompt: str | None = None) -> list[AnyMessage]:
+        """Messages trimmed from the window that the summary does not cover yet."""
+        if not self.summarize:
+            return []
+        messages = state["messages"]
+        _, kept = self._window(state, system_prompt)
+        dropped = messages[: len(messages) - len(kept)]
+        summary: ContextSummary | None = state.get("context_summary")
+        if summary:
+            ids = [m.id for m in dropped]
+            if summary["until"] in ids:
+                dropped = dropped[ids.index(summary["until"]) + 1 :]
+        return dropped
+
+    def _summary_prompt(self, state: dict, new_messages: list[AnyMessage]) -> list[AnyMessage]:
+        summary: ContextSummary | None = state.get("context_summary")
+        previous = summary["content"] if summary else "(none)"
+        return [
+            SystemMessage(content=summary_instructions),
+            HumanMessage(
+                content=f"Existing summary:\n{previous}\n\nNew messages:\n{_render(new_messages)}"
+            ),
+        ]
+
+    def summarize_state(
+        self,
+        state: dict,
+        model: BaseChatModel,
+        config: RunnableConfig | None = None,
+        system_prompt: str | None = None,
+    ) -> dict:
+        """
+        Return the state update that folds newly trimmed messages into the summary.
+
+        `system_prompt` must be the one the prompt is built with, which takes room in the window.
+        """
+        new_messages = self._unsummarized(state, system_prompt)
+        if not new_messages:
+            return {}
+        response = model.with_config(tags=[CONTEXT_SUMMARY_TAG]).invoke(
+            self._summary_prompt(state, new_messages), config
+        )
+        return {
+            "context_summary": ContextSummary(content=response.text(), until=new_messages[-1].id)
+        }
+
+    async def asummarize_state(
+        self,
+        state: dict,
+        model: BaseChatModel,
+        config: RunnableConfig | None = None,
+        system_prompt: str | None = None,
+    ) -> dict:
+        """
+        Return the state update that folds newly trimmed messages into the summary.
+
+        `system_prompt` must be the one the prompt is built with, which takes room in the window.
+        """
+        new_messages = self._unsummarized(state, system_prompt)
+        if not new_messages:
+            return {}
+        response = await model.with_config(tags=[CONTEXT_SUMMARY_TAG]).ainvoke(
+            self._summary_prompt(state, new_messages), config
+        )
+        return {
+            "context_summary": ContextSummary(content=response.text(), until=new_messages[-1].id)
+        }
+
+
+def get_context_window(agent_id: str) -> ContextWindow:
+    """Return the context window configured for an agent."""
+    return ContextWindow(
+        max_tokens=settings.CONTEXT_AGENT_MAX_TOKENS.get(agent_id, settings.CONTEXT_MAX_TOKENS),
+        max_turns=settings.CONTEXT_MAX_TURNS,
+        summarize=settings.CONTEXT_SUMMARIZE,
+    )
@@ -1,4 +1,9 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from enum import Enum
+from functools import cache
+from typing import Any
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
 from langchain_core.prompts import PromptTemplate
@@ -76,7 +81,26 @@ def parse_llama_guard_output(output: str) -> LlamaGuardOutput:
 
 
 class LlamaGuard:
-    def __init__(self) -> None:
+    """
+    Checks conversations with Llama Guard.
+
+    Verdicts are cached by role and a hash of the rendered conversation, so a thread whose
+    messages were already judged is not sent to the guard model again. With
+    `context_messages` set, only the newest messages are rendered, which bounds the size of
+    each check and lets long threads share cache entries for the same recent window.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = settings.LLAMA_GUARD_CACHE_SIZE,
+        context_messages: int | None = settings.LLAMA_GUARD_CONTEXT_MESSAGES,
+    ) -> None:
+        self.cache_size = cache_size
+        self.context_messages = context_messages
+        self._verdicts: OrderedDict[tuple[str, str], LlamaGuardOutput] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
         if settings.GROQ_API_KEY is None:
             print("GROQ_API_KEY not set, skipping LlamaGuard")
             self.model = None
@@ -84,27 +108,82 @@ class LlamaGuard:
         self.model = get_model(GroqModelName.LLAMA_GUARD_3_8B).with_config(tags=["llama_guard"])
         self.prompt = PromptTemplate.from_template(llama_guard_instructions)
 
-    def _compile_prompt(self, role: str, messages: list[AnyMessage]) -> str:
+    def _render_conversation(self, messages: list[AnyMessage]) -> str:
         role_mapping = {"ai": "Agent", "human": "User"}
         messages_str = [
             f"{role_mapping[m.type]}: {m.content}" for m in messages if m.type in ["ai", "human"]
         ]
-        conversation_history = "\n\n".join(messages_str)
+        if self.context_messages:
+            messages_str = messages_str[-self.context_messages :]
+        return "\n\n".join(messages_str)
+
+    def _compile_prompt(self, role: str, conversation_history: str) -> str:
         return self.prompt.format(role=role, conversation_history=conversation_history)
 
+    def _cache_key(self, role: str, conversation_history: str) -> tuple[str, str]:
+        return role, hashlib.sha256(conversation_history.encode()).hexdigest()
+
+    def _cached(self, key: tuple[str, str]) -> LlamaGuardOutput | None:
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is None:
+                self.misses += 1
+                return None
+            self._verdicts.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def _store(self, key: tuple[str, str], verdict: LlamaGuardOutput) -> LlamaGuardOutput:
+        # Errors are not cached, so the next turn retries the check
+        if self.cache_size <= 0 or verdict.safety_assessment == SafetyAssessment.ERROR:
+            return verdict
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+        return verdict
+
     def invoke(self, role: str, messages: list[AnyMessage]) -> LlamaGuardOutput:
         if self.model is None:
             return LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
-        compiled_prompt = self._compile_prompt(role, messages)
+        conversation_history = self._render_conversation(messages)
+        key = self._cache_key(role, conversation_history)
+        if (verdict := self._cached(key)) is not None:
+            return verdict
+        compiled_prompt = self._compile_prompt(role, conversation_history)
         result = self.model.invoke([HumanMessage(content=compiled_prompt)])
-        return parse_llama_guard_output(result.content)
+        return self._store(key, parse_llama_guard_output(result.content))
 
     async def ainvoke(self, role: str, messages: list[AnyMessage]) -> LlamaGuardOutput:
         if self.model is None:
             return LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
-        compiled_prompt = self._compile_prompt(role, messages)
+        conversation_history = self._render_conversation(messages)
+        key = self._cache_key(role, conversation_history)
+        if (verdict := self._cached(key)) is not None:
+            return verdict
+        compiled_prompt = self._compile_prompt(role, conversation_history)
         result = await self.model.ainvoke([HumanMessage(content=compiled_prompt)])
-        return parse_llama_guard_output(result.content)
+        return self._store(key, parse_llama_guard_output(result.content))
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._verdicts.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._verdicts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@cache
+def get_llama_guard() -> LlamaGuard:
+    """Return the process-wide LlamaGuard, shared so that its verdict cache is too."""
+    return LlamaGuard()
 
 
 if __name__ == "__main__":
@@ -4,17 +4,19 @@ from typing import Literal
 from langchain_community.tools import DuckDuckGoSearchResults, OpenWeatherMapQueryRun
 from langchain_community.utilities import OpenWeatherMapAPIWrapper
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.managed import RemainingSteps
 from langgraph.prebuilt import ToolNode
 
-from agents.llama_guard import LlamaGuard, LlamaGuardOutput, SafetyAssessment
+from agents.context import ContextSummary, ContextWindow, get_context_window
+from agents.llama_guard import LlamaGuardOutput, SafetyAssessment, get_llama_guard
+from agents.safety import aguarded_model_call
 from agents.tools import calculator
 from core import settings
 from core.llm import get_model
+from memory.checkpointer import get_checkpointer
 
 
 class AgentState(MessagesState, total=False):
@@ -25,6 +27,7 @@ class AgentState(MessagesState, total=False):
 
     safety: LlamaGuardOutput
     remaining_steps: RemainingSteps
+    context_summary: ContextSummary
 
 
 web_search = DuckDuckGoSearchResults(name="WebSearch")
@@ -53,10 +56,12 @@ instructions = f"""
     """
 
 
-def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
+def wrap_model(
+    model: BaseChatModel, context: ContextWindow
+) -> RunnableSerializable[AgentState, AIMessage]:
     model = model.bind_tools(tools)
     preprocessor = RunnableLambda(
-        lambda state: [SystemMessage(content=instructions)] + state["messages"],
+        lambda state: context.build(state, instructions),
         name="StateModifier",
     )
     return preprocessor | model
@@ -71,14 +76,19 @@ def format_safety_message(safety: LlamaGuardOutput) -> AIMessage:
 
 async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
     m = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_runnable = wrap_model(m)
-    response = await model_runnable.ainvoke(state, config)
-
+    context = get_context_window("research-assistant")
+    summary = await context.asummarize_state(state, m, config, instructions)
+    state = {**state, **summary}
+    model_runnable = wrap_model(m, context)
     # Run llama guard check here to avoid returning the message if it's unsafe
-    llama_guard = LlamaGuard()
-    safety_output = await llama_guard.ainvoke("Agent", state["messages"] + [response])
+    # (and, in parallel mode, to check the user input while the model is generating)
+    response, safety_output = await aguarded_model_call(model_runnable, state, config)
     if safety_output.safety_assessment == SafetyAssessment.UNSAFE:
-        return {"messages": [format_safety_message(safety_output)], "safety": safety_output}
+        return {
+            "messages": [format_safety_message(safety_output)],
+            "safety": safety_output,
+            **summary,
+        }
 
     if state["remaining_steps"] < 2 and response.tool_calls:
         return {
@@ -87,14 +97,15 @@ async def acall_model(state: AgentState, config: RunnableConfig) -> AgentState:
                     id=response.id,
                     content="Sorry, need more steps to process this request.",
                 )
-            ]
+            ],
+            **summary,
         }
     # We return a list, because this will get added to the existing list
-    return {"messages": [response]}
+    return {"messages": [response], **summary}
 
 
 async def llama_guard_input(state: AgentState, config: RunnableConfig) -> AgentState:
-    llama_guard = LlamaGuard()
+    llama_guard = get_llama_guard()
     safety_output = await llama_guard.ainvoke("User", state["messages"])
     return {"safety": safety_output}
 
@@ -129,17 +140,21 @@ def pending_tool_calls(state: AgentState) -> Literal["tools", "done"]:
 agent = StateGraph(AgentState)
 agent.add_node("model", acall_model)
 agent.add_node("tools", ToolNode(tools))
-agent.add_node("guard_input", llama_guard_input)
-agent.add_node("block_unsafe_content", block_unsafe_content)
-agent.set_entry_point("guard_input")
-agent.add_conditional_edges(
-    "guard_input", check_safety, {"unsafe": "block_unsafe_content", "safe": "model"}
-)
-# Always END after blocking unsafe content
-agent.add_edge("block_unsafe_content", END)
+if settings.LLAMA_GUARD_MODE == "parallel":
+    # The input is checked by "model" itself, concurrently with the first model call
+    agent.set_entry_point("model")
+else:
+    agent.add_node("guard_input", llama_guard_input)
+    agent.add_node("block_unsafe_content", block_unsafe_content)
+    agent.set_entry_point("guard_input")
+    agent.add_conditional_edges(
+        "guard_input", check_safety, {"unsafe": "block_unsafe_content", "safe": "model"}
+    )
+    # Always END after blocking unsafe content
+    agent.add_edge("block_unsafe_content", END)
 # Always run "model" after "tools"
 agent.add_edge("tools", "model")
 
 agent.add_conditional_edges("model", pending_tool_calls, {"tools": "tools", "done": END})
 
-research_assistant = agent.compile(checkpointer=MemorySaver())
+research_assistant = agent.compile(checkpointer=get_checkpointer())
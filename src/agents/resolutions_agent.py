@@ -1,40 +1,27 @@
-import hashlib
-import logging
 import warnings
 from datetime import datetime
 from typing import Literal
 
-import bs4
-from langchain_community.document_loaders import WebBaseLoader
 from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_core._api import LangChainBetaWarning
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSerializable
 from langchain_core.tools import tool
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 
+from agents.context import ContextSummary, ContextWindow, get_context_window
 from client.client import AgentClientError
 from core import get_model, settings
-from db.agent_model import DatabaseManager
+from core.log import get_logger
+from db.agent_model import get_database_manager
+from db.ingestion import RESOLUTIONS_COLLECTION
+from memory.checkpointer import get_checkpointer
 
 warnings.filterwarnings("ignore", category=LangChainBetaWarning)
 
-logger = logging.getLogger(__name__)
-# Set the log level to INFO
-logger.setLevel(logging.INFO)
-# Prevent duplicate logs
-logger.propagate = False
-# Check if the logger already has handlers to prevent duplicate entries
-if not logger.handlers:
-    # Add a handler (e.g., to console) if one doesn't already exist.
-    handler = logging.StreamHandler()  # Sends logs to the console
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+logger = get_logger(__name__)
 
 
 class AgentState(MessagesState, total=False):
@@ -43,6 +30,8 @@ class AgentState(MessagesState, total=False):
     documentation: https://typing.readthedocs.io/en/latest/spec/typeddict.html#totality
     """
 
+    context_summary: ContextSummary
+
 
 current_date = datetime.now().strftime("%B %d, %Y")
 base_system_prompt = f"""
@@ -58,9 +47,9 @@ base_system_prompt = f"""
 @tool(response_format="content_and_artifact")
 def resolution_retrieval(query: str):
     """Retrieve information related to a query about Anatel's Resolutions."""
-    logger.info("#> resolution_retrieval")
+    logger.debug("#> resolution_retrieval")
     retrieved_docs = (
-        DatabaseManager().get_vector_store("resolutions_embd").similarity_search(query, k=5)
+        get_database_manager().get_vector_store(RESOLUTIONS_COLLECTION).similarity_search(query, k=5)
     )
     serialized = "\n\n".join(
         (f"Source: {doc.metadata}\n" f"Content: {doc.page_content}") for doc in retrieved_docs
@@ -72,11 +61,13 @@ def resolution_retrieval(query: str):
 tools_list = [resolution_retrieval]
 
 
-def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessage]:
+def wrap_model(
+    model: BaseChatModel, context: ContextWindow
+) -> RunnableSerializable[AgentState, AIMessage]:
     """Wrap the model with a preprocessor that adds a system message to the state."""
-    logger.info("#> wrap_model")
+    logger.debug("#> wrap_model")
     preprocessor = RunnableLambda(
-        lambda state: [SystemMessage(content=base_system_prompt)] + state["messages"],
+        lambda state: context.build(state, base_system_prompt),
         name="StateModifier",
     )
     model = model.bind_tools(tools_list)
@@ -85,17 +76,20 @@ def wrap_model(model: BaseChatModel) -> RunnableSerializable[AgentState, AIMessa
 
 
 # Step 1: Generate an AIMessage that may include a tool-call to be sent.
-def query_or_respond(state: MessagesState, config: RunnableConfig) -> AgentState:
+def query_or_respond(state: AgentState, config: RunnableConfig) -> AgentState:
     """Generate tool call for retrieval or respond."""
-    logger.info("#> query_or_respond")
+    logger.debug("#> query_or_respond")
     model = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
-    model_with_tools = wrap_model(model)
+    context = get_context_window("resolutions-agent")
+    summary = context.summarize_state(state, model, config, base_system_prompt)
+    state = {**state, **summary}
+    model_with_tools = wrap_model(model, context)
     try:
         response = model_with_tools.invoke(state, config)
     except AgentClientError as e:
         logger.error("#> query_or_respond > error: %s", e)
         response = AIMessage(content="Unexpected error, sorry! Please try again latter.")
-    return {"messages": [response]}
+    return {"messages": [response], **summary}
 
 
 # Step 2: Execute the retrieval.
@@ -103,9 +97,9 @@ tools = ToolNode(tools_list)
 
 
 # Step 3: Generate a response using the retrieved content.
-def generate(state: MessagesState, config: RunnableConfig) -> AgentState:
+def generate(state: AgentState, config: RunnableConfig) -> AgentState:
     """Generate answer."""
-    logger.info("#> generate")
+    logger.debug("#> generate")
     # Get generated ToolMessages
     recent_tool_messages = []
     for message in reversed(state["messages"]):
@@ -129,10 +123,11 @@ def generate(state: MessagesState, config: RunnableConfig) -> AgentState:
         for message in state["messages"]
         if message.type in ("human", "system") or (message.type == "ai" and not message.tool_calls)
     ]
-    resolutions_prompt = [
-        SystemMessage(base_system_prompt + generation_prompt)
-    ] + conversation_messages
-    logger.info("#> generate > resolutions_prompt: %s", resolutions_prompt)
+    context = get_context_window("resolutions-agent")
+    resolutions_prompt = context.build(
+        {**state, "messages": conversation_messages}, base_system_prompt + generation_prompt
+    )
+    logger.debug("#> generate > prompt", extra={"prompt_messages": len(resolutions_prompt)})
 
     # Run
     llm = get_model(config["configurable"].get("model", settings.DEFAULT_MODEL))
@@ -151,52 +146,11 @@ def generate(state: MessagesState, config: RunnableConfig) -> AgentState:
 #     return "done"
 
 
-# Load and chunk contents of the blog
-logger.info("#> WebBaseLoader")
-urls = [
-    # accessibility
-    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2016/905-resolucao-n-667",
-    # universalization 
-    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2022/1689-resolucao-754",
-    # rgg
-    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2023/1900-resolucao-765",
-]
-
-logger.info("#> WebBaseLoader > loading vector database of resolutions...")
-docs = [WebBaseLoader(url).load() for url in urls]
-docs_list = [item for sublist in docs for item in sublist]
-CHUNK_SIZE = 512
-CHUNK_OVERLAP = CHUNK_SIZE // 5
-text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-    chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
-)
-doc_chunks = text_splitter.split_documents(docs_list)
-
-def generate_doc_id(doc):
-    """Generate a unique ID based on document content."""
-    return hashlib.sha256(doc.page_content.encode()).hexdigest()  # Hash content as ID
-
-
-# Generate document IDs
-chunk_id_map = {}
-unique_chunks = []
-for chunk in doc_chunks:
-    chunk_id = generate_doc_id(chunk)
-    if chunk_id not in chunk_id_map:
-        chunk_id_map[chunk_id] = chunk
-        unique_chunks.append(chunk)
-
-# Get unique IDs and documents
-unique_chunl_ids = list(chunk_id_map.keys())
-unique_chunks = list(chunk_id_map.values())
+# Resolutions are indexed by the incremental pipeline in db.ingestion (see run_ingestion.py),
+# so importing this module performs no network or embedding work.
 
-# Index chunks
-vector_store = DatabaseManager().get_vector_store("resolutions_embd")
-indexed = vector_store.add_documents(documents=unique_chunks, ids=unique_chunl_ids)
-logger.info("#> WebBaseLoader > Indexed %s chunks", len(indexed))
-
-logger.info("#> StateGraph(MessagesState)")
-graph_builder = StateGraph(MessagesState)
+logger.debug("#> StateGraph(AgentState)")
+graph_builder = StateGraph(AgentState)
 graph_builder.add_node(query_or_respond)
 graph_builder.add_node(tools)
 graph_builder.add_node(generate)
@@ -210,11 +164,13 @@ graph_builder.set_entry_point("query_or_respond")
 graph_builder.add_edge("tools", "generate")
 graph_builder.add_edge("generate", END)
 
-resolutions_graph = graph_builder.compile(checkpointer=MemorySaver())
+resolutions_graph = graph_builder.compile(checkpointer=get_checkpointer())
+
 
-# Get the PNG image binary data
-png = resolutions_graph.get_graph().draw_mermaid_png()
-# Save the binary PNG data to a file in /tmp
-file_path = "/app/graph.png"
-with open(file_path, "wb") as f:
-    f.write(png)
+if __name__ == "__main__":
+    # Get the PNG image binary data
+    png = resolutions_graph.get_graph().draw_mermaid_png()
+    # Save the binary PNG data to a file in /tmp
+    file_path = "/app/graph.png"
+    with open(file_path, "wb") as f:
+        f.write(png)
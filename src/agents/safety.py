@@ -0,0 +1,146 @@
+"""
+Safety checks that run alongside the model instead of in front of it.
+
+With `LLAMA_GUARD_MODE=parallel` the user input of a turn is checked by LlamaGuard while the
+model is already generating its answer. Tokens of that model call are tagged with
+`AWAITING_SAFETY_TAG` and held back by the service until `SAFETY_CLEARED_EVENT` is
+dispatched; if the input is unsafe the model call is cancelled and its tokens are discarded.
+With `LLAMA_GUARD_STREAM_CHECK_CHARS` set, the answer is also checked while it streams, so
+generation stops as soon as a partial answer is flagged.
+"""
+
+import asyncio
+import contextlib
+
+from langchain_core.callbacks import adispatch_custom_event
+from langchain_core.messages import AIMessage, AIMessageChunk, message_chunk_to_message
+from langchain_core.runnables import RunnableConfig, RunnableSerializable
+
+from agents.llama_guard import LlamaGuard, LlamaGuardOutput, SafetyAssessment, get_llama_guard
+from core import settings
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+AWAITING_SAFETY_TAG = "awaiting_safety"
+SAFETY_CLEARED_EVENT = "safety_cleared"
+
+
+def needs_input_check(state: dict) -> bool:
+    """In parallel mode, the first model call of a turn checks the user input."""
+    return settings.LLAMA_GUARD_MODE == "parallel" and state["messages"][-1].type == "human"
+
+
+def _is_unsafe(safety: LlamaGuardOutput) -> bool:
+    return safety.safety_assessment == SafetyAssessment.UNSAFE
+
+
+def _check_result(check: asyncio.Task) -> LlamaGuardOutput | None:
+    """The verdict of a finished check of a partial answer, or None if the check failed."""
+    if error := check.exception():
+        logger.warning("#> LlamaGuard check of a partial answer failed: %s", error)
+        return None
+    return check.result()
+
+
+async def _astream_checked(
+    model_runnable: RunnableSerializable,
+    state: dict,
+    config: RunnableConfig,
+    llama_guard: LlamaGuard,
+) -> tuple[AIMessage, LlamaGuardOutput | None]:
+    """
+    Stream the answer, checking it every LLAMA_GUARD_STREAM_CHECK_CHARS characters.
+
+    Returns the answer and the verdict that covers it, or None if the full answer still has to
+    be checked: when the last check saw only part of it, or when a check failed (a LlamaGuard
+    error or timeout then stops the checks, not the answer).
+    """
+    chunk: AIMessageChunk | None = None
+    checked_content = ""
+    check: asyncio.Task | None = None
+    check_failed = False
+    try:
+        async for part in model_runnable.astream(state, config):
+            chunk = part if chunk is None else chunk + part
+            if check is not None and check.done():
+                safety = _check_result(check)
+                check = None
+                if safety is None:
+                    check_failed = True
+                elif _is_unsafe(safety):
+                    return message_chunk_to_message(chunk), safety
+            content = chunk.text()
+            if (
+                check is None
+                and not check_failed
+                and len(content) - len(checked_content) >= settings.LLAMA_GUARD_STREAM_CHECK_CHARS
+            ):
+                checked_content = content
+                partial = state["messages"] + [AIMessage(content=content)]
+                check = asyncio.create_task(llama_guard.ainvoke("Agent", partial))
+        if chunk is None:
+            # The model streamed nothing at all
+            return AIMessage(content=""), None
+        response = message_chunk_to_message(chunk)
+        if check is not None:
+            await asyncio.wait([check])
+            safety = _check_result(check)
+            check = None
+            if safety is not None and (_is_unsafe(safety) or checked_content == response.text()):
+                return response, safety
+        return response, None
+    finally:
+        if check is not None:
+            check.cancel()
+
+
+async def _agenerate(
+    model_runnable: RunnableSerializable,
+    state: dict,
+    config: RunnableConfig,
+    llama_guard: LlamaGuard,
+) -> tuple[AIMessage, LlamaGuardOutput]:
+    if settings.LLAMA_GUARD_STREAM_CHECK_CHARS > 0 and llama_guard.model is not None:
+        response, safety = await _astream_checked(model_runnable, state, config, llama_guard)
+        if safety is not None:
+            return response, safety
+    else:
+        response = await model_runnable.ainvoke(state, config)
+    return response, await llama_guard.ainvoke("Agent", state["messages"] + [response])
+
+
+async def aguarded_model_call(
+    model_runnable: RunnableSerializable,
+    state: dict,
+    config: RunnableConfig,
+) -> tuple[AIMessage | None, LlamaGuardOutput]:
+    """
+    Call the model and check its answer with LlamaGuard.
+
+    If the input of the turn still needs checking (see `needs_input_check`), the check runs
+    concurrently with the model call. Returns the answer, or None if the input was unsafe,
+    together with the safety assessment that decided it.
+    """
+    llama_guard = get_llama_guard()
+    if not needs_input_check(state) or llama_guard.model is None:
+        return await _agenerate(model_runnable, state, config, llama_guard)
+
+    input_check = asyncio.create_task(llama_guard.ainvoke("User", state["messages"]))
+    model_call = asyncio.create_task(
+        _agenerate(
+            model_runnable.with_config(tags=[AWAITING_SAFETY_TAG]), state, config, llama_guard
+        )
+    )
+    try:
+        input_safety = await input_check
+        if _is_unsafe(input_safety):
+            return None, input_safety
+        await adispatch_custom_event(SAFETY_CLEARED_EVENT, {}, config=config)
+        return await model_call
+    finally:
+        for task in (input_check, model_call):
+            if not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
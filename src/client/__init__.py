@@ -1,3 +1,10 @@
 from client.client import AgentClient, AgentClientContextSizeError, AgentClientError
+from client.retry import RetryBudget, RetryPolicy
 
-__all__ = ["AgentClient", "AgentClientError", "AgentClientContextSizeError"]
+__all__ = [
+    "AgentClient",
+    "AgentClientError",
+    "AgentClientContextSizeError",
+    "RetryBudget",
+    "RetryPolicy",
+]
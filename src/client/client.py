@@ -1,17 +1,23 @@
+import asyncio
 import json
 import logging
 import os
 import time
-from collections.abc import AsyncGenerator, Generator
-from typing import Any
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from contextlib import aclosing, closing
+from typing import Any, NoReturn
 
 import httpx
 
+from client.retry import RetryPolicy
 from schemas import (
+    BatchInput,
+    BatchResult,
     ChatHistory,
     ChatHistoryInput,
     ChatMessage,
     Feedback,
+    JobInfo,
     ServiceMetadata,
     StreamInput,
     UserInput,
@@ -39,8 +45,27 @@ class AgentClientContextSizeError(Exception):
     pass
 
 
+async def _closing(client: httpx.AsyncClient) -> AsyncGenerator[None, None]:
+    """
+    Close `client` when this generator, once started, is closed.
+
+    Event loops close the async generators started in them when they are garbage collected, and
+    those left when the loop shuts down (`asyncio.run()` does), while the loop can still run.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
 class AgentClient:
-    """Client for interacting with the agent service."""
+    """
+    Client for interacting with the agent service.
+
+    The client keeps one pooled `httpx.Client` and one `httpx.AsyncClient` for its lifetime,
+    so consecutive requests reuse open connections. Close it with `close()`/`aclose()`, or use
+    it as a (sync or async) context manager.
+    """
 
     def __init__(
         self,
@@ -49,6 +74,11 @@ class AgentClient:
         timeout: float | None = None,
         get_info: bool = True,
         max_retries: int = 2,
+        retry_policy: RetryPolicy | None = None,
+        max_connections: int | None = 100,
+        max_keepalive_connections: int | None = 20,
+        keepalive_expiry: float | None = 5.0,
+        http2: bool = False,
     ) -> None:
         """
         Initialize the client.
@@ -61,17 +91,95 @@ class AgentClient:
                 Default: True
             max_retries (int, optional): The maximum number of retries for requests.
                 Default: 2
+            retry_policy (RetryPolicy, optional): When and how long to wait before retrying,
+                overriding max_retries. Default: a RetryPolicy with max_retries
+            max_connections (int, optional): Maximum open connections per HTTP client.
+                Default: 100
+            max_keepalive_connections (int, optional): Idle connections kept open for reuse.
+                Default: 20
+            keepalive_expiry (float, optional): Seconds an idle connection is kept open.
+                Default: 5.0
+            http2 (bool, optional): Negotiate HTTP/2, requires `httpx[http2]`.
+                Default: False
         """
         self.base_url = base_url
         self.auth_secret = os.getenv("AUTH_SECRET")
         self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_client_loop: asyncio.AbstractEventLoop | None = None
+        self._async_client_closer: AsyncGenerator[None, None] | None = None
+        self.max_retries = max_retries
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
         self.info: ServiceMetadata | None = None
         self.agent: str | None = None
         if get_info:
             self.retrieve_info()
         if agent:
             self.update_agent(agent)
-        self.max_retries = max_retries
+
+    @property
+    def client(self) -> httpx.Client:
+        """The pooled HTTP client used by the synchronous methods."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.Client(limits=self.limits, http2=self.http2)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        The pooled HTTP client used by the asynchronous methods.
+
+        Connections belong to the event loop they were opened on, so a new client is created
+        when called from a different loop (e.g. Streamlit runs each rerun in a new loop). Each
+        client is closed in its own loop, when it is replaced or when that loop shuts down.
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self._async_client is None
+            or self._async_client.is_closed
+            or self._async_client_loop is not loop
+        ):
+            self._async_client = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+            self._async_client_loop = loop
+            # Replacing the closer of the previous client has its loop close that client
+            self._async_client_closer = _closing(self._async_client)
+            asyncio.ensure_future(anext(self._async_client_closer))
+        return self._async_client
+
+    def close(self) -> None:
+        """Close the synchronous HTTP client and its connections."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        """Close both HTTP clients and their connections."""
+        self.close()
+        if self._async_client is not None:
+            if self._async_client_loop is asyncio.get_running_loop():
+                await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+            self._async_client_closer = None
+
+    def __enter__(self) -> "AgentClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "AgentClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
 
     @property
     def _headers(self) -> dict[str, str]:
@@ -80,14 +188,46 @@ class AgentClient:
             headers["Authorization"] = f"Bearer {self.auth_secret}"
         return headers
 
+    @staticmethod
+    def _log_retry(attempt: int, error: Exception) -> None:
+        logger.warning("#> AgentClienta > Retry %s after error: %s", attempt + 1, error)
+
+    def _send(self, send: Callable[[], httpx.Response]) -> httpx.Response:
+        """Send a request with `send`, retrying it according to the retry policy."""
+
+        def attempt() -> httpx.Response:
+            response = send()
+            response.raise_for_status()
+            return response
+
+        return self.retry_policy.call(attempt, on_retry=self._log_retry)
+
+    async def _asend(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Send a request with `send`, retrying it according to the retry policy."""
+
+        async def attempt() -> httpx.Response:
+            response = await send()
+            response.raise_for_status()
+            return response
+
+        return await self.retry_policy.acall(attempt, on_retry=self._log_retry)
+
+    @staticmethod
+    def _raise_error(e: httpx.HTTPError) -> NoReturn:
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 413:
+            # Payload Too Large
+            raise AgentClientContextSizeError("Message size too large.") from e
+        raise AgentClientError(f"Error: {e}") from e
+
     def retrieve_info(self) -> None:
         try:
-            response = httpx.get(
-                f"{self.base_url}/info",
-                headers=self._headers,
-                timeout=self.timeout,
+            response = self._send(
+                lambda: self.client.get(
+                    f"{self.base_url}/info",
+                    headers=self._headers,
+                    timeout=self.timeout,
+                )
             )
-            response.raise_for_status()
         except httpx.HTTPError as e:
             logger.error("#> AgentClienta.retrieve_info > Error: %s", e)
             raise AgentClientError(f"Error getting service info: {e}") from e
@@ -135,19 +275,19 @@ class AgentClient:
             request.model = model
         if agent_config:
             request.agent_config = agent_config
-        async with httpx.AsyncClient() as client:
-            try:
-                logger.info("#> AgentClienta.ainvoke > info: %s", request.model_dump())
-                response = await client.post(
+        try:
+            logger.info("#> AgentClienta.ainvoke > info: %s", request.model_dump())
+            response = await self._asend(
+                lambda: self.async_client.post(
                     f"{self.base_url}/{self.agent}/invoke",
                     json=request.model_dump(),
                     headers=self._headers,
                     timeout=self.timeout,
                 )
-                response.raise_for_status()
-            except httpx.HTTPError as e:
-                logger.error("#> AgentClienta.ainvoke > Error: %s", e)
-                raise AgentClientError(f"Error: {e}") from e
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.ainvoke > Error: %s", e)
+            self._raise_error(e)
 
         return ChatMessage.model_validate(response.json())
 
@@ -180,29 +320,81 @@ class AgentClient:
         if agent_config:
             request.agent_config = agent_config
 
-        for attempt in range(self.max_retries):    
-            try:
-                response = httpx.post(
+        try:
+            response = self._send(
+                lambda: self.client.post(
                     f"{self.base_url}/{self.agent}/invoke",
                     json=request.model_dump(),
                     headers=self._headers,
                     timeout=self.timeout,
                 )
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 413:  # Payload Too Large
-                    if attempt < self.max_retries - 1:
-                        logger.warning("#> AgentClienta.invoke > Attempt: %s", str(attempt + 1))
-                        time.sleep(1 * 60)  # wait one minute to have more tokens per minute
-                        continue
-                    else:
-                        # waited one minute, but it is still too large
-                        raise AgentClientContextSizeError("Message size too large.") from e
-                else:
-                    logger.error("#> AgentClienta.invoke > Error: %s", e)
-                    raise AgentClientError(f"Error: {e}") from e
-                
-            return ChatMessage.model_validate(response.json())
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.invoke > Error: %s", e)
+            self._raise_error(e)
+
+        return ChatMessage.model_validate(response.json())
+
+    def _stream_lines(self, url: str, payload: dict[str, Any]) -> Generator[str, None, None]:
+        """
+        POST `payload` and yield the non-empty lines of the streamed response.
+
+        The request is retried according to the retry policy only while nothing was yielded,
+        so the caller never sees output twice.
+        """
+        self.retry_policy.record_request()
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.client.stream(
+                    "POST",
+                    url,
+                    json=payload,
+                    headers=self._headers,
+                    timeout=self.timeout,
+                ) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line.strip():
+                            started = True
+                            yield line
+                return
+            except httpx.HTTPError as e:
+                if started or not self.retry_policy.should_retry(attempt, e):
+                    logger.error("#> AgentClienta._stream_lines > Error: %s", e)
+                    self._raise_error(e)
+                self._log_retry(attempt, e)
+                time.sleep(self.retry_policy.delay(attempt, e))
+                attempt += 1
+
+    async def _astream_lines(self, url: str, payload: dict[str, Any]) -> AsyncGenerator[str, None]:
+        """Async version of `_stream_lines`."""
+        self.retry_policy.record_request()
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.async_client.stream(
+                    "POST",
+                    url,
+                    json=payload,
+                    headers=self._headers,
+                    timeout=self.timeout,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            started = True
+                            yield line
+                return
+            except httpx.HTTPError as e:
+                if started or not self.retry_policy.should_retry(attempt, e):
+                    logger.error("#> AgentClienta._astream_lines > Error: %s", e)
+                    self._raise_error(e)
+                self._log_retry(attempt, e)
+                await asyncio.sleep(self.retry_policy.delay(attempt, e))
+                attempt += 1
 
     def _parse_stream_line(self, line: str) -> ChatMessage | str | None:
         line = line.strip()
@@ -266,24 +458,14 @@ class AgentClient:
             request.model = model
         if agent_config:
             request.agent_config = agent_config
-        try:
-            with httpx.stream(
-                "POST",
-                f"{self.base_url}/{self.agent}/stream",
-                json=request.model_dump(),
-                headers=self._headers,
-                timeout=self.timeout,
-            ) as response:
-                response.raise_for_status()
-                for line in response.iter_lines():
-                    if line.strip():
-                        parsed = self._parse_stream_line(line)
-                        if parsed is None:
-                            break
-                        yield parsed
-        except httpx.HTTPError as e:
-            logger.error("#> AgentClienta.stream > Error: %s", e)
-            raise AgentClientError(f"Error: {e}") from e
+        with closing(
+            self._stream_lines(f"{self.base_url}/{self.agent}/stream", request.model_dump())
+        ) as lines:
+            for line in lines:
+                parsed = self._parse_stream_line(line)
+                if parsed is None:
+                    break
+                yield parsed
 
     async def astream(
         self,
@@ -320,25 +502,249 @@ class AgentClient:
             request.model = model
         if agent_config:
             request.agent_config = agent_config
-        async with httpx.AsyncClient() as client:
-            try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/{self.agent}/stream",
+        async with aclosing(
+            self._astream_lines(f"{self.base_url}/{self.agent}/stream", request.model_dump())
+        ) as lines:
+            async for line in lines:
+                parsed = self._parse_stream_line(line)
+                if parsed is None:
+                    break
+                yield parsed
+
+    def _batch_request(
+        self,
+        inputs: list[str | UserInput],
+        model: str | None,
+        agent_config: dict[str, Any] | None,
+        max_concurrency: int | None,
+    ) -> BatchInput:
+        if not self.agent:
+            raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
+        user_inputs = []
+        for user_input in inputs:
+            if isinstance(user_input, str):
+                user_input = UserInput(message=user_input)
+                if model:
+                    user_input.model = model
+                if agent_config:
+                    user_input.agent_config = agent_config
+            user_inputs.append(user_input)
+        return BatchInput(inputs=user_inputs, max_concurrency=max_concurrency)
+
+    @staticmethod
+    def _parse_batch_line(line: str) -> BatchResult:
+        try:
+            return BatchResult.model_validate_json(line)
+        except Exception as e:
+            logger.error("#> AgentClienta._parse_batch_line > Error: %s", e)
+            raise AgentClientError(f"Server returned invalid batch result: {e}") from e
+
+    def batch(
+        self,
+        inputs: list[str | UserInput],
+        model: str | None = None,
+        agent_config: dict[str, Any] | None = None,
+        max_concurrency: int | None = None,
+    ) -> Generator[BatchResult, None, None]:
+        """
+        Invoke the agent with many independent inputs in a single request.
+
+        Results are yielded as the service completes them, so they may arrive out of order;
+        use `BatchResult.index` to match them to their input. A failed input yields a result
+        with `error` set instead of raising.
+
+        Args:
+            inputs (list[str | UserInput]): Messages, or complete user inputs, to send
+            model (str, optional): LLM model to use for inputs given as messages
+            agent_config (dict[str, Any], optional): Agent configuration for inputs given as
+                messages
+            max_concurrency (int, optional): Maximum inputs the service runs at once
+
+        Returns:
+            Generator[BatchResult, None, None]: The result of each input
+        """
+        request = self._batch_request(inputs, model, agent_config, max_concurrency)
+        url = f"{self.base_url}/{self.agent}/batch"
+        with closing(self._stream_lines(url, request.model_dump())) as lines:
+            for line in lines:
+                yield self._parse_batch_line(line)
+
+    async def abatch(
+        self,
+        inputs: list[str | UserInput],
+        model: str | None = None,
+        agent_config: dict[str, Any] | None = None,
+        max_concurrency: int | None = None,
+    ) -> AsyncGenerator[BatchResult, None]:
+        """
+        Invoke the agent with many independent inputs in a single request, asynchronously.
+
+        See `batch` for details.
+        """
+        request = self._batch_request(inputs, model, agent_config, max_concurrency)
+        url = f"{self.base_url}/{self.agent}/batch"
+        async with aclosing(self._astream_lines(url, request.model_dump())) as lines:
+            async for line in lines:
+                yield self._parse_batch_line(line)
+
+    def _job_request(
+        self,
+        message: str,
+        model: str | None,
+        thread_id: str | None,
+        agent_config: dict[str, Any] | None,
+    ) -> UserInput:
+        if not self.agent:
+            raise AgentClientError("No agent selected. Use update_agent() to select an agent.")
+        request = UserInput(message=message)
+        if thread_id:
+            request.thread_id = thread_id
+        if model:
+            request.model = model
+        if agent_config:
+            request.agent_config = agent_config
+        return request
+
+    def submit_job(
+        self,
+        message: str,
+        model: str | None = None,
+        thread_id: str | None = None,
+        agent_config: dict[str, Any] | None = None,
+    ) -> JobInfo:
+        """
+        Run the agent in the background. Poll the returned job with `get_job`.
+
+        Args:
+            message (str): The message to send to the agent
+            model (str, optional): LLM model to use for the agent
+            thread_id (str, optional): Thread ID for continuing a conversation
+            agent_config (dict[str, Any], optional): Additional configuration to pass through to the agent
+
+        Returns:
+            JobInfo: The queued job
+        """
+        request = self._job_request(message, model, thread_id, agent_config)
+        try:
+            response = self._send(
+                lambda: self.client.post(
+                    f"{self.base_url}/{self.agent}/jobs",
                     json=request.model_dump(),
                     headers=self._headers,
                     timeout=self.timeout,
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            parsed = self._parse_stream_line(line)
-                            if parsed is None:
-                                break
-                            yield parsed
-            except httpx.HTTPError as e:
-                logger.error("#> AgentClienta.astream > Error: %s", e)
-                raise AgentClientError(f"Error: {e}") from e
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.submit_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    async def asubmit_job(
+        self,
+        message: str,
+        model: str | None = None,
+        thread_id: str | None = None,
+        agent_config: dict[str, Any] | None = None,
+    ) -> JobInfo:
+        """Run the agent in the background, asynchronously. See `submit_job`."""
+        request = self._job_request(message, model, thread_id, agent_config)
+        try:
+            response = await self._asend(
+                lambda: self.async_client.post(
+                    f"{self.base_url}/{self.agent}/jobs",
+                    json=request.model_dump(),
+                    headers=self._headers,
+                    timeout=self.timeout,
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.asubmit_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    def get_job(self, job_id: str) -> JobInfo:
+        """Get the status of a job and, once it succeeded, its output."""
+        try:
+            response = self._send(
+                lambda: self.client.get(
+                    f"{self.base_url}/jobs/{job_id}", headers=self._headers, timeout=self.timeout
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.get_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    async def aget_job(self, job_id: str) -> JobInfo:
+        """Get the status of a job and, once it succeeded, its output, asynchronously."""
+        try:
+            response = await self._asend(
+                lambda: self.async_client.get(
+                    f"{self.base_url}/jobs/{job_id}", headers=self._headers, timeout=self.timeout
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.aget_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    def cancel_job(self, job_id: str) -> JobInfo:
+        """Cancel a queued or running job."""
+        try:
+            response = self._send(
+                lambda: self.client.delete(
+                    f"{self.base_url}/jobs/{job_id}", headers=self._headers, timeout=self.timeout
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.cancel_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    async def acancel_job(self, job_id: str) -> JobInfo:
+        """Cancel a queued or running job, asynchronously."""
+        try:
+            response = await self._asend(
+                lambda: self.async_client.delete(
+                    f"{self.base_url}/jobs/{job_id}", headers=self._headers, timeout=self.timeout
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.acancel_job > Error: %s", e)
+            self._raise_error(e)
+        return JobInfo.model_validate(response.json())
+
+    def wait_for_job(
+        self, job_id: str, poll_interval: float = 1.0, timeout: float | None = None
+    ) -> JobInfo:
+        """
+        Poll a job until it is done.
+
+        Args:
+            job_id (str): The job to wait for
+            poll_interval (float, optional): Seconds between polls. Default: 1.0
+            timeout (float, optional): Seconds to wait before raising AgentClientError
+
+        Returns:
+            JobInfo: The finished job
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not (job := self.get_job(job_id)).done:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise AgentClientError(f"Job {job_id} is still {job.status}")
+            time.sleep(poll_interval)
+        return job
+
+    async def await_job(
+        self, job_id: str, poll_interval: float = 1.0, timeout: float | None = None
+    ) -> JobInfo:
+        """Poll a job until it is done, asynchronously. See `wait_for_job`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not (job := await self.aget_job(job_id)).done:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise AgentClientError(f"Job {job_id} is still {job.status}")
+            await asyncio.sleep(poll_interval)
+        return job
 
     async def acreate_feedback(
         self, run_id: str, key: str, score: float, kwargs: dict[str, Any] = {}
@@ -351,41 +757,122 @@ class AgentClient:
         See: https://api.smith.langchain.com/redoc#tag/feedback/operation/create_feedback_api_v1_feedback_post
         """
         request = Feedback(run_id=run_id, key=key, score=score, kwargs=kwargs)
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
+        try:
+            response = await self._asend(
+                lambda: self.async_client.post(
                     f"{self.base_url}/feedback",
                     json=request.model_dump(),
                     headers=self._headers,
                     timeout=self.timeout,
                 )
-                response.raise_for_status()
-                response.json()
-            except httpx.HTTPError as e:
-                logger.error("#> AgentClienta.acreate_feedback > Error: %s", e)
-                raise AgentClientError(f"Error: {e}") from e
+            )
+            response.json()
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.acreate_feedback > Error: %s", e)
+            self._raise_error(e)
+
+    @property
+    def _history_url(self) -> str:
+        # Before an agent is selected, the service reads the history of its default agent
+        if self.agent:
+            return f"{self.base_url}/{self.agent}/history"
+        return f"{self.base_url}/history"
 
     def get_history(
         self,
         thread_id: str,
+        limit: int | None = None,
+        before: int | None = None,
     ) -> ChatHistory:
         """
         Get chat history.
 
         Args:
             thread_id (str, optional): Thread ID for identifying a conversation
+            limit (int, optional): Maximum number of messages to get, the newest ones first
+            before (int, optional): Cursor of the page to get, `next_cursor` of the previous
+                page
+
+        Returns:
+            ChatHistory: The messages, oldest first, and the cursor of the preceding page
         """
-        request = ChatHistoryInput(thread_id=thread_id)
+        request = ChatHistoryInput(thread_id=thread_id, limit=limit, before=before)
         try:
-            response = httpx.post(
-                f"{self.base_url}/history",
-                json=request.model_dump(),
-                headers=self._headers,
-                timeout=self.timeout,
+            response = self._send(
+                lambda: self.client.post(
+                    self._history_url,
+                    json=request.model_dump(),
+                    headers=self._headers,
+                    timeout=self.timeout,
+                )
             )
-            response.raise_for_status()
         except httpx.HTTPError as e:
             logger.error("#> AgentClienta.get_history > Error: %s", e)
-            raise AgentClientError(f"Error: {e}") from e
+            self._raise_error(e)
 
         return ChatHistory.model_validate(response.json())
+
+    async def aget_history(
+        self,
+        thread_id: str,
+        limit: int | None = None,
+        before: int | None = None,
+    ) -> ChatHistory:
+        """Get chat history, asynchronously. See `get_history`."""
+        request = ChatHistoryInput(thread_id=thread_id, limit=limit, before=before)
+        try:
+            response = await self._asend(
+                lambda: self.async_client.post(
+                    self._history_url,
+                    json=request.model_dump(),
+                    headers=self._headers,
+                    timeout=self.timeout,
+                )
+            )
+        except httpx.HTTPError as e:
+            logger.error("#> AgentClienta.aget_history > Error: %s", e)
+            self._raise_error(e)
+
+        return ChatHistory.model_validate(response.json())
+
+    @staticmethod
+    def _parse_history_line(line: str) -> ChatMessage:
+        try:
+            return ChatMessage.model_validate_json(line)
+        except Exception as e:
+            logger.error("#> AgentClienta._parse_history_line > Error: %s", e)
+            raise AgentClientError(f"Server returned invalid history message: {e}") from e
+
+    def stream_history(
+        self,
+        thread_id: str,
+        limit: int | None = None,
+        before: int | None = None,
+    ) -> Generator[ChatMessage, None, None]:
+        """
+        Stream chat history, so long threads are not held in memory as a whole.
+
+        Args:
+            thread_id (str, optional): Thread ID for identifying a conversation
+            limit (int, optional): Maximum number of messages to get, the newest ones first
+            before (int, optional): Cursor of the page to get
+
+        Returns:
+            Generator[ChatMessage, None, None]: The messages, oldest first
+        """
+        request = ChatHistoryInput(thread_id=thread_id, limit=limit, before=before, stream=True)
+        with closing(self._stream_lines(self._history_url, request.model_dump())) as lines:
+            for line in lines:
+                yield self._parse_history_line(line)
+
+    async def astream_history(
+        self,
+        thread_id: str,
+        limit: int | None = None,
+        before: int | None = None,
+    ) -> AsyncGenerator[ChatMessage, None]:
+        """Stream chat history, asynchronously. See `stream_history`."""
+        request = ChatHistoryInput(thread_id=thread_id, limit=limit, before=before, stream=True)
+        async with aclosing(self._astream_lines(self._history_url, request.model_dump())) as lines:
+            async for line in lines:
+                yield self._parse_history_line(line)
@@ -0,0 +1,165 @@
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# A POST that failed with another status may have run the agent, or submitted a job or
+# feedback, which a retry would do a second time. These two mean it was turned away.
+DEFAULT_NON_IDEMPOTENT_RETRY_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Errors raised before the request was sent, so that it never reached the server
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of the requests made, so an outage is not amplified by every
+    caller retrying every request.
+
+    Each request deposits `ratio` tokens and each retry withdraws one, with the balance capped
+    at `capacity`. The budget starts with `initial` tokens, so a fresh or mostly idle client
+    can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, initial: float = 10, capacity: float = 100) -> None:
+        self.ratio = ratio
+        self.capacity = capacity
+        self._balance = float(initial)
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._balance = min(self._balance + self.ratio, self.capacity)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a failed request.
+
+    Requests with an idempotent method are retried on transport errors and on the status codes
+    in `retry_statuses`. Other requests (POSTs) are only retried when they were not sent or
+    were turned away with one of `non_idempotent_retry_statuses`, so that an agent run is never
+    repeated. Retries happen up to `max_retries` times, waiting an exponentially growing,
+    jittered delay or the delay requested by the server's `Retry-After` header (capped at
+    `max_retry_after`).
+    """
+
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    jitter: float = 0.5
+    max_retry_after: float = 60.0
+    retry_statuses: frozenset[int] = DEFAULT_RETRY_STATUSES
+    non_idempotent_retry_statuses: frozenset[int] = DEFAULT_NON_IDEMPOTENT_RETRY_STATUSES
+    retry_connection_errors: bool = True
+    budget: RetryBudget | None = field(default_factory=RetryBudget)
+
+    def record_request(self) -> None:
+        """Count a new request (not a retry) towards the retry budget."""
+        if self.budget is not None:
+            self.budget.record_request()
+
+    def is_retryable(self, error: Exception) -> bool:
+        idempotent = _method(error) in IDEMPOTENT_METHODS
+        if isinstance(error, httpx.HTTPStatusError):
+            statuses = self.retry_statuses if idempotent else self.non_idempotent_retry_statuses
+            return error.response.status_code in statuses
+        if isinstance(error, httpx.TransportError):
+            return self.retry_connection_errors and (
+                idempotent or isinstance(error, NOT_SENT_ERRORS)
+            )
+        return False
+
+    def should_retry(self, attempt: int, error: Exception) -> bool:
+        """Whether to retry after `attempt` (starting at 0) failed with `error`."""
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return False
+        return self.budget is None or self.budget.try_withdraw()
+
+    def delay(self, attempt: int, error: Exception | None = None) -> float:
+        """Seconds to wait before retrying after `attempt` (starting at 0) failed."""
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+        backoff = min(self.backoff_base * 2**attempt, self.backoff_max)
+        return backoff * (1 - self.jitter * random.random())
+
+    def call(
+        self, fn: Callable[[], T], on_retry: Callable[[int, Exception], None] | None = None
+    ) -> T:
+        """Call `fn`, retrying it according to this policy."""
+        self.record_request()
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except httpx.HTTPError as e:
+                if not self.should_retry(attempt, e):
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, e)
+                time.sleep(self.delay(attempt, e))
+                attempt += 1
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        on_retry: Callable[[int, Exception], None] | None = None,
+    ) -> T:
+        """Await `fn()`, retrying it according to this policy."""
+        self.record_request()
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except httpx.HTTPError as e:
+                if not self.should_retry(attempt, e):
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, e)
+                await asyncio.sleep(self.delay(attempt, e))
+                attempt += 1
+
+
+def _method(error: Exception) -> str | None:
+    """The method of the request that failed with `error`, if it is known."""
+    try:
+        return error.request.method  # type: ignore[attr-defined]
+    except (AttributeError, RuntimeError):
+        return None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a `Retry-After` header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
@@ -1,8 +1,15 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
 from functools import cache
-from typing import TypeAlias
+from typing import Literal, TypeAlias
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
 
+from core.metrics import EMBEDDING_DURATION
+from core.settings import settings
 from schemas.models import (
     GoogleModelName,
 )
@@ -12,11 +19,178 @@ _MODEL_TABLE = {
     GoogleModelName.GEMINI_2_FLASH: "gemini-2.0-flash"
 }
 
-EmbdModel: TypeAlias = GoogleGenerativeAIEmbeddings
+EMBEDDING_MODEL_NAME = "models/text-embedding-004"
+
+# Queries and documents may be embedded differently (e.g. Google's task types), so the kind of
+# text is part of the cache key.
+EmbeddingKind: TypeAlias = Literal["query", "document"]
+CacheKey: TypeAlias = tuple[str, EmbeddingKind, str]
+
+
+class SqliteEmbeddingStore:
+    """Persistent embedding cache tier backed by a SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "model TEXT, kind TEXT, text_hash TEXT, vector BLOB, "
+                "PRIMARY KEY (model, kind, text_hash))"
+            )
+
+    def get(self, key: CacheKey) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embedding_cache WHERE model = ? AND kind = ? AND text_hash = ?",
+                key,
+            ).fetchone()
+        return array("d", row[0]).tolist() if row else None
+
+    def set(self, key: CacheKey, vector: list[float]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?)",
+                (*key, array("d", vector).tobytes()),
+            )
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from a cache.
+
+    Vectors are keyed by (model name, kind, SHA-256 of the text) and kept in an in-memory LRU
+    tier of `max_size` entries, backed by an optional persistent SQLite tier.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        max_size: int = 10_000,
+        store: SqliteEmbeddingStore | None = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_size = max_size
+        self.store = store
+        self._memory: OrderedDict[CacheKey, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _key(self, kind: EmbeddingKind, text: str) -> CacheKey:
+        return (self.model_name, kind, hashlib.sha256(text.encode()).hexdigest())
+
+    def _lookup(self, key: CacheKey) -> list[float] | None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        vector = self.store.get(key) if self.store else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.persistent_hits += 1
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: CacheKey, vector: list[float]) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: CacheKey, vector: list[float]) -> None:
+        self._remember(key, vector)
+        if self.store:
+            self.store.set(key, vector)
+
+    def _split(
+        self, texts: list[str]
+    ) -> tuple[list[CacheKey], dict[CacheKey, list[float]], dict[CacheKey, str]]:
+        """Return the keys of `texts`, the cached vectors and the unique texts to embed."""
+        keys = [self._key("document", text) for text in texts]
+        found: dict[CacheKey, list[float]] = {}
+        missing: dict[CacheKey, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self._lookup(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        return keys, found, missing
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._split(texts)
+        if missing:
+            with EMBEDDING_DURATION.time(model=self.model_name):
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+            for key, vector in zip(missing, vectors):
+                self._store(key, vector)
+                found[key] = vector
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._split(texts)
+        if missing:
+            with EMBEDDING_DURATION.time(model=self.model_name):
+                vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            for key, vector in zip(missing, vectors):
+                self._store(key, vector)
+                found[key] = vector
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key("query", text)
+        vector = self._lookup(key)
+        if vector is None:
+            with EMBEDDING_DURATION.time(model=self.model_name):
+                vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key("query", text)
+        vector = self._lookup(key)
+        if vector is None:
+            with EMBEDDING_DURATION.time(model=self.model_name):
+                vector = await self.embeddings.aembed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "size": len(self._memory),
+        }
+
+
+EmbdModel: TypeAlias = CachedEmbeddings
 
 @cache
 def get_embedding_model() -> EmbdModel:
     # NOTE: models with streaming=True will send tokens as they are generated
     # if the /stream endpoint is called with stream_tokens=True (the default)
+    # Imported here, as the Google client takes about a second to import
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
-    return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    store = None
+    if settings.EMBEDDING_CACHE_PATH:
+        store = SqliteEmbeddingStore(settings.EMBEDDING_CACHE_PATH)
+    return CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL_NAME),
+        model_name=EMBEDDING_MODEL_NAME,
+        max_size=settings.EMBEDDING_CACHE_SIZE,
+        store=store,
+    )
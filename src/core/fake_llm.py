@@ -0,0 +1,147 @@
+"""
+Fake chat model that simulates a provider, for load tests and benchmarks.
+
+Unlike FakeListChatModel, which returns one fixed string at once, `SimulatedChatModel` streams
+its answer token by token after a first-token latency, with a random answer length, can call
+the tools bound to it and can fail like a provider would. get_model() returns it for the fake
+model when FAKE_MODEL_SIMULATED is set (see the FAKE_MODEL_* settings).
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+from uuid import uuid4
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+    generate_from_stream,
+)
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, PrivateAttr
+
+WORDS = (
+    "a agência regula os serviços de telecomunicações e define as regras de numeração "
+    "espectro qualidade e atendimento aos usuários conforme as resoluções vigentes"
+).split()
+
+
+class FakeModelError(RuntimeError):
+    """Error injected by SimulatedChatModel, in place of a provider error."""
+
+
+class SimulatedChatModel(BaseChatModel):
+    """Fake chat model with the latency, token rate and failures of a real provider."""
+
+    first_token_latency: float = Field(default=0.5, ge=0, description="Seconds")
+    token_delay: float = Field(default=0.02, ge=0, description="Seconds between tokens")
+    # Answer lengths follow a normal distribution, of at least one token
+    response_tokens: int = Field(default=100, ge=1)
+    response_tokens_stddev: float = Field(default=0.0, ge=0)
+    # Chance that an answer to a user message calls the first bound tool instead
+    tool_call_rate: float = Field(default=0.0, ge=0, le=1)
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+    seed: int | None = None
+
+    _random: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated-fake"
+
+    def bind_tools(
+        self, tools: Sequence[Any], **kwargs: Any
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _plan(self, messages: list[BaseMessage], tools: list[dict] | None) -> list[AIMessageChunk]:
+        """The chunks of the next answer."""
+        if self._random.random() < self.error_rate:
+            raise FakeModelError("Simulated model error")
+        message_id = f"run-{uuid4()}"
+        if tools and isinstance(messages[-1], HumanMessage):
+            if self._random.random() < self.tool_call_rate:
+                function = tools[0]["function"]
+                required = function.get("parameters", {}).get("required", [])
+                args = {name: messages[-1].text() for name in required}
+                tool_call_chunk = {
+                    "name": function["name"],
+                    "args": json.dumps(args),
+                    "id": f"call_{uuid4().hex}",
+                    "index": 0,
+                }
+                return [
+                    AIMessageChunk(content="", id=message_id, tool_call_chunks=[tool_call_chunk])
+                ]
+        tokens = max(
+            1, round(self._random.gauss(self.response_tokens, self.response_tokens_stddev))
+        )
+        return [
+            AIMessageChunk(content=(" " if i else "") + WORDS[i % len(WORDS)], id=message_id)
+            for i in range(tokens)
+        ]
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        tools: list[dict] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        delay = self.first_token_latency
+        chunks = self._plan(messages, tools)
+        for chunk in chunks:
+            time.sleep(delay)
+            delay = self.token_delay
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        tools: list[dict] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        delay = self.first_token_latency
+        chunks = self._plan(messages, tools)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            delay = self.token_delay
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
@@ -1,14 +1,7 @@
 from functools import cache
-from typing import TypeAlias
-
-from langchain_anthropic import ChatAnthropic
-from langchain_aws import ChatBedrock
-from langchain_community.chat_models import FakeListChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from typing import TYPE_CHECKING, TypeAlias
 
+from core.metrics import LLMMetricsHandler
 from core.settings import settings
 from schemas.models import (
     AllModelEnum,
@@ -21,6 +14,7 @@ from schemas.models import (
     GroqModelName,
     OllamaModelName,
     OpenAIModelName,
+    Provider,
 )
 
 _MODEL_TABLE = {
@@ -45,13 +39,43 @@ _MODEL_TABLE = {
     FakeModelName.FAKE: "fake",
 }
 
+_PROVIDERS = {
+    OpenAIModelName: Provider.OPENAI,
+    AzureOpenAIModelName: Provider.AZURE_OPENAI,
+    DeepseekModelName: Provider.DEEPSEEK,
+    AnthropicModelName: Provider.ANTHROPIC,
+    GoogleModelName: Provider.GOOGLE,
+    GroqModelName: Provider.GROQ,
+    AWSModelName: Provider.AWS,
+    OllamaModelName: Provider.OLLAMA,
+    FakeModelName: Provider.FAKE,
+}
+
+# Provider packages take seconds to import together, so each is imported by get_model() when
+# one of its models is first used
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
+    from langchain_aws import ChatBedrock
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_groq import ChatGroq
+    from langchain_ollama import ChatOllama
+    from langchain_openai import ChatOpenAI
+
 ModelT: TypeAlias = (
-    ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock | ChatOllama
+    "ChatOpenAI | ChatAnthropic | ChatGoogleGenerativeAI | ChatGroq | ChatBedrock | ChatOllama"
 )
 
 
 @cache
 def get_model(model_name: AllModelEnum, /) -> ModelT:
+    model = _create_model(model_name)
+    # Each call of the model is timed for /metrics, also when the model is bound to tools
+    provider = next(p for names, p in _PROVIDERS.items() if model_name in names)
+    model.callbacks = [LLMMetricsHandler(provider)]
+    return model
+
+
+def _create_model(model_name: AllModelEnum) -> ModelT:
     # NOTE: models with streaming=True will send tokens as they are generated
     # if the /stream endpoint is called with stream_tokens=True (the default)
     api_model_name = _MODEL_TABLE.get(model_name)
@@ -59,8 +83,12 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
         raise ValueError(f"Unsupported model: {model_name}")
 
     if model_name in OpenAIModelName:
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in AzureOpenAIModelName:
+        from langchain_openai import AzureChatOpenAI
+
         if not settings.AZURE_OPENAI_API_KEY or not settings.AZURE_OPENAI_ENDPOINT:
             raise ValueError("Azure OpenAI API key and endpoint must be configured")
         return AzureChatOpenAI(
@@ -73,6 +101,8 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
             max_retries=3,
         )
     if model_name in DeepseekModelName:
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(
             model=api_model_name,
             temperature=0.5,
@@ -81,16 +111,26 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
             openai_api_key=settings.DEEPSEEK_API_KEY,
         )
     if model_name in AnthropicModelName:
+        from langchain_anthropic import ChatAnthropic
+
         return ChatAnthropic(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in GoogleModelName:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         return ChatGoogleGenerativeAI(model=api_model_name, temperature=0.5, streaming=True)
     if model_name in GroqModelName:
+        from langchain_groq import ChatGroq
+
         if model_name == GroqModelName.LLAMA_GUARD_3_8B:
             return ChatGroq(model=api_model_name, temperature=0.0)
         return ChatGroq(model=api_model_name, temperature=0.5)
     if model_name in AWSModelName:
+        from langchain_aws import ChatBedrock
+
         return ChatBedrock(model_id=api_model_name, temperature=0.5)
     if model_name in OllamaModelName:
+        from langchain_ollama import ChatOllama
+
         if settings.OLLAMA_BASE_URL:
             chat_ollama = ChatOllama(
                 model=settings.OLLAMA_MODEL, temperature=0.5, base_url=settings.OLLAMA_BASE_URL
@@ -99,4 +139,18 @@ def get_model(model_name: AllModelEnum, /) -> ModelT:
             chat_ollama = ChatOllama(model=settings.OLLAMA_MODEL, temperature=0.5)
         return chat_ollama
     if model_name in FakeModelName:
+        if settings.FAKE_MODEL_SIMULATED:
+            from core.fake_llm import SimulatedChatModel
+
+            return SimulatedChatModel(
+                first_token_latency=settings.FAKE_MODEL_FIRST_TOKEN_LATENCY,
+                token_delay=settings.FAKE_MODEL_TOKEN_DELAY,
+                response_tokens=settings.FAKE_MODEL_RESPONSE_TOKENS,
+                response_tokens_stddev=settings.FAKE_MODEL_RESPONSE_TOKENS_STDDEV,
+                tool_call_rate=settings.FAKE_MODEL_TOOL_CALL_RATE,
+                error_rate=settings.FAKE_MODEL_ERROR_RATE,
+                seed=settings.FAKE_MODEL_SEED,
+            )
+        from langchain_community.chat_models import FakeListChatModel
+
         return FakeListChatModel(responses=["This is a test response from the fake model."])
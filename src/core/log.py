@@ -0,0 +1,216 @@
+"""
+Logging of the service.
+
+Modules get their logger from `get_logger(__name__)`. All of them share one `QueueHandler`: the
+calling thread (usually the event loop) only filters the record and puts it on a bounded queue,
+and a `QueueListener` thread formats and writes it. When the queue is full, records are dropped
+and counted instead of blocking the caller.
+
+In the calling thread, `ContextFilter`:
+
+- adds the ID of the current request (see `RequestLoggingMiddleware`) to every record,
+- drops records below WARNING of requests that were not sampled (LOG_SAMPLE_RATES),
+- truncates long arguments, so a record costs the same whatever the size of the payload.
+"""
+
+import atexit
+import copy
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from functools import cache
+from logging.handlers import QueueHandler, QueueListener
+from numbers import Number
+from typing import Any
+from uuid import uuid4
+
+import orjson
+
+from core.settings import settings
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+# Whether records below WARNING are kept for the current request
+sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+# Attributes every LogRecord has, anything else was passed with `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """
+    The string of `value`, cut to its first `max_chars` characters if longer.
+
+    Scalars are kept as they are. Anything else is replaced by its string, so that the record
+    is formatted on the listener thread as it was when logged, even if the value changes.
+    """
+    if value is None or isinstance(value, Number):
+        return value
+    text = str(value)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... ({len(text)} chars)"
+
+
+def _extras(record: logging.LogRecord) -> dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+
+
+class ContextFilter(logging.Filter):
+    """Adds the request ID, applies request sampling and truncates arguments."""
+
+    def __init__(self, max_chars: int = settings.LOG_MAX_FIELD_CHARS) -> None:
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and not sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        if not record.args:
+            # A message with arguments is a format string, only its arguments are truncated
+            record.msg = truncate(record.msg, self.max_chars)
+        elif isinstance(record.args, tuple):
+            record.args = tuple(truncate(arg, self.max_chars) for arg in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {k: truncate(v, self.max_chars) for k, v in record.args.items()}
+        for key, value in _extras(record).items():
+            setattr(record, key, truncate(value, self.max_chars))
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as text lines with `key=value` extras, or as JSON objects."""
+
+    def __init__(self, json: bool = False) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        self.json = json
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = _extras(record)
+        if self.json:
+            entry = {
+                "time": record.created,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                "request_id": getattr(record, "request_id", None),
+                **extras,
+            }
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return orjson.dumps(entry, default=str).decode()
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        fields = ({"request_id": request_id} if request_id else {}) | extras
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare() formats the record, on the calling thread, and drops its
+        # exception. A copy is queued as is, so the listener formats it, exception included.
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+
+@cache
+def get_log_handler() -> DroppingQueueHandler:
+    """The handler shared by all loggers, starting its listener thread on first use."""
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(StructuredFormatter(json=settings.LOG_FORMAT == "json"))
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    # Writes the records still queued when the process exits
+    atexit.register(listener.stop)
+    return handler
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger writing through the shared queue handler at LOG_LEVEL."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.setLevel(settings.LOG_LEVEL)
+        logger.addHandler(get_log_handler())
+        # Not passed on to the root logger, which may have a handler of its own
+        logger.propagate = False
+    return logger
+
+
+def sample_rate(path: str) -> float:
+    """Share of requests to `path` whose INFO records are logged, by path or last segment."""
+    rates = settings.LOG_SAMPLE_RATES
+    if path in rates:
+        return rates[path]
+    return rates.get("/" + path.rstrip("/").rsplit("/", 1)[-1], 1.0)
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware that gives each HTTP request an ID and logs one line when it completes.
+
+    The ID is taken from the X-Request-ID header or generated, returned in the X-Request-ID
+    response header and added to every record logged while handling the request. Whether the
+    request's records below WARNING are logged is decided once, by its path's sample rate.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.logger = get_logger("service.access")
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid4().hex
+        path = scope.get("path", "")
+        rate = sample_rate(path)
+        request_id_token = request_id_var.set(request_id)
+        sampled_token = sampled_var.set(rate >= 1 or random.random() < rate)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            self.logger.log(
+                logging.WARNING if status >= 500 else logging.INFO,
+                "%s %s",
+                scope.get("method", ""),
+                path,
+                extra={"status": status, "ms": round((time.perf_counter() - start) * 1000, 1)},
+            )
+            sampled_var.reset(sampled_token)
+            request_id_var.reset(request_id_token)
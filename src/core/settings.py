@@ -1,6 +1,6 @@
 from enum import StrEnum
 from json import loads
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
 from dotenv import find_dotenv
 from pydantic import (
@@ -53,6 +53,25 @@ class Settings(BaseSettings):
 
     AUTH_SECRET: SecretStr | None = None
 
+    # Logging (see core/log.py). LOG_SAMPLE_RATES maps paths, or their last segment like
+    # "/stream", to the share of requests whose INFO records are logged, e.g. {"/stream": 0.1}.
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_MAX_FIELD_CHARS: int = Field(
+        default=500, description="Characters of a logged argument, longer ones are truncated"
+    )
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    LOG_QUEUE_SIZE: int = Field(
+        default=10_000, description="Records waiting to be written before new ones are dropped"
+    )
+
+    # Profile every agent run for GET /profile, not only those of requests with `profile`
+    PROFILE_ALL_RUNS: bool = False
+
+    # IDs of the agents the service serves, as a JSON list (all agents if unset). Only the
+    # modules of enabled agents are imported, when an agent is first used.
+    ENABLED_AGENTS: list[str] | None = Field(default=None, min_length=1)
+
     OPENAI_API_KEY: SecretStr | None = None
     DEEPSEEK_API_KEY: SecretStr | None = None
     ANTHROPIC_API_KEY: SecretStr | None = None
@@ -62,6 +81,20 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str | None = None
     OLLAMA_BASE_URL: str | None = None
     USE_FAKE_MODEL: bool = False
+    # The fake model answers with one fixed string at once, unless it simulates a provider
+    # (see core.fake_llm): latency, streamed tokens, answer lengths, tool calls and errors.
+    FAKE_MODEL_SIMULATED: bool = False
+    FAKE_MODEL_FIRST_TOKEN_LATENCY: float = Field(default=0.5, ge=0, description="Seconds")
+    FAKE_MODEL_TOKEN_DELAY: float = Field(default=0.02, ge=0, description="Seconds per token")
+    FAKE_MODEL_RESPONSE_TOKENS: int = Field(default=100, ge=1, description="Mean answer length")
+    FAKE_MODEL_RESPONSE_TOKENS_STDDEV: float = Field(default=0.0, ge=0)
+    FAKE_MODEL_TOOL_CALL_RATE: float = Field(
+        default=0.0, ge=0, le=1, description="Share of answers to users that call a bound tool"
+    )
+    FAKE_MODEL_ERROR_RATE: float = Field(
+        default=0.0, ge=0, le=1, description="Share of calls that fail"
+    )
+    FAKE_MODEL_SEED: int | None = None
 
     # If DEFAULT_MODEL is None, it will be set in model_post_init
     DEFAULT_MODEL: AllModelEnum | None = None  # type: ignore[assignment]
@@ -69,6 +102,17 @@ class Settings(BaseSettings):
 
     OPENWEATHERMAP_API_KEY: SecretStr | None = None
 
+    # LlamaGuard safety checks (enabled when GROQ_API_KEY is set).
+    # "serial" checks the input before calling the model, "parallel" checks it concurrently
+    # with the first model call and discards that call if the input is unsafe.
+    LLAMA_GUARD_MODE: Literal["serial", "parallel"] = "serial"
+    # If > 0, also check the answer while it streams, every this many characters
+    LLAMA_GUARD_STREAM_CHECK_CHARS: int = 0
+    # Verdicts cached by role and conversation hash (0 disables the cache)
+    LLAMA_GUARD_CACHE_SIZE: int = 1024
+    # If set, only the newest N user/agent messages are sent to LlamaGuard
+    LLAMA_GUARD_CONTEXT_MESSAGES: int | None = None
+
     LANGCHAIN_TRACING_V2: bool = False
     LANGCHAIN_PROJECT: str = "default"
     LANGCHAIN_ENDPOINT: Annotated[str, BeforeValidator(check_str_is_http)] = (
@@ -81,6 +125,19 @@ class Settings(BaseSettings):
         DatabaseType.SQLITE
     )  # Options: DatabaseType.SQLITE or DatabaseType.POSTGRES
     SQLITE_DB_PATH: str = "checkpoints.db"
+    SQLITE_TUNED: bool = Field(
+        default=False,
+        description="Use synchronous=NORMAL, mmap and a pool of read connections for SQLite",
+    )
+    SQLITE_READERS: int = Field(
+        default=4, ge=0, description="Read-only connections of the tuned SQLite checkpointer"
+    )
+    SQLITE_MMAP_SIZE: int = Field(
+        default=256 * 1024 * 1024, description="Bytes of the database file SQLite memory-maps"
+    )
+    SQLITE_BUSY_TIMEOUT: float = Field(
+        default=5, description="Seconds to wait for a lock held by another connection"
+    )
 
     # PostgreSQL Configuration
     POSTGRES_USER: str | None = None
@@ -94,7 +151,117 @@ class Settings(BaseSettings):
     POSTGRES_MIN_SIZE: int = Field(
         default=3, description="Minimum number of connections in the pool"
     )
-    POSTGRES_MAX_IDLE: int = Field(default=5, description="Maximum number of idle connections")
+    POSTGRES_MAX_IDLE: float = Field(
+        default=300, description="Seconds a connection above the minimum may stay idle"
+    )
+    POSTGRES_POOL_TIMEOUT: float = Field(
+        default=30, description="Seconds to wait for a free connection before failing"
+    )
+
+    # In-memory checkpointer, used by the agents until the service opens its database and by
+    # scripts that run agents directly. None disables a limit.
+    CHECKPOINT_MEMORY_MAX_THREADS: int | None = Field(
+        default=1000, description="Threads kept, least recently used ones are evicted first"
+    )
+    CHECKPOINT_MEMORY_MAX_CHECKPOINTS: int | None = Field(
+        default=20, description="Newest checkpoints kept per thread"
+    )
+    CHECKPOINT_MEMORY_MAX_BYTES: int | None = Field(
+        default=256 * 1024 * 1024, description="Serialized checkpoint bytes kept in total"
+    )
+    CHECKPOINT_MEMORY_TTL: float | None = Field(
+        default=24 * 3600, description="Seconds an unused thread is kept"
+    )
+
+    # Compaction of the checkpoint database (SQLite or PostgreSQL), run with
+    # `python run_compaction.py` or periodically by the service. None disables a rule.
+    CHECKPOINT_KEEP_LAST: int | None = Field(
+        default=20, ge=1, description="Newest checkpoints kept per thread"
+    )
+    CHECKPOINT_THREAD_TTL: float | None = Field(
+        default=None, description="Seconds after its last checkpoint that a thread is deleted"
+    )
+    CHECKPOINT_COMPACTION_INTERVAL: float | None = Field(
+        default=None, description="Seconds between compactions run by the service"
+    )
+
+    # pgvector database (AGENT_PGVECTOR_*) connection pool
+    PGVECTOR_POOL_SIZE: int = Field(
+        default=5, description="Number of connections kept open in the pgvector pool"
+    )
+    PGVECTOR_MAX_OVERFLOW: int = Field(
+        default=10, description="Connections allowed beyond PGVECTOR_POOL_SIZE under load"
+    )
+    PGVECTOR_POOL_RECYCLE: int = Field(
+        default=1800, description="Seconds after which a pooled connection is replaced"
+    )
+
+    # /{agent_id}/batch limits
+    BATCH_MAX_CONCURRENCY: int = Field(
+        default=8, description="Maximum inputs of a batch request run at once"
+    )
+    BATCH_MAX_SIZE: int = Field(default=1000, description="Maximum inputs in a batch request")
+
+    # Background jobs (/{agent_id}/jobs): worker limits and where results are kept
+    JOB_STORE: Literal["sqlite", "memory"] = "sqlite"
+    JOB_DB_PATH: str = Field(default="jobs.db", description="SQLite file of the job store")
+    JOB_MAX_WORKERS: int = Field(default=4, description="Jobs run at once")
+    JOB_MAX_PENDING: int = Field(
+        default=100, description="Jobs waiting for a worker before new ones are rejected"
+    )
+    JOB_RESULT_TTL: float = Field(default=3600, description="Seconds finished jobs are kept")
+    JOB_RETRY_AFTER: int = Field(
+        default=5, description="Retry-After seconds sent when the job queue is full"
+    )
+
+    # /stream token events: consecutive tokens are joined into one event when enabled
+    STREAM_TOKEN_FLUSH_INTERVAL: float = Field(
+        default=0, description="Maximum seconds a token is held back to be joined, 0 disables"
+    )
+    STREAM_TOKEN_MAX_CHARS: int = Field(
+        default=64, description="Characters of joined tokens that are sent without waiting"
+    )
+
+    # Response cache for stateless /invoke and /stream requests (without thread_id)
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL: float = Field(default=3600, description="Seconds a response is reused")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=1000, description="Responses kept in memory")
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float | None = Field(
+        default=None,
+        description="Cosine similarity for semantic hits, e.g. 0.95. Exact matches only if unset",
+    )
+
+    # Embedding cache: in-memory LRU entries, plus an optional persistent SQLite file
+    EMBEDDING_CACHE_SIZE: int = Field(default=10_000, description="Embeddings kept in memory")
+    EMBEDDING_CACHE_PATH: str | None = Field(
+        default=None, description="SQLite file for the persistent embedding cache tier"
+    )
+
+    # Background writer for /analyze-code history records
+    HISTORY_WRITER_QUEUE_SIZE: int = Field(
+        default=1000, description="Pending records before /analyze-code waits for the writer"
+    )
+    HISTORY_WRITER_BATCH_SIZE: int = Field(default=50, description="Records inserted per commit")
+    HISTORY_WRITER_FLUSH_INTERVAL: float = Field(
+        default=1.0, description="Maximum seconds a record waits before being written"
+    )
+
+    # Context window of each model call: system prompt plus the newest turns that fit
+    CONTEXT_MAX_TOKENS: int | None = Field(
+        default=16_000, description="Approximate prompt token budget, None disables trimming"
+    )
+    CONTEXT_AGENT_MAX_TOKENS: dict[str, int] = Field(
+        default_factory=dict, description="Per-agent overrides of CONTEXT_MAX_TOKENS by agent id"
+    )
+    CONTEXT_MAX_TURNS: int | None = Field(
+        default=None, description="Maximum user turns sent to the model, regardless of tokens"
+    )
+    CONTEXT_SUMMARIZE: bool = Field(
+        default=False, description="Keep a rolling summary of the messages trimmed from context"
+    )
+
+    # Resolutions indexing: run the incremental ingestion pipeline in the background on startup
+    RESOLUTIONS_INGEST_ON_STARTUP: bool = False
 
     # Azure OpenAI Settings
     AZURE_OPENAI_API_KEY: SecretStr | None = None
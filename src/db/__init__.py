@@ -1,3 +1,8 @@
-from db.agent_model import AnalysisHistory, DatabaseManager 
+from db.agent_model import (
+    AnalysisHistory,
+    DatabaseManager,
+    IngestionRecord,
+    get_database_manager,
+)
 
-__all__ = ["AnalysisHistory", "DatabaseManager"]
+__all__ = ["AnalysisHistory", "DatabaseManager", "IngestionRecord", "get_database_manager"]
@@ -1,26 +1,21 @@
-import logging
 import os
+import threading
 from datetime import UTC, datetime
+from functools import cache
+from typing import TYPE_CHECKING
 
-from langchain_postgres import PGVector
 from sqlalchemy import TIMESTAMP, Column, Integer, create_engine
-from sqlalchemy.dialects.postgresql import TEXT
+from sqlalchemy.dialects.postgresql import JSONB, TEXT
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from core.embedding import get_embedding_model
+from core.log import get_logger
+from core.settings import settings
 
-logger = logging.getLogger(__name__)
-# Set the log level to INFO
-logger.setLevel(logging.INFO)
-# Prevent duplicate logs
-logger.propagate = False  
-# Check if the logger already has handlers to prevent duplicate entries
-if not logger.handlers:
-    # Add a handler (e.g., to console) if one doesn't already exist.
-    handler = logging.StreamHandler()  # Sends logs to the console
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+if TYPE_CHECKING:
+    from langchain_postgres import PGVector
+
+logger = get_logger(__name__)
 
 Base = declarative_base()
 
@@ -34,7 +29,25 @@ class AnalysisHistory(Base):
     created_at = Column(TIMESTAMP)
 
 
+class IngestionRecord(Base):
+    """Last indexed state of a source document, used to skip unchanged sources."""
+
+    __tablename__ = "ingestion_record"
+
+    url = Column(TEXT, primary_key=True)
+    collection_name = Column(TEXT, primary_key=True)
+    content_hash = Column(TEXT)
+    chunk_ids = Column(JSONB)
+    indexed_at = Column(TIMESTAMP)
+
+
 class DatabaseManager:
+    """
+    Access to the pgvector database through a pooled SQLAlchemy engine.
+
+    Use `get_database_manager()` to share a single instance (and its connection pool and
+    vector stores) across the whole process instead of constructing one per call.
+    """
 
     def __init__(self) -> None:
 
@@ -44,9 +57,20 @@ class DatabaseManager:
         AGENT_PGVECTOR_DB = os.environ["AGENT_PGVECTOR_DB"]
 
         self.db_url = f"postgresql+psycopg://{AGENT_PGVECTOR_USER}:{AGENT_PGVECTOR_PWD}@{AGENT_PGVECTOR_HOST}/{AGENT_PGVECTOR_DB}"
-        self.engine = create_engine(self.db_url)
-        Base.metadata.create_all(self.engine)
+        self.engine = create_engine(
+            self.db_url,
+            pool_size=settings.PGVECTOR_POOL_SIZE,
+            max_overflow=settings.PGVECTOR_MAX_OVERFLOW,
+            pool_recycle=settings.PGVECTOR_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
         self.Session = sessionmaker(bind=self.engine)
+        self._vector_stores: dict[str, PGVector] = {}
+        self._vector_stores_lock = threading.Lock()
+
+
+    def create_schema(self) -> None:
+        Base.metadata.create_all(self.engine)
 
 
     def add_record(self, code_snippet: str, suggestions: str) -> None:
@@ -63,15 +87,93 @@ class DatabaseManager:
         session.close()
 
 
+    def add_records(self, records: list[dict]) -> None:
+        """Insert many AnalysisHistory rows in a single transaction."""
+        session = self.Session()
+        try:
+            session.add_all([AnalysisHistory(**record) for record in records])
+            session.commit()
+        finally:
+            session.close()
+
+
+    def get_ingestion_record(self, url: str, collection_name: str) -> IngestionRecord | None:
+        session = self.Session()
+        try:
+            return session.get(IngestionRecord, (url, collection_name))
+        finally:
+            session.close()
+
+
+    def get_indexed_chunk_ids(
+        self, collection_name: str, exclude_url: str | None = None
+    ) -> set[str]:
+        """Return the chunk IDs indexed for a collection by every source but `exclude_url`."""
+        session = self.Session()
+        try:
+            query = session.query(IngestionRecord.chunk_ids).filter(
+                IngestionRecord.collection_name == collection_name
+            )
+            if exclude_url is not None:
+                query = query.filter(IngestionRecord.url != exclude_url)
+            return {chunk_id for (chunk_ids,) in query for chunk_id in chunk_ids or []}
+        finally:
+            session.close()
+
+
+    def save_ingestion_record(
+        self, url: str, collection_name: str, content_hash: str, chunk_ids: list[str]
+    ) -> None:
+        session = self.Session()
+
+        record = IngestionRecord(
+            url=url,
+            collection_name=collection_name,
+            content_hash=content_hash,
+            chunk_ids=chunk_ids,
+            indexed_at=datetime.now(UTC),
+        )
+
+        session.merge(record)
+        session.commit()
+        session.close()
+
+
     def get_db_url(self) -> str:
         return self.db_url
     
 
-    def get_vector_store(self, collection_name: str) -> PGVector:
-        embedding_model = get_embedding_model()
-        return PGVector(
-            embeddings=embedding_model,
-            collection_name=collection_name,
-            connection=self.get_db_url(),
-            use_jsonb=True,
-        )
\ No newline at end of file
+    def get_vector_store(self, collection_name: str) -> "PGVector":
+        """Return the vector store of a collection, built once and sharing the engine's pool."""
+        # Imported here, so that services without retrieval don't pay its ~2s import
+        from langchain_postgres import PGVector
+
+        with self._vector_stores_lock:
+            if collection_name not in self._vector_stores:
+                self._vector_stores[collection_name] = PGVector(
+                    embeddings=get_embedding_model(),
+                    collection_name=collection_name,
+                    connection=self.engine,
+                    use_jsonb=True,
+                )
+            return self._vector_stores[collection_name]
+
+
+    def pool_status(self) -> dict[str, int]:
+        """Connection pool statistics, for monitoring."""
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
+
+@cache
+def get_database_manager() -> DatabaseManager:
+    """Return the process-wide DatabaseManager, creating the schema on first use."""
+    db_manager = DatabaseManager()
+    db_manager.create_schema()
+    logger.info("#> get_database_manager > pool: %s", db_manager.pool_status())
+    return db_manager
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from core.log import get_logger
+from core.settings import settings
+from db.agent_model import DatabaseManager, get_database_manager
+
+logger = get_logger(__name__)
+
+
+class AnalysisHistoryWriter:
+    """
+    Background writer that batches AnalysisHistory inserts off the event loop.
+
+    Records are queued by `submit()` and written by a single task, either when `batch_size`
+    records are pending or every `flush_interval` seconds. The queue is bounded, so callers
+    wait (backpressure) instead of growing memory when the database falls behind.
+    """
+
+    def __init__(
+        self,
+        db_manager_factory: Callable[[], DatabaseManager] = get_database_manager,
+        max_queue_size: int = settings.HISTORY_WRITER_QUEUE_SIZE,
+        batch_size: int = settings.HISTORY_WRITER_BATCH_SIZE,
+        flush_interval: float = settings.HISTORY_WRITER_FLUSH_INTERVAL,
+    ) -> None:
+        self.db_manager_factory = db_manager_factory
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.records_written = 0
+        self.records_failed = 0
+        self.batches_flushed = 0
+        self.last_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if not self.running:
+            # A fresh queue binds to the running event loop, keeping records queued so far.
+            pending = self._drain(self.queue.qsize())
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            for record in pending:
+                self.queue.put_nowait(record)
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="analysis-history-writer")
+
+    async def stop(self) -> None:
+        """Stop the writer once every queued record has been flushed."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    async def submit(self, code_snippet: str, suggestions: str) -> None:
+        """Queue a record, waiting for room if the queue is full."""
+        record = {
+            "code_snippet": code_snippet,
+            "suggestions": suggestions,
+            "created_at": datetime.now(UTC),
+        }
+        if not self.running:
+            # Without the background task (e.g. outside the app lifespan), write directly.
+            await self._flush([record])
+            return
+        await self.queue.put(record)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "records_written": self.records_written,
+            "records_failed": self.records_failed,
+            "batches_flushed": self.batches_flushed,
+            "last_flush_latency_seconds": self.last_flush_latency,
+            "avg_flush_latency_seconds": (
+                self.total_flush_latency / self.batches_flushed if self.batches_flushed else 0.0
+            ),
+        }
+
+    def _drain(self, limit: int) -> list[dict]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while not (self._stopping and self.queue.empty()):
+            await self._flush(await self._next_batch())
+
+    async def _next_batch(self) -> list[dict]:
+        """Collect records until the batch is full or the flush interval elapses."""
+        batch: list[dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            batch.extend(self._drain(self.batch_size - len(batch)))
+            timeout = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or timeout <= 0 or self._stopping:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            # The first call of the factory connects and creates the tables, off the loop too
+            await asyncio.to_thread(lambda: self.db_manager_factory().add_records(batch))
+        except Exception as e:
+            self.records_failed += len(batch)
+            logger.error("#> AnalysisHistoryWriter > failed to write %s records: %s", len(batch), e)
+            return
+        self.last_flush_latency = time.perf_counter() - started
+        self.total_flush_latency += self.last_flush_latency
+        self.batches_flushed += 1
+        self.records_written += len(batch)
+
+
+history_writer = AnalysisHistoryWriter()
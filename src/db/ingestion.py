@@ -0,0 +1,159 @@
+"""
+Incremental indexing of Anatel's resolutions into the pgvector store.
+
+Each source URL is loaded, hashed and compared against the `IngestionRecord` saved by the
+previous run. Unchanged sources are skipped entirely; for changed sources only chunks whose
+SHA-256 ID is not indexed yet are embedded, and chunks that disappeared are deleted. The record
+of a source is only written after its chunks were upserted, so an interrupted run is resumed
+by simply running the pipeline again.
+
+Run it with `python run_ingestion.py` or enable `RESOLUTIONS_INGEST_ON_STARTUP`.
+"""
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cache
+from typing import Literal
+
+from langchain_community.document_loaders import WebBaseLoader
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.log import get_logger
+from db.agent_model import DatabaseManager, get_database_manager
+
+logger = get_logger(__name__)
+
+RESOLUTIONS_COLLECTION = "resolutions_embd"
+RESOLUTION_URLS = [
+    # accessibility
+    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2016/905-resolucao-n-667",
+    # universalization
+    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2022/1689-resolucao-754",
+    # rgg
+    "https://informacoes.anatel.gov.br/legislacao/resolucoes/2023/1900-resolucao-765",
+]
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = CHUNK_SIZE // 5
+
+
+@dataclass
+class IngestionReport:
+    """Outcome of indexing a single source URL."""
+
+    url: str
+    status: Literal["unchanged", "indexed", "failed"]
+    added: int = 0
+    removed: int = 0
+
+
+def generate_doc_id(doc: Document) -> str:
+    """Generate a unique ID based on document content."""
+    return hashlib.sha256(doc.page_content.encode()).hexdigest()  # Hash content as ID
+
+
+def generate_content_hash(docs: Iterable[Document]) -> str:
+    """Hash the full content of a loaded source, to detect changes between runs."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode())
+    return digest.hexdigest()
+
+
+@cache
+def get_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+
+
+def load_url(url: str) -> list[Document]:
+    return WebBaseLoader(url).load()
+
+
+def plan_chunk_changes(
+    chunks: list[Document], previous_ids: set[str], shared_ids: set[str], force: bool = False
+) -> tuple[dict[str, Document], list[str]]:
+    """
+    Compute which chunks must be embedded and which chunk IDs must be deleted.
+
+    Args:
+        chunks: The current chunks of a source.
+        previous_ids: Chunk IDs indexed for this source by the previous run.
+        shared_ids: Chunk IDs indexed by other sources of the same collection.
+        force: Add all current chunks again, even those already indexed.
+
+    Returns:
+        The chunks to add keyed by ID, and the IDs no longer referenced by any source.
+    """
+    current: dict[str, Document] = {}
+    for chunk in chunks:
+        current.setdefault(generate_doc_id(chunk), chunk)
+
+    to_add = {
+        chunk_id: chunk
+        for chunk_id, chunk in current.items()
+        if force or (chunk_id not in previous_ids and chunk_id not in shared_ids)
+    }
+    to_remove = sorted(previous_ids - current.keys() - shared_ids)
+    return to_add, to_remove
+
+
+def ingest_url(
+    url: str,
+    db_manager: DatabaseManager,
+    vector_store: VectorStore,
+    collection_name: str = RESOLUTIONS_COLLECTION,
+    force: bool = False,
+) -> IngestionReport:
+    """Index a single source, embedding only new or changed chunks."""
+    docs = load_url(url)
+    content_hash = generate_content_hash(docs)
+
+    record = db_manager.get_ingestion_record(url, collection_name)
+    if record is not None and record.content_hash == content_hash and not force:
+        logger.info("#> ingest_url > unchanged: %s", url)
+        return IngestionReport(url=url, status="unchanged")
+
+    chunks = get_text_splitter().split_documents(docs)
+    previous_ids = set(record.chunk_ids or []) if record is not None else set()
+    shared_ids = db_manager.get_indexed_chunk_ids(collection_name, exclude_url=url)
+    to_add, to_remove = plan_chunk_changes(chunks, previous_ids, shared_ids, force=force)
+
+    if to_add:
+        vector_store.add_documents(documents=list(to_add.values()), ids=list(to_add.keys()))
+    if to_remove:
+        vector_store.delete(ids=to_remove)
+
+    chunk_ids = sorted({generate_doc_id(chunk) for chunk in chunks})
+    db_manager.save_ingestion_record(url, collection_name, content_hash, chunk_ids)
+    logger.info(
+        "#> ingest_url > indexed: %s (added %s, removed %s)", url, len(to_add), len(to_remove)
+    )
+    return IngestionReport(url=url, status="indexed", added=len(to_add), removed=len(to_remove))
+
+
+def ingest_resolutions(
+    urls: Iterable[str] = RESOLUTION_URLS,
+    db_manager: DatabaseManager | None = None,
+    vector_store: VectorStore | None = None,
+    force: bool = False,
+) -> list[IngestionReport]:
+    """
+    Index Anatel's resolutions, skipping sources unchanged since the previous run.
+
+    A failing source is reported and does not prevent the remaining ones from being indexed.
+    """
+    db_manager = db_manager or get_database_manager()
+    vector_store = vector_store or db_manager.get_vector_store(RESOLUTIONS_COLLECTION)
+
+    reports = []
+    for url in urls:
+        try:
+            reports.append(ingest_url(url, db_manager, vector_store, force=force))
+        except Exception as e:
+            logger.error("#> ingest_resolutions > failed to index %s: %s", url, e)
+            reports.append(IngestionReport(url=url, status="failed"))
+    return reports
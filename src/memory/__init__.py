@@ -1,6 +1,9 @@
+from typing import Any
+
 from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from core.settings import DatabaseType, settings
+from memory import postgres
 from memory.postgres import get_postgres_saver
 from memory.sqlite import get_sqlite_saver
 
@@ -16,4 +19,18 @@ def initialize_database() -> BaseCheckpointSaver:
         return get_sqlite_saver()
 
 
-__all__ = ["initialize_database"]
\ No newline at end of file
+async def check_database() -> bool:
+    """Whether the checkpointer's database can be used. Only PostgreSQL pools are checked."""
+    if postgres.postgres_pool is None:
+        return True
+    return await postgres.postgres_pool.check_health()
+
+
+def database_stats() -> dict[str, Any]:
+    """Connection pool stats of the checkpointer's database, if it uses a pool."""
+    if postgres.postgres_pool is None:
+        return {}
+    return postgres.postgres_pool.stats()
+
+
+__all__ = ["initialize_database", "check_database", "database_stats"]
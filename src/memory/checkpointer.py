@@ -0,0 +1,261 @@
+"""
+The checkpointer shared by all agents.
+
+Agents are compiled at import time, before the service opens its database, so they are all
+compiled with the same `CheckpointerProxy` from `get_checkpointer()`. It keeps state in a
+bounded in-memory saver until the service points it at the database saver on startup.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from functools import cache
+from inspect import signature
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from core.settings import settings
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver that evicts old state instead of growing for as long as the process runs.
+
+    Only the newest `max_checkpoints` checkpoints of each thread (and namespace) are kept.
+    Whole threads are evicted, least recently used first, once there are more than
+    `max_threads` of them or their serialized checkpoints take more than `max_bytes`, and once
+    they have not been used for `ttl` seconds. Limits set to None are not enforced.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int | None = settings.CHECKPOINT_MEMORY_MAX_THREADS,
+        max_checkpoints: int | None = settings.CHECKPOINT_MEMORY_MAX_CHECKPOINTS,
+        max_bytes: int | None = settings.CHECKPOINT_MEMORY_MAX_BYTES,
+        ttl: float | None = settings.CHECKPOINT_MEMORY_TTL,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_checkpoints = max_checkpoints
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Thread ID -> when it was last used, least recently used first
+        self._last_used: OrderedDict[str, float] = OrderedDict()
+        self._thread_bytes: dict[str, int] = {}
+        self.total_bytes = 0
+        self.evicted_threads = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _size(saved: tuple) -> int:
+        (_, checkpoint), (_, metadata), _ = saved
+        return len(checkpoint) + len(metadata)
+
+    def _touch(self, thread_id: str) -> None:
+        now = time.monotonic()
+        last_used = self._last_used.get(thread_id)
+        if last_used is not None and self.ttl is not None and now - last_used > self.ttl:
+            self._evict(thread_id)
+        self._last_used[thread_id] = now
+        self._last_used.move_to_end(thread_id)
+
+    def _delete_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> None:
+        saved = self.storage[thread_id][checkpoint_ns].pop(checkpoint_id)
+        self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        size = self._size(saved)
+        self._thread_bytes[thread_id] -= size
+        self.total_bytes -= size
+
+    def _evict(self, thread_id: str) -> None:
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        self.total_bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._last_used.pop(thread_id, None)
+        self.evicted_threads += 1
+
+    def _enforce_limits(self, keep: str) -> None:
+        """Evict threads over the limits, except `keep`, the thread that is being written."""
+        now = time.monotonic()
+        for thread_id, last_used in list(self._last_used.items()):
+            over_capacity = (
+                self.max_threads is not None and len(self._last_used) > self.max_threads
+            ) or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+            expired = self.ttl is not None and now - last_used > self.ttl
+            if not (over_capacity or expired):
+                # Threads are ordered by last use, so the rest are newer
+                break
+            if thread_id != keep:
+                self._evict(thread_id)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        with self._lock:
+            self._touch(config["configurable"]["thread_id"])
+            return super().get_tuple(config)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            if config:
+                self._touch(config["configurable"]["thread_id"])
+            # Materialized so evictions by concurrent writes can't change it while iterating
+            checkpoints = [*super().list(config, filter=filter, before=before, limit=limit)]
+        yield from checkpoints
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            checkpoints = self.storage[thread_id][checkpoint_ns]
+            previous = checkpoints.get(checkpoint["id"])
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            size = self._size(checkpoints[checkpoint["id"]])
+            if previous is not None:
+                size -= self._size(previous)
+            self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + size
+            self.total_bytes += size
+            if self.max_checkpoints is not None and len(checkpoints) > self.max_checkpoints:
+                # Checkpoint IDs are time-ordered UUIDs, so the smallest are the oldest
+                for checkpoint_id in sorted(checkpoints)[: len(checkpoints) - self.max_checkpoints]:
+                    self._delete_checkpoint(thread_id, checkpoint_ns, checkpoint_id)
+            self._enforce_limits(keep=thread_id)
+            return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            self._touch(config["configurable"]["thread_id"])
+            super().put_writes(config, writes, task_id, task_path)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._last_used),
+                "bytes": self.total_bytes,
+                "evicted_threads": self.evicted_threads,
+            }
+
+
+class CheckpointerProxy(BaseCheckpointSaver):
+    """Checkpointer that forwards every call to a saver that can be replaced at runtime."""
+
+    def __init__(self, saver: BaseCheckpointSaver) -> None:
+        super().__init__(serde=saver.serde)
+        self.use(saver)
+
+    def use(self, saver: BaseCheckpointSaver) -> None:
+        """Send all further calls to `saver`."""
+        self.saver = saver
+        self.serde = saver.serde
+        # Savers of older checkpoint libraries (like SQLite's) don't take the task path yet
+        self._put_writes_takes_path = "task_path" in signature(saver.put_writes).parameters
+        self._aput_writes_takes_path = "task_path" in signature(saver.aput_writes).parameters
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._put_writes_takes_path:
+            return self.saver.put_writes(config, writes, task_id, task_path)
+        return self.saver.put_writes(config, writes, task_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await self.saver.aget_tuple(config)
+
+    def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        return self.saver.alist(config, filter=filter, before=before, limit=limit)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if self._aput_writes_takes_path:
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+        return await self.saver.aput_writes(config, writes, task_id)
+
+    def get_next_version(self, current: Any, channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+
+@cache
+def get_checkpointer() -> CheckpointerProxy:
+    """The checkpointer all agents are compiled with."""
+    return CheckpointerProxy(BoundedMemorySaver())
@@ -0,0 +1,240 @@
+"""
+Compaction of the checkpoint database.
+
+Every graph step saves a checkpoint and the savers never delete one, so the checkpoint tables
+grow with every turn. A compaction keeps only the newest `keep_last` checkpoints of each thread
+(and namespace), deletes threads whose newest checkpoint is older than `ttl` seconds, deletes
+the pending writes and channel values that only the deleted checkpoints used, and vacuums
+SQLite databases.
+
+Run it with `python run_compaction.py` or set CHECKPOINT_COMPACTION_INTERVAL to have the
+service run it periodically.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+import aiosqlite
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Number of 100 ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+# Conditions on the checkpoints table, formatted with the placeholder of the database driver
+_IDLE_THREADS = """thread_id IN (
+    SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(checkpoint_id) < {param}
+)"""
+_OLD_CHECKPOINTS = """(thread_id, checkpoint_ns, checkpoint_id) IN (
+    SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+        ) AS position
+        FROM checkpoints
+    ) AS ranked
+    WHERE position > {param}
+)"""
+
+_SQLITE_DELETE_ORPHAN_WRITES = """
+DELETE FROM writes WHERE NOT EXISTS (
+    SELECT 1 FROM checkpoints AS c
+    WHERE c.thread_id = writes.thread_id
+        AND c.checkpoint_ns = writes.checkpoint_ns
+        AND c.checkpoint_id = writes.checkpoint_id
+)"""
+
+_POSTGRES_DELETE_CHECKPOINTS = """
+DELETE FROM checkpoints WHERE {where}
+RETURNING thread_id, checkpoint_ns, checkpoint_id, checkpoint -> 'channel_versions' AS versions,
+    pg_column_size(checkpoints.*) AS size"""
+_POSTGRES_DELETE_WRITES = """
+DELETE FROM checkpoint_writes AS w
+USING unnest(%s::text[], %s::text[], %s::text[]) AS d(thread_id, checkpoint_ns, checkpoint_id)
+WHERE w.thread_id = d.thread_id
+    AND w.checkpoint_ns = d.checkpoint_ns
+    AND w.checkpoint_id = d.checkpoint_id
+RETURNING pg_column_size(w.*) AS size"""
+# Only blobs of the deleted checkpoints are candidates: blobs of checkpoints being saved
+# concurrently have newer versions and may not be referenced by a checkpoint yet.
+_POSTGRES_DELETE_BLOBS = """
+DELETE FROM checkpoint_blobs AS b
+USING unnest(%s::text[], %s::text[], %s::text[], %s::text[]) AS d(thread_id, checkpoint_ns, channel, version)
+WHERE b.thread_id = d.thread_id
+    AND b.checkpoint_ns = d.checkpoint_ns
+    AND b.channel = d.channel
+    AND b.version = d.version
+    AND NOT EXISTS (
+        SELECT 1 FROM checkpoints AS c
+        WHERE c.thread_id = b.thread_id
+            AND c.checkpoint_ns = b.checkpoint_ns
+            AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+    )
+RETURNING pg_column_size(b.*) AS size"""
+
+
+@dataclass
+class CompactionReport:
+    """What a compaction deleted."""
+
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    threads_deleted: int = 0
+    bytes_reclaimed: int = 0
+    seconds: float = 0.0
+
+
+def checkpoint_id_at(timestamp: float) -> str:
+    """
+    The smallest checkpoint ID LangGraph can generate at `timestamp` (seconds since the epoch).
+
+    Checkpoint IDs are UUIDv6, whose hex digits start with their creation time, so comparing
+    them as strings compares when they were created.
+    """
+    uuid_time = int(timestamp * 10_000_000) + _UUID_EPOCH_OFFSET
+    time_high_and_mid = (uuid_time >> 12) & 0xFFFFFFFFFFFF
+    version_and_time_low = 0x6000 | (uuid_time & 0x0FFF)
+    # Lowest clock sequence and node, with the RFC 4122 variant bits set
+    return str(UUID(int=time_high_and_mid << 80 | version_and_time_low << 64 | 1 << 63))
+
+
+async def _sqlite_size(conn: aiosqlite.Connection) -> int:
+    async with conn.execute("PRAGMA page_count") as cur:
+        (page_count,) = await cur.fetchone()
+    async with conn.execute("PRAGMA page_size") as cur:
+        (page_size,) = await cur.fetchone()
+    return page_count * page_size
+
+
+async def _compact_sqlite(
+    saver: AsyncSqliteSaver, keep_last: int | None, ttl: float | None
+) -> CompactionReport:
+    report = CompactionReport()
+    async with saver.lock:
+        conn = saver.conn
+        size_before = await _sqlite_size(conn)
+        if ttl is not None:
+            cutoff = checkpoint_id_at(time.time() - ttl)
+            idle_threads = _IDLE_THREADS.format(param="?")
+            async with conn.execute(
+                f"SELECT COUNT(DISTINCT thread_id) FROM checkpoints WHERE {idle_threads}", (cutoff,)
+            ) as cur:
+                (report.threads_deleted,) = await cur.fetchone()
+            async with conn.execute(
+                f"DELETE FROM checkpoints WHERE {idle_threads}", (cutoff,)
+            ) as cur:
+                report.checkpoints_deleted += cur.rowcount
+        if keep_last is not None:
+            old_checkpoints = _OLD_CHECKPOINTS.format(param="?")
+            async with conn.execute(
+                f"DELETE FROM checkpoints WHERE {old_checkpoints}", (keep_last,)
+            ) as cur:
+                report.checkpoints_deleted += cur.rowcount
+        async with conn.execute(_SQLITE_DELETE_ORPHAN_WRITES) as cur:
+            report.writes_deleted = cur.rowcount
+        await conn.commit()
+
+        async with conn.execute("PRAGMA freelist_count") as cur:
+            (free_pages,) = await cur.fetchone()
+        if free_pages:
+            # Rewrites the database without its free pages, then shrinks the WAL file that
+            # holds the rewritten pages
+            await conn.execute("VACUUM")
+            await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report.bytes_reclaimed = size_before - await _sqlite_size(conn)
+    return report
+
+
+async def _compact_postgres(
+    saver: AsyncPostgresSaver, keep_last: int | None, ttl: float | None
+) -> CompactionReport:
+    report = CompactionReport()
+    deleted: list[dict[str, Any]] = []
+    async with saver._cursor() as cur, cur.connection.transaction():
+        if ttl is not None:
+            cutoff = checkpoint_id_at(time.time() - ttl)
+            where = _IDLE_THREADS.format(param="%s")
+            await cur.execute(_POSTGRES_DELETE_CHECKPOINTS.format(where=where), (cutoff,))
+            rows = await cur.fetchall()
+            report.threads_deleted = len({row["thread_id"] for row in rows})
+            deleted += rows
+        if keep_last is not None:
+            where = _OLD_CHECKPOINTS.format(param="%s")
+            await cur.execute(_POSTGRES_DELETE_CHECKPOINTS.format(where=where), (keep_last,))
+            deleted += await cur.fetchall()
+        if not deleted:
+            return report
+        report.checkpoints_deleted = len(deleted)
+        # Space of deleted rows is reused by new rows once autovacuum has processed the tables
+        report.bytes_reclaimed = sum(row["size"] for row in deleted)
+
+        checkpoint_keys = [
+            [row["thread_id"] for row in deleted],
+            [row["checkpoint_ns"] for row in deleted],
+            [row["checkpoint_id"] for row in deleted],
+        ]
+        await cur.execute(_POSTGRES_DELETE_WRITES, checkpoint_keys)
+        sizes = await cur.fetchall()
+        report.writes_deleted = len(sizes)
+        report.bytes_reclaimed += sum(row["size"] for row in sizes)
+
+        blobs = {
+            (row["thread_id"], row["checkpoint_ns"], channel, str(version))
+            for row in deleted
+            for channel, version in (row["versions"] or {}).items()
+        }
+        if blobs:
+            await cur.execute(_POSTGRES_DELETE_BLOBS, [list(column) for column in zip(*blobs)])
+            sizes = await cur.fetchall()
+            report.blobs_deleted = len(sizes)
+            report.bytes_reclaimed += sum(row["size"] for row in sizes)
+    return report
+
+
+async def compact_checkpoints(
+    saver: BaseCheckpointSaver,
+    keep_last: int | None = settings.CHECKPOINT_KEEP_LAST,
+    ttl: float | None = settings.CHECKPOINT_THREAD_TTL,
+) -> CompactionReport:
+    """
+    Delete all but the newest `keep_last` checkpoints of each thread and the threads without a
+    checkpoint in the last `ttl` seconds. None keeps all checkpoints or threads, respectively.
+    """
+    start = time.perf_counter()
+    if isinstance(saver, AsyncSqliteSaver):
+        report = await _compact_sqlite(saver, keep_last, ttl)
+    elif isinstance(saver, AsyncPostgresSaver):
+        report = await _compact_postgres(saver, keep_last, ttl)
+    else:
+        raise TypeError(f"Compaction is not supported for {type(saver).__name__}")
+    report.seconds = time.perf_counter() - start
+    logger.info(
+        "Compacted checkpoints in %.2fs: deleted %s checkpoints, %s writes, %s blobs and %s "
+        "threads, reclaimed %s bytes",
+        report.seconds,
+        report.checkpoints_deleted,
+        report.writes_deleted,
+        report.blobs_deleted,
+        report.threads_deleted,
+        report.bytes_reclaimed,
+    )
+    return report
+
+
+async def compact_periodically(saver: BaseCheckpointSaver, interval: float) -> None:
+    """Compact the checkpoints of `saver` every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await compact_checkpoints(saver)
+        except Exception as e:
+            logger.error("Checkpoint compaction failed: %s", e)
@@ -1,8 +1,13 @@
-
 import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
 
-from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from core.settings import settings
 
@@ -40,7 +45,105 @@ def get_postgres_connection_string() -> str:
     )
 
 
-def get_postgres_saver() -> BaseCheckpointSaver:
-    """Initialize and return a PostgreSQL saver instance."""
+class MonitoredConnectionPool(AsyncConnectionPool):
+    """AsyncConnectionPool that records how long callers wait to get a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+
+    async def getconn(self, timeout: float | None = None) -> AsyncConnection:
+        start = time.perf_counter()
+        try:
+            return await super().getconn(timeout=timeout)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.acquisitions += 1
+            self.acquire_seconds_total += elapsed
+            self.acquire_seconds_max = max(self.acquire_seconds_max, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        """Pool size and usage counters from psycopg, plus connection acquisition latency."""
+        return {
+            **self.get_stats(),
+            "acquisitions": self.acquisitions,
+            "acquire_seconds_avg": self.acquire_seconds_total / max(self.acquisitions, 1),
+            "acquire_seconds_max": self.acquire_seconds_max,
+        }
+
+    async def check_health(self, timeout: float = 5.0) -> bool:
+        """Whether a connection can be acquired and used within `timeout` seconds."""
+        try:
+            async with self.connection(timeout=timeout) as conn:
+                await conn.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logger.error("PostgreSQL health check failed: %s", e)
+            return False
+
+
+class PooledPostgresSaver(AsyncPostgresSaver):
+    """
+    AsyncPostgresSaver whose queries run concurrently on the connections of a pool.
+
+    The upstream saver holds one lock around every query, which is only needed when all
+    queries share a single connection. With a pool, each query gets its own connection.
+    """
+
+    @asynccontextmanager
+    async def _cursor(self, *, pipeline: bool = False) -> AsyncIterator[Any]:
+        if not isinstance(self.conn, AsyncConnectionPool):
+            async with super()._cursor(pipeline=pipeline) as cur:
+                yield cur
+            return
+        async with self.conn.connection() as conn:
+            if not pipeline:
+                async with conn.cursor(binary=True, row_factory=dict_row) as cur:
+                    yield cur
+            elif self.supports_pipeline:
+                async with conn.pipeline(), conn.cursor(binary=True, row_factory=dict_row) as cur:
+                    yield cur
+            else:
+                async with (
+                    conn.transaction(),
+                    conn.cursor(binary=True, row_factory=dict_row) as cur,
+                ):
+                    yield cur
+
+
+def create_postgres_pool() -> MonitoredConnectionPool:
+    """Create the (not yet opened) connection pool of the checkpointer from settings."""
     validate_postgres_config()
-    return AsyncPostgresSaver.from_conn_string(get_postgres_connection_string())
\ No newline at end of file
+    return MonitoredConnectionPool(
+        get_postgres_connection_string(),
+        min_size=settings.POSTGRES_MIN_SIZE,
+        max_size=settings.POSTGRES_POOL_SIZE,
+        max_idle=settings.POSTGRES_MAX_IDLE,
+        timeout=settings.POSTGRES_POOL_TIMEOUT,
+        # Connection settings AsyncPostgresSaver expects, as in AsyncPostgresSaver.from_conn_string
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        # Replace connections that were closed by the server while idle in the pool
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+        name="checkpointer",
+    )
+
+
+# The pool of the running checkpointer, for health checks and stats
+postgres_pool: MonitoredConnectionPool | None = None
+
+
+@asynccontextmanager
+async def get_postgres_saver() -> AsyncIterator[PooledPostgresSaver]:
+    """Initialize a PostgreSQL saver on a connection pool, closing the pool on exit."""
+    global postgres_pool
+    pool = create_postgres_pool()
+    await pool.open(wait=True)
+    postgres_pool = pool
+    try:
+        yield PooledPostgresSaver(pool)
+    finally:
+        postgres_pool = None
+        await pool.close()
@@ -1,9 +1,120 @@
-from langgraph.checkpoint.base import BaseCheckpointSaver
+import asyncio
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 
 from core.settings import settings
 
 
+async def connect_sqlite(path: str, *, readonly: bool = False) -> aiosqlite.Connection:
+    """Open a SQLite connection with the pragmas of the tuned mode."""
+    conn = await aiosqlite.connect(path, timeout=settings.SQLITE_BUSY_TIMEOUT)
+    pragmas = [
+        # Commits only append to the WAL, which is synced at checkpoints instead of every
+        # commit. A power loss may drop the last commits but can't corrupt the database.
+        "synchronous=NORMAL",
+        f"mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "query_only=ON" if readonly else "journal_mode=WAL",
+    ]
+    await conn.executescript("".join(f"PRAGMA {pragma};" for pragma in pragmas))
+    return conn
+
+
+class TunedSqliteSaver(AsyncSqliteSaver):
+    """
+    AsyncSqliteSaver that reads on a pool of read-only connections.
+
+    The upstream saver runs every query on one connection behind one lock, so reading the state
+    of a thread waits for the writes of all other threads. In WAL mode readers don't block the
+    writer or each other: writes still go through the single connection of the saver, whose
+    thread is the only writer, while reads run concurrently on `readers`.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, readers: list[aiosqlite.Connection]) -> None:
+        super().__init__(conn)
+        self.reader_count = len(readers)
+        self.readers: asyncio.Queue[AsyncSqliteSaver] = asyncio.Queue()
+        for reader in readers:
+            # Each reader is a plain saver on its connection, so reads reuse the upstream queries
+            reader_saver = AsyncSqliteSaver(reader, serde=self.serde)
+            reader_saver.is_setup = True
+            self.readers.put_nowait(reader_saver)
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(
+        cls, conn_string: str, readers: int | None = None
+    ) -> AsyncIterator["TunedSqliteSaver"]:
+        readers = settings.SQLITE_READERS if readers is None else readers
+        if conn_string == ":memory:":
+            # Every connection to ":memory:" opens a separate database
+            readers = 0
+        # The writer opens first, as it switches the database to WAL mode
+        conn = await connect_sqlite(conn_string)
+        reader_conns = []
+        try:
+            for _ in range(readers):
+                reader_conns.append(await connect_sqlite(conn_string, readonly=True))
+            yield cls(conn, reader_conns)
+        finally:
+            for reader in reader_conns:
+                await reader.close()
+            await conn.close()
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[AsyncSqliteSaver]:
+        reader = await self.readers.get()
+        try:
+            yield reader
+        finally:
+            self.readers.put_nowait(reader)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        if not self.reader_count:
+            return await super().aget_tuple(config)
+        if not self.is_setup:
+            # setup() takes the write lock even when the tables exist
+            await self.setup()
+        async with self._reader() as reader:
+            return await reader.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if not self.reader_count:
+            async for checkpoint in super().alist(
+                config, filter=filter, before=before, limit=limit
+            ):
+                yield checkpoint
+            return
+        if not self.is_setup:
+            await self.setup()
+        async with self._reader() as reader:
+            async for checkpoint in reader.alist(config, filter=filter, before=before, limit=limit):
+                yield checkpoint
+
+    async def aput_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str
+    ) -> None:
+        await super().aput_writes(config, writes, task_id)
+        # Upstream leaves the writes uncommitted until the next checkpoint, which hides them
+        # from the readers
+        async with self.lock:
+            await self.conn.commit()
+
+
 def get_sqlite_saver() -> BaseCheckpointSaver:
     """Initialize and return a SQLite saver instance."""
-    return AsyncSqliteSaver.from_conn_string(settings.SQLITE_DB_PATH)
\ No newline at end of file
+    if settings.SQLITE_TUNED:
+        return TunedSqliteSaver.from_conn_string(settings.SQLITE_DB_PATH)
+    return AsyncSqliteSaver.from_conn_string(settings.SQLITE_DB_PATH)
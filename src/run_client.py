@@ -7,46 +7,44 @@ from schemas import ChatMessage
 
 async def amain() -> None:
     #### ASYNC ####
-    client = AgentClient(settings.BASE_URL)
+    async with AgentClient(settings.BASE_URL) as client:
+        print("Agent info:")
+        print(client.info)
 
-    print("Agent info:")
-    print(client.info)
+        print("Chat example:")
+        response = await client.ainvoke("Tell me a brief joke?", model="gpt-4o")
+        response.pretty_print()
 
-    print("Chat example:")
-    response = await client.ainvoke("Tell me a brief joke?", model="gpt-4o")
-    response.pretty_print()
-
-    print("\nStream example:")
-    async for message in client.astream("Share a quick fun fact?"):
-        if isinstance(message, str):
-            print(message, flush=True, end="")
-        elif isinstance(message, ChatMessage):
-            print("\n", flush=True)
-            message.pretty_print()
-        else:
-            print(f"ERROR: Unknown type - {type(message)}")
+        print("\nStream example:")
+        async for message in client.astream("Share a quick fun fact?"):
+            if isinstance(message, str):
+                print(message, flush=True, end="")
+            elif isinstance(message, ChatMessage):
+                print("\n", flush=True)
+                message.pretty_print()
+            else:
+                print(f"ERROR: Unknown type - {type(message)}")
 
 
 def main() -> None:
     #### SYNC ####
-    client = AgentClient(settings.BASE_URL)
-
-    print("Agent info:")
-    print(client.info)
-
-    print("Chat example:")
-    response = client.invoke("Tell me a brief joke?", model="gpt-4o")
-    response.pretty_print()
-
-    print("\nStream example:")
-    for message in client.stream("Share a quick fun fact?"):
-        if isinstance(message, str):
-            print(message, flush=True, end="")
-        elif isinstance(message, ChatMessage):
-            print("\n", flush=True)
-            message.pretty_print()
-        else:
-            print(f"ERROR: Unknown type - {type(message)}")
+    with AgentClient(settings.BASE_URL) as client:
+        print("Agent info:")
+        print(client.info)
+
+        print("Chat example:")
+        response = client.invoke("Tell me a brief joke?", model="gpt-4o")
+        response.pretty_print()
+
+        print("\nStream example:")
+        for message in client.stream("Share a quick fun fact?"):
+            if isinstance(message, str):
+                print(message, flush=True, end="")
+            elif isinstance(message, ChatMessage):
+                print("\n", flush=True)
+                message.pretty_print()
+            else:
+                print(f"ERROR: Unknown type - {type(message)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.settings import settings  # noqa: E402
+from memory import initialize_database  # noqa: E402
+from memory.compaction import CompactionReport, compact_checkpoints  # noqa: E402
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+async def compact(keep_last: int | None, ttl: float | None) -> CompactionReport:
+    async with initialize_database() as saver:
+        await saver.setup()
+        return await compact_checkpoints(saver, keep_last=keep_last, ttl=ttl)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Delete old checkpoints and idle threads from the checkpoint database."
+    )
+    parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=settings.CHECKPOINT_KEEP_LAST,
+        help="Newest checkpoints kept per thread (default: CHECKPOINT_KEEP_LAST)",
+    )
+    parser.add_argument(
+        "--keep-all", action="store_true", help="Keep all checkpoints of the remaining threads"
+    )
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=settings.CHECKPOINT_THREAD_TTL,
+        help="Delete threads without a checkpoint in this many seconds "
+        "(default: CHECKPOINT_THREAD_TTL)",
+    )
+    args = parser.parse_args()
+    if args.keep_last is not None and args.keep_last < 1:
+        parser.error("--keep-last must be at least 1")
+
+    report = asyncio.run(compact(None if args.keep_all else args.keep_last, args.ttl))
+    logger.info("%s", report)
+
+
+if __name__ == "__main__":
+    main()
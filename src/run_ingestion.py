@@ -0,0 +1,34 @@
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db.ingestion import RESOLUTION_URLS, ingest_resolutions  # noqa: E402
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Index Anatel's resolutions into pgvector.")
+    parser.add_argument(
+        "urls", nargs="*", default=RESOLUTION_URLS, help="Source URLs (default: all resolutions)"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-index sources even if they are unchanged"
+    )
+    args = parser.parse_args()
+
+    reports = ingest_resolutions(args.urls, force=args.force)
+    for report in reports:
+        logger.info(
+            "%s: %s (added %s, removed %s)", report.url, report.status, report.added, report.removed
+        )
+    if any(report.status == "failed" for report in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from schemas.models import AllModelEnum
 from schemas.schema import (
     AgentInfo,
+    BatchInput,
+    BatchResult,
     ChatHistory,
     ChatHistoryInput,
     ChatMessage,
     Feedback,
     FeedbackResponse,
+    JobInfo,
+    JobStatus,
     ServiceMetadata,
     StreamInput,
     UserInput,
@@ -13,6 +17,8 @@ from schemas.schema import (
 
 __all__ = [
     "AgentInfo",
+    "BatchInput",
+    "BatchResult",
     "AllModelEnum",
     "UserInput",
     "ChatMessage",
@@ -20,6 +26,8 @@ __all__ = [
     "StreamInput",
     "Feedback",
     "FeedbackResponse",
+    "JobInfo",
+    "JobStatus",
     "ChatHistoryInput",
     "ChatHistory",
 ]
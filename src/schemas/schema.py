@@ -60,6 +60,14 @@ class UserInput(BaseModel):
         default={},
         examples=[{"spicy_level": 0.8}],
     )
+    profile: bool = Field(
+        description=(
+            "Return a timing breakdown of the run: its nodes and their model, tool and retriever"
+            " calls. Added to response_metadata['timing'], or sent as a 'timing' event before"
+            " the end of a stream."
+        ),
+        default=False,
+    )
 
 
 class StreamInput(UserInput):
@@ -71,6 +79,21 @@ class StreamInput(UserInput):
     )
 
 
+class BatchInput(BaseModel):
+    """Independent user inputs to run through an agent in a single request."""
+
+    inputs: list[UserInput] = Field(
+        description="User inputs to the agent, each run as a separate invocation.",
+        min_length=1,
+    )
+    max_concurrency: int | None = Field(
+        description="Maximum inputs run at once, capped by the service's limit.",
+        default=None,
+        ge=1,
+        examples=[4],
+    )
+
+
 class ToolCall(TypedDict):
     """Represents a request to call a tool."""
 
@@ -131,6 +154,61 @@ class ChatMessage(BaseModel):
         print(self.pretty_repr())  # noqa: T201
 
 
+class BatchResult(BaseModel):
+    """Result of one input of a batch, streamed back as soon as it completes."""
+
+    index: int = Field(
+        description="Position of the input in the batch.",
+        examples=[0],
+    )
+    output: ChatMessage | None = Field(
+        description="Final response of the agent, if the input succeeded.",
+        default=None,
+    )
+    error: str | None = Field(
+        description="Error message, if the input failed.",
+        default=None,
+        examples=["Unexpected error"],
+    )
+
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobInfo(BaseModel):
+    """State of an agent run submitted as a background job."""
+
+    job_id: str = Field(
+        description="Job ID, used to poll or cancel the job.",
+        examples=["847c6285-8fc9-4560-a83f-4e6285809254"],
+    )
+    agent_id: str = Field(
+        description="Agent the job runs.",
+        examples=["research-assistant"],
+    )
+    status: JobStatus = Field(
+        description="Current status of the job.",
+        examples=["running"],
+    )
+    created_at: float = Field(description="Submission time, as a Unix timestamp.")
+    started_at: float | None = Field(description="Start time, as a Unix timestamp.", default=None)
+    finished_at: float | None = Field(
+        description="Completion time, as a Unix timestamp.", default=None
+    )
+    output: ChatMessage | None = Field(
+        description="Final response of the agent, once the job succeeded.",
+        default=None,
+    )
+    error: str | None = Field(
+        description="Error message, if the job failed.",
+        default=None,
+    )
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+
 class Feedback(BaseModel):
     """Feedback for a run, to record to LangSmith."""
 
@@ -164,7 +242,30 @@ class ChatHistoryInput(BaseModel):
         description="Thread ID to persist and continue a multi-turn conversation.",
         examples=["847c6285-8fc9-4560-a83f-4e6285809254"],
     )
+    limit: int | None = Field(
+        description="Maximum number of messages to return, the newest ones first. All if unset.",
+        default=None,
+        ge=1,
+        examples=[50],
+    )
+    before: int | None = Field(
+        description="Cursor of the page to return: only messages before this position in the "
+        "thread are returned. Use `next_cursor` of the previous page.",
+        default=None,
+        ge=0,
+    )
+    stream: bool = Field(
+        description="Stream the messages as NDJSON, one ChatMessage per line, instead of "
+        "returning a ChatHistory. The cursor of the preceding page is sent in the "
+        "X-Next-Cursor header.",
+        default=False,
+    )
 
 
 class ChatHistory(BaseModel):
     messages: list[ChatMessage]
+    next_cursor: int | None = Field(
+        description="Pass as `before` to get the preceding page. None if there are no older "
+        "messages.",
+        default=None,
+    )
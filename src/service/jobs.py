@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from typing import Any
+from uuid import uuid4
+
+from core.settings import settings
+from schemas import ChatMessage, JobInfo
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_STATUSES = ("queued", "running")
+
+# Each service process heartbeats its job store this often. Jobs of a process not seen for
+# OWNER_TIMEOUT seconds are failed, since nothing is left to finish them.
+HEARTBEAT_INTERVAL = 30.0
+OWNER_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while all workers and queue slots are taken."""
+
+
+class JobStore(ABC):
+    """Where job state is kept, so it can be polled and survives the task that ran it."""
+
+    @abstractmethod
+    async def save(self, job: JobInfo) -> None: ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> JobInfo | None: ...
+
+    @abstractmethod
+    async def delete_finished_before(self, timestamp: float) -> int:
+        """Delete jobs that finished before `timestamp`, returning how many were deleted."""
+
+    @abstractmethod
+    async def heartbeat(self) -> None:
+        """Record that the process owning this store is alive."""
+
+    @abstractmethod
+    async def fail_orphaned(self, error: str, stale_before: float) -> int:
+        """
+        Mark queued and running jobs of other processes not seen since `stale_before` as
+        failed, returning how many were updated.
+        """
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self) -> None:
+        self._jobs: dict[str, JobInfo] = {}
+
+    async def save(self, job: JobInfo) -> None:
+        self._jobs[job.job_id] = job.model_copy(deep=True)
+
+    async def get(self, job_id: str) -> JobInfo | None:
+        job = self._jobs.get(job_id)
+        return job.model_copy(deep=True) if job else None
+
+    async def delete_finished_before(self, timestamp: float) -> int:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < timestamp
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    # Jobs in memory all belong to this process, so none is ever orphaned
+    async def heartbeat(self) -> None:
+        pass
+
+    async def fail_orphaned(self, error: str, stale_before: float) -> int:
+        return 0
+
+
+class SqliteJobStore(JobStore):
+    """
+    Job store backed by a SQLite file, so results outlive a service restart.
+
+    The file can be shared by several service processes (e.g. uvicorn workers). Each job records
+    the `owner` process that runs it, and each owner heartbeats, so a starting process only fails
+    the jobs of owners that stopped heartbeating, not those other workers are still running.
+    """
+
+    def __init__(self, path: str, owner: str | None = None) -> None:
+        self.owner = owner or uuid4().hex
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT, finished_at REAL, data TEXT, owner TEXT)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns:
+                # Created before jobs had owners; their jobs count as orphaned
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_owners (owner TEXT PRIMARY KEY, seen_at REAL)"
+            )
+
+    # The connection is shared by the threads of asyncio.to_thread, so statements run and their
+    # results are read while holding the lock
+    def _execute(self, sql: str, parameters: tuple = ()) -> int:
+        """Run a statement and commit it, returning the number of rows it changed."""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, parameters).rowcount
+
+    def _fetchone(self, sql: str, parameters: tuple = ()) -> tuple | None:
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchone()
+
+    async def save(self, job: JobInfo) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+            (job.job_id, job.status, job.finished_at, job.model_dump_json(), self.owner),
+        )
+
+    async def get(self, job_id: str) -> JobInfo | None:
+        row = await asyncio.to_thread(
+            self._fetchone, "SELECT data FROM jobs WHERE job_id = ?", (job_id,)
+        )
+        return JobInfo.model_validate_json(row[0]) if row else None
+
+    async def delete_finished_before(self, timestamp: float) -> int:
+        return await asyncio.to_thread(
+            self._execute, "DELETE FROM jobs WHERE finished_at < ?", (timestamp,)
+        )
+
+    async def heartbeat(self) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO job_owners VALUES (?, ?)",
+            (self.owner, time.time()),
+        )
+
+    def _fail_orphaned(self, error: str, stale_before: float) -> int:
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT data FROM jobs WHERE status IN (?, ?) AND owner IS NOT ? AND ("
+                "owner IS NULL OR owner NOT IN (SELECT owner FROM job_owners WHERE seen_at >= ?))",
+                (*UNFINISHED_STATUSES, self.owner, stale_before),
+            ).fetchall()
+            for (data,) in rows:
+                job = JobInfo.model_validate_json(data)
+                job.status, job.error, job.finished_at = "failed", error, time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, data = ? WHERE job_id = ?",
+                    (job.status, job.finished_at, job.model_dump_json(), job.job_id),
+                )
+            self._conn.execute("DELETE FROM job_owners WHERE seen_at < ?", (stale_before,))
+        return len(rows)
+
+    async def fail_orphaned(self, error: str, stale_before: float) -> int:
+        return await asyncio.to_thread(self._fail_orphaned, error, stale_before)
+
+
+def create_job_store() -> JobStore:
+    if settings.JOB_STORE == "memory":
+        return InMemoryJobStore()
+    return SqliteJobStore(settings.JOB_DB_PATH)
+
+
+class JobManager:
+    """
+    Runs agent invocations as background jobs that clients poll for their result.
+
+    At most `max_workers` jobs run at once and up to `max_pending` more wait for a worker;
+    beyond that, `submit` raises `JobQueueFullError` so the service can shed load. Finished
+    jobs are kept in the store for `result_ttl` seconds.
+
+    Jobs run as tasks of the process that accepted them, so only that process can cancel them.
+    """
+
+    def __init__(
+        self,
+        store: JobStore | None = None,
+        max_workers: int = settings.JOB_MAX_WORKERS,
+        max_pending: int = settings.JOB_MAX_PENDING,
+        result_ttl: float = settings.JOB_RESULT_TTL,
+    ) -> None:
+        self._store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._workers: asyncio.Semaphore | None = None
+        self._maintenance_task: asyncio.Task | None = None
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = create_job_store()
+        return self._store
+
+    async def start(self) -> None:
+        # Created here so it binds to the event loop the service runs on
+        self._workers = asyncio.Semaphore(self.max_workers)
+        await self.store.heartbeat()
+        await self._fail_orphaned()
+        self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks.values()]
+        if self._maintenance_task is not None:
+            tasks.append(self._maintenance_task)
+            self._maintenance_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, agent_id: str, run: Callable[[], Awaitable[ChatMessage]]) -> JobInfo:
+        """Start `run` as a job for `agent_id` and return the queued job."""
+        if len(self._tasks) >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise JobQueueFullError(f"{len(self._tasks)} jobs are already running or queued")
+        if self._workers is None:
+            self._workers = asyncio.Semaphore(self.max_workers)
+        job = JobInfo(
+            job_id=str(uuid4()), agent_id=agent_id, status="queued", created_at=time.time()
+        )
+        await self.store.save(job)
+        task = asyncio.create_task(self._run(job, run))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> JobInfo | None:
+        return await self.store.get(job_id)
+
+    async def cancel(self, job_id: str) -> JobInfo | None:
+        """
+        Cancel a queued or running job. Finished jobs, and jobs run by another service process,
+        are returned unchanged.
+        """
+        task = self._tasks.get(job_id)
+        if task is None:
+            return await self.store.get(job_id)
+        task.cancel()
+        await asyncio.wait([task])
+        job = await self.store.get(job_id)
+        if job is not None and not job.done:
+            # The task was cancelled before it got to run
+            job.status, job.finished_at = "cancelled", time.time()
+            await self.store.save(job)
+        return job
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": len(self._tasks) - self.running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+    async def _run(self, job: JobInfo, run: Callable[[], Awaitable[ChatMessage]]) -> None:
+        try:
+            async with self._workers:
+                self.running += 1
+                try:
+                    job.status, job.started_at = "running", time.time()
+                    await self.store.save(job)
+                    job.output = await run()
+                    job.status = "succeeded"
+                finally:
+                    self.running -= 1
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.job_id, e)
+            job.status, job.error = "failed", str(getattr(e, "detail", e))
+        finally:
+            job.finished_at = time.time()
+            await self.store.save(job)
+
+    async def _fail_orphaned(self) -> None:
+        if failed := await self.store.fail_orphaned(
+            "The service process running the job stopped before it finished",
+            time.time() - OWNER_TIMEOUT,
+        ):
+            logger.warning("Marked %s orphaned jobs as failed", failed)
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.result_ttl, HEARTBEAT_INTERVAL))
+            try:
+                await self.store.heartbeat()
+                await self._fail_orphaned()
+                await self.store.delete_finished_before(time.time() - self.result_ttl)
+            except Exception as e:
+                logger.error("Job store maintenance failed: %s", e)
+
+
+job_manager = JobManager()
@@ -0,0 +1,188 @@
+import time
+from typing import Any
+from urllib.parse import parse_qs
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.constants import TAG_HIDDEN
+
+from agents import DEFAULT_AGENT
+from agents.agents import agents
+from agents.llama_guard import get_llama_guard
+from core.embedding import get_embedding_model
+from core.log import get_log_handler
+from core.metrics import Gauge, Histogram, registry
+from db.history_writer import history_writer
+from memory import database_stats
+from memory.checkpointer import BoundedMemorySaver, get_checkpointer
+from service.jobs import job_manager
+from service.response_cache import response_cache
+
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled.")
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests, until the end of the body of streamed responses.",
+    ("method", "route", "agent", "status"),
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "stream_time_to_first_token_seconds",
+    "Time from the start of a /stream response to its first token.",
+    ("agent",),
+)
+TOKENS_PER_SECOND = Histogram(
+    "stream_tokens_per_second",
+    "Tokens streamed per second by /stream responses, after the first token.",
+    ("agent",),
+    buckets=(1, 5, 10, 25, 50, 100, 200, 400, 800),
+)
+NODE_DURATION = Histogram(
+    "graph_node_duration_seconds",
+    "Duration of the runs of graph nodes (guard_input, model, tools, generate...).",
+    ("agent", "node"),
+)
+
+
+def _route_agent(scope: dict) -> str:
+    """
+    The agent a request ran, "" if its route doesn't run an agent, or "unknown" if it named an
+    agent the service doesn't serve, so that requests can't add label values of their own.
+    """
+    route = scope.get("route")
+    dependant = getattr(route, "dependant", None)
+    if dependant is None or not any(
+        param.name == "agent_id" for param in (*dependant.path_params, *dependant.query_params)
+    ):
+        return ""
+    agent_id = scope.get("path_params", {}).get("agent_id")
+    if not agent_id:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        agent_id = query.get("agent_id", [DEFAULT_AGENT])[0]
+    return agent_id if agent_id in agents else "unknown"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records the number of requests in flight and their duration."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # The route template, set once the router matched the request, keeps IDs out of
+            # the labels. Unmatched paths (404s) are counted together.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope.get("method", ""),
+                route=route,
+                agent=_route_agent(scope),
+                status=str(status),
+            )
+
+
+class NodeMetricsHandler(BaseCallbackHandler):
+    """Callback handler recording the duration of each node run of an agent's graph."""
+
+    run_inline = True
+    # Only graph nodes are timed, so model, tool and retriever events are not even sent here
+    ignore_llm = True
+    ignore_chat_model = True
+    ignore_retriever = True
+    ignore_agent = True
+    ignore_custom_event = True
+
+    def __init__(self, agent_id: str) -> None:
+        self.agent_id = agent_id
+        self._started: dict[UUID, tuple[float, str]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Node runs are the ones LangGraph tags with their step, its own nodes are hidden
+        tags = tags or []
+        if TAG_HIDDEN in tags or not any(t.startswith("graph:step:") for t in tags):
+            return
+        node = (metadata or {}).get("langgraph_node") or kwargs.get("name") or "unknown"
+        self._started[run_id] = (time.perf_counter(), node)
+
+    def _observe(self, run_id: UUID) -> None:
+        if started := self._started.pop(run_id, None):
+            start, node = started
+            NODE_DURATION.observe(time.perf_counter() - start, agent=self.agent_id, node=node)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._observe(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._observe(run_id)
+
+
+class StreamMetrics:
+    """Time to first token and token rate of one /stream response."""
+
+    def __init__(self, agent_id: str) -> None:
+        self.agent_id = agent_id
+        self.start = time.perf_counter()
+        self.first_token: float | None = None
+        self.tokens = 0
+
+    def token(self) -> None:
+        """Record a token sent to the client."""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+            TIME_TO_FIRST_TOKEN.observe(self.first_token - self.start, agent=self.agent_id)
+        self.tokens += 1
+
+    def finish(self) -> None:
+        if self.first_token is None:
+            return
+        elapsed = time.perf_counter() - self.first_token
+        if self.tokens > 1 and elapsed > 0:
+            TOKENS_PER_SECOND.observe((self.tokens - 1) / elapsed, agent=self.agent_id)
+
+
+def component_stats() -> dict[str, dict[str, Any]]:
+    """The stats of the service's pools, queues and caches, by component."""
+    stats = {
+        "database_pool": database_stats(),
+        "history_writer": history_writer.metrics(),
+        "response_cache": response_cache.stats(),
+        "jobs": job_manager.stats(),
+        "log_handler": get_log_handler().stats(),
+    }
+    saver = get_checkpointer().saver
+    if isinstance(saver, BoundedMemorySaver):
+        stats["memory_checkpointer"] = saver.stats()
+    # Not created just to be reported
+    if get_llama_guard.cache_info().currsize:
+        stats["llama_guard"] = get_llama_guard().stats()
+    if get_embedding_model.cache_info().currsize:
+        stats["embedding_cache"] = get_embedding_model().stats()
+    return stats
+
+
+def render_metrics() -> str:
+    return registry.render(component_stats())
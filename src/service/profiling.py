@@ -0,0 +1,248 @@
+"""
+Profiling of agent runs.
+
+A `ProfilingHandler` added to the callbacks of a run times the graph's nodes and the model,
+tool and retriever calls made in each of them, with the token counts of model calls. It gives
+the breakdown of its run, returned to clients that ask for it, and adds the run's time to
+`flame_profile`, which aggregates all profiled runs in the "folded stacks" format of flame graph
+tools (e.g. `flamegraph.pl`, speedscope): one `agent;node;kind:name microseconds` line per stack,
+with the time spent in the frame itself, not in its children.
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_HIDDEN
+
+
+class FlameProfile:
+    """Time spent in each stack of all profiled runs."""
+
+    def __init__(self) -> None:
+        self._seconds: Counter[tuple[str, ...]] = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, stacks: dict[tuple[str, ...], float]) -> None:
+        with self._lock:
+            self._seconds.update(stacks)
+
+    def folded(self) -> str:
+        """The stacks in the folded format, slowest first, with their time in microseconds."""
+        with self._lock:
+            stacks = self._seconds.most_common()
+        return "".join(f"{';'.join(stack)} {round(seconds * 1e6)}\n" for stack, seconds in stacks)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._seconds.clear()
+
+
+flame_profile = FlameProfile()
+
+
+@dataclass
+class _Frame:
+    """A run shown in the profile: the whole graph, a node, or a model, tool or retriever call."""
+
+    stack: tuple[str, ...]
+    kind: str
+    name: str
+    node: str | None
+    parent: UUID | None
+    start: float = field(default_factory=time.perf_counter)
+    # Seconds spent in the frames called by this one
+    children: float = 0.0
+
+
+class ProfilingHandler(BaseCallbackHandler):
+    """Callback handler timing the nodes and calls of one agent run."""
+
+    run_inline = True
+
+    def __init__(self, agent_id: str, flame: FlameProfile | None = flame_profile) -> None:
+        self.agent_id = agent_id
+        self.flame = flame
+        self.total_seconds = 0.0
+        self.nodes: list[dict[str, Any]] = []
+        self.calls: list[dict[str, Any]] = []
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        # The frame each open run belongs to: its own, or the one of its closest ancestor frame
+        self._frame_of: dict[UUID, UUID | None] = {}
+        self._frames: dict[UUID, _Frame] = {}
+
+    def _start(
+        self, run_id: UUID, parent_run_id: UUID | None, kind: str | None, name: str = ""
+    ) -> None:
+        parent_id = self._frame_of.get(parent_run_id) if parent_run_id else None
+        if kind is None:
+            # Runs that are not frames (LangGraph's writes, prompts, parsers...) are counted in
+            # the frame they run in
+            self._frame_of[run_id] = parent_id
+            return
+        parent = self._frames.get(parent_id) if parent_id else None
+        if parent is None:
+            stack, node = (self.agent_id,), None
+        else:
+            stack = (*parent.stack, name if kind == "node" else f"{kind}:{name}")
+            node = name if kind == "node" else parent.node
+        self._frames[run_id] = _Frame(stack, kind, name, node, parent_id)
+        self._frame_of[run_id] = run_id
+
+    def _end(self, run_id: UUID, **details: Any) -> None:
+        if self._frame_of.pop(run_id, None) != run_id:
+            return
+        frame = self._frames.pop(run_id)
+        seconds = time.perf_counter() - frame.start
+        self.stacks[frame.stack] += max(seconds - frame.children, 0.0)
+        if parent := self._frames.get(frame.parent):
+            parent.children += seconds
+        ms = round(seconds * 1000, 1)
+        if frame.kind == "graph":
+            self.total_seconds = seconds
+            if self.flame is not None:
+                self.flame.add(self.stacks)
+        elif frame.kind == "node":
+            self.nodes.append({"node": frame.name, "ms": ms})
+        else:
+            self.calls.append(
+                {"kind": frame.kind, "name": frame.name, "node": frame.node, "ms": ms, **details}
+            )
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        tags = tags or []
+        if not self._frames and parent_run_id is None:
+            self._start(run_id, None, "graph", kwargs.get("name") or "graph")
+        elif TAG_HIDDEN not in tags and any(t.startswith("graph:step:") for t in tags):
+            node = (metadata or {}).get("langgraph_node") or kwargs.get("name") or "unknown"
+            self._start(run_id, parent_run_id, "node", node)
+        else:
+            self._start(run_id, parent_run_id, None)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chat_model_start(
+        self,
+        serialized: Any,
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, parent_run_id, "llm", _model_name(serialized, metadata, kwargs))
+
+    def on_llm_start(
+        self,
+        serialized: Any,
+        prompts: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, parent_run_id, "llm", _model_name(serialized, metadata, kwargs))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, **_token_counts(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    def on_tool_start(
+        self,
+        serialized: Any,
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start(run_id, parent_run_id, "tool", name)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    def on_retriever_start(
+        self,
+        serialized: Any,
+        query: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "retriever"
+        self._start(run_id, parent_run_id, "retriever", name)
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    def breakdown(self) -> dict[str, Any]:
+        """Where the run spent its time: its nodes, in order, and the calls made in them."""
+        return {
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "nodes": self.nodes,
+            "calls": self.calls,
+        }
+
+
+def _model_name(serialized: Any, metadata: dict[str, Any] | None, kwargs: dict[str, Any]) -> str:
+    return (
+        (metadata or {}).get("ls_model_name")
+        or kwargs.get("name")
+        or (serialized or {}).get("name")
+        or "model"
+    )
+
+
+def _token_counts(response: LLMResult) -> dict[str, int]:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {
+                    "input_tokens": usage["input_tokens"],
+                    "output_tokens": usage["output_tokens"],
+                }
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if "prompt_tokens" in usage:
+        return {
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage.get("completion_tokens", 0),
+        }
+    return {}
+
+
+def get_profiler(config: RunnableConfig) -> ProfilingHandler | None:
+    """The profiling handler among the callbacks of a run's config, if it has one."""
+    return next((c for c in config.get("callbacks") or [] if isinstance(c, ProfilingHandler)), None)
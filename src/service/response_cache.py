@@ -0,0 +1,175 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.settings import settings
+from schemas import ChatMessage, UserInput
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", prompt).strip().casefold()
+
+
+@dataclass
+class ResponseCacheKey:
+    """Identifies a cacheable request: the agent, model and config scope plus its prompt."""
+
+    scope: str
+    prompt: str
+    embedding: np.ndarray | None = field(default=None, compare=False)
+
+
+@dataclass
+class _Entry:
+    message: ChatMessage
+    embedding: np.ndarray | None
+    created_at: float
+
+
+class ResponseCache:
+    """
+    Opt-in cache of final agent responses for stateless requests.
+
+    A request is served from the cache when a previous request to the same agent, model and
+    agent_config had the same normalized prompt or, if `similarity_threshold` is set, a prompt
+    whose embedding has a cosine similarity of at least the threshold. Requests continuing a
+    thread are never cached, since their answer depends on the conversation so far.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.RESPONSE_CACHE_ENABLED,
+        ttl: float = settings.RESPONSE_CACHE_TTL,
+        max_entries: int = settings.RESPONSE_CACHE_MAX_ENTRIES,
+        similarity_threshold: float | None = settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+        embeddings: Embeddings | None = None,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._embeddings = embeddings
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            from core.embedding import get_embedding_model
+
+            self._embeddings = get_embedding_model()
+        return self._embeddings
+
+    def key(self, agent_id: str, user_input: UserInput) -> ResponseCacheKey | None:
+        """Return the cache key of a request, or None if it must not be cached."""
+        if not self.enabled or user_input.thread_id:
+            return None
+        config = json.dumps(user_input.agent_config, sort_keys=True, default=str)
+        scope = f"{agent_id}\0{user_input.model}\0{config}"
+        return ResponseCacheKey(scope=scope, prompt=normalize_prompt(user_input.message))
+
+    async def aget(self, key: ResponseCacheKey) -> ChatMessage | None:
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get((key.scope, key.prompt))
+            if entry is not None:
+                self._entries.move_to_end((key.scope, key.prompt))
+                self.exact_hits += 1
+                return entry.message.model_copy(deep=True)
+
+        if self.similarity_threshold is not None:
+            key.embedding = await self._aembed(key.prompt)
+        if key.embedding is not None:
+            with self._lock:
+                match = self._most_similar(key)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return self._entries[match].message.model_copy(deep=True)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def aput(self, key: ResponseCacheKey, message: ChatMessage) -> None:
+        if self.similarity_threshold is not None and key.embedding is None:
+            key.embedding = await self._aembed(key.prompt)
+        message = message.model_copy(deep=True)
+        message.run_id = None
+        with self._lock:
+            self._entries[(key.scope, key.prompt)] = _Entry(
+                message=message, embedding=key.embedding, created_at=time.monotonic()
+            )
+            self._entries.move_to_end((key.scope, key.prompt))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    async def _aembed(self, prompt: str) -> np.ndarray | None:
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(prompt), dtype=float)
+        except Exception as e:
+            # Fall back to exact matching rather than failing the request
+            logger.warning("Response cache could not embed prompt: %s", e)
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _most_similar(self, key: ResponseCacheKey) -> tuple[str, str] | None:
+        candidates = [
+            (entry_key, entry.embedding)
+            for entry_key, entry in self._entries.items()
+            if entry_key[0] == key.scope and entry.embedding is not None
+        ]
+        if not candidates:
+            return None
+        similarities = np.stack([embedding for _, embedding in candidates]) @ key.embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return candidates[best][0]
+
+    def _evict_expired(self) -> None:
+        expired_before = time.monotonic() - self.ttl
+        for entry_key in [k for k, e in self._entries.items() if e.created_at < expired_before]:
+            del self._entries[entry_key]
+
+
+_TOKENS = re.compile(r"\S+\s*|\s+")
+
+
+def split_tokens(content: str) -> list[str]:
+    """Split a cached answer into word tokens, to replay it over an SSE stream."""
+    return _TOKENS.findall(content)
+
+
+response_cache = ResponseCache()
@@ -1,35 +1,63 @@
-import json
-import logging
+import asyncio
 import warnings
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Annotated, Any
 from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, FastAPI, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from langchain_core._api import LangChainBetaWarning
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import AnyMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_HIDDEN
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
 from langsmith import Client as LangsmithClient
 
 from agents import DEFAULT_AGENT, get_agent, get_all_agent_info
+from agents.agents import agents
+from agents.context import CONTEXT_SUMMARY_TAG
+from agents.safety import AWAITING_SAFETY_TAG, SAFETY_CLEARED_EVENT
 from core import settings
-from db.agent_model import DatabaseManager
-from memory import initialize_database
+from core.log import RequestLoggingMiddleware, get_logger
+from db.history_writer import history_writer
+from db.ingestion import ingest_resolutions
+from memory import check_database, initialize_database
+from memory.checkpointer import get_checkpointer
+from memory.compaction import compact_periodically
 from schemas import (
+    BatchInput,
+    BatchResult,
     ChatHistory,
     ChatHistoryInput,
     ChatMessage,
     Feedback,
     FeedbackResponse,
+    JobInfo,
     ServiceMetadata,
     StreamInput,
     UserInput,
 )
+from service.jobs import JobQueueFullError, job_manager
+from service.metrics import (
+    MetricsMiddleware,
+    NodeMetricsHandler,
+    StreamMetrics,
+    render_metrics,
+)
+from service.profiling import ProfilingHandler, flame_profile, get_profiler
+from service.response_cache import response_cache, split_tokens
+from service.sse import (
+    DONE_EVENT,
+    TokenCoalescer,
+    encode_error,
+    encode_event,
+    encode_message,
+    encode_token,
+)
 from service.utils import (
     convert_message_content_to_string,
     langchain_to_chat_message,
@@ -38,18 +66,7 @@ from service.utils import (
 
 warnings.filterwarnings("ignore", category=LangChainBetaWarning)
 
-logger = logging.getLogger(__name__)
-# Set the log level to INFO
-logger.setLevel(logging.INFO)
-# Prevent duplicate logs
-logger.propagate = False  
-# Check if the logger already has handlers to prevent duplicate entries
-if not logger.handlers:
-    # Add a handler (e.g., to console) if one doesn't already exist.
-    handler = logging.StreamHandler()  # Sends logs to the console
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+logger = get_logger(__name__)
 
 
 def verify_bearer(
@@ -58,8 +75,6 @@ def verify_bearer(
         Depends(HTTPBearer(description="Please provide AUTH_SECRET api key.", auto_error=False)),
     ],
 ) -> None:
-    logger.info("#> verify_bearer")
-
     if not settings.AUTH_SECRET:
         return
     auth_secret = settings.AUTH_SECRET.get_secret_value()
@@ -67,32 +82,72 @@ def verify_bearer(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
 
 
+async def preload_agents() -> None:
+    """
+    Import and build the enabled agents in a worker thread, which takes seconds, so that the
+    first request to each doesn't do it on the event loop. An agent that fails to load is
+    logged, and loaded again by its first request.
+    """
+    for agent_id, agent in agents.items():
+        try:
+            await asyncio.to_thread(agent.load)
+        except Exception as e:
+            logger.error("#> preload_agents > failed to load %s: %s", agent_id, e)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """
     Configurable lifespan that initializes the appropriate database checkpointer based on settings.
     """
     logger.info("#> lifespan")
+    ingestion_task = None
+    if settings.RESOLUTIONS_INGEST_ON_STARTUP:
+        # Index in the background so startup never waits on network or embedding calls.
+        ingestion_task = asyncio.create_task(asyncio.to_thread(ingest_resolutions))
+    await history_writer.start()
+    await job_manager.start()
+    await preload_agents()
     try:
         async with initialize_database() as saver:
             await saver.setup()
-            agents = get_all_agent_info()
-            for a in agents:
-                agent = get_agent(a.key)
-                agent.checkpointer = saver
-            yield
+            # All agents are compiled with the shared checkpointer, so this switches them all
+            checkpointer = get_checkpointer()
+            in_memory_saver = checkpointer.saver
+            checkpointer.use(saver)
+            compaction_task = None
+            if settings.CHECKPOINT_COMPACTION_INTERVAL:
+                compaction_task = asyncio.create_task(
+                    compact_periodically(saver, settings.CHECKPOINT_COMPACTION_INTERVAL)
+                )
+            try:
+                yield
+            finally:
+                if compaction_task is not None:
+                    compaction_task.cancel()
+                    # Let a running compaction roll back before the database is closed
+                    with suppress(asyncio.CancelledError):
+                        await compaction_task
+                checkpointer.use(in_memory_saver)
     except Exception as e:
         logger.error(f"Error during database initialization: {e}")
         raise
+    finally:
+        await job_manager.stop()
+        await history_writer.stop()
+        if ingestion_task is not None and not ingestion_task.done():
+            ingestion_task.cancel()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
 router = APIRouter(dependencies=[Depends(verify_bearer)])
 
 
 @router.get("/info")
 async def info() -> ServiceMetadata:
-    logger.info("#> /info")
+    logger.debug("#> /info")
     models = list(settings.AVAILABLE_MODELS)
     models.sort()
     return ServiceMetadata(
@@ -103,8 +158,16 @@ async def info() -> ServiceMetadata:
     )
 
 
-def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
-    logger.info("#> _parse_input")
+def _input_fields(agent_id: str, user_input: UserInput) -> dict[str, Any]:
+    """Fields logged for a request instead of its whole input, which may be kilobytes."""
+    return {
+        "agent_id": agent_id,
+        "thread_id": user_input.thread_id,
+        "input_chars": len(user_input.message),
+    }
+
+
+def _parse_input(user_input: UserInput, agent_id: str) -> tuple[dict[str, Any], UUID]:
     run_id = uuid4()
     thread_id = user_input.thread_id or str(uuid4())
 
@@ -118,11 +181,16 @@ def _parse_input(user_input: UserInput) -> tuple[dict[str, Any], UUID]:
             )
         configurable.update(user_input.agent_config)
 
+    callbacks: list[BaseCallbackHandler] = [NodeMetricsHandler(agent_id)]
+    if user_input.profile or settings.PROFILE_ALL_RUNS:
+        callbacks.append(ProfilingHandler(agent_id))
+
     kwargs = {
         "input": {"messages": [HumanMessage(content=user_input.message)]},
         "config": RunnableConfig(
             configurable=configurable,
             run_id=run_id,
+            callbacks=callbacks,
         ),
     }
     return kwargs, run_id
@@ -138,21 +206,125 @@ async def invoke(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> ChatMe
     Use thread_id to persist and continue a multi-turn conversation. run_id kwarg
     is also attached to messages for recording feedback.
     """
-    logger.info("#> /invoke")
-    logger.info("#> agent: %s", agent_id)
-    logger.info("#> user_input: %s", user_input)
+    logger.info("#> /invoke", extra=_input_fields(agent_id, user_input))
     agent: CompiledStateGraph = get_agent(agent_id)
-    kwargs, run_id = _parse_input(user_input)
+    return await _ainvoke_agent(agent, agent_id, user_input)
+
+
+async def _ainvoke_agent(
+    agent: CompiledStateGraph, agent_id: str, user_input: UserInput
+) -> ChatMessage:
+    """Run one user input through an agent, or answer it from the response cache."""
+    kwargs, run_id = _parse_input(user_input, agent_id)
+    cache_key = response_cache.key(agent_id, user_input)
+    if cache_key and (cached := await response_cache.aget(cache_key)):
+        cached.run_id = str(run_id)
+        return cached
     try:
         response = await agent.ainvoke(**kwargs)
         output = langchain_to_chat_message(response["messages"][-1])
         output.run_id = str(run_id)
+        if cache_key:
+            await response_cache.aput(cache_key, output)
+        if user_input.profile:
+            # The cached message must not keep the timing of this run
+            output = output.model_copy(deep=True)
+            output.response_metadata["timing"] = get_profiler(kwargs["config"]).breakdown()
         return output
     except Exception as e:
         logger.error("An exception occurred: %s", e)
         raise HTTPException(status_code=500, detail="Unexpected error") from e
 
 
+async def batch_generator(
+    batch: BatchInput, agent_id: str = DEFAULT_AGENT
+) -> AsyncGenerator[str, None]:
+    """
+    Run the inputs of a batch concurrently and yield each result as an NDJSON line.
+
+    Results are yielded in completion order; `BatchResult.index` gives the position of the
+    input. A failing input yields a result with `error` set and does not affect the others.
+    """
+    agent: CompiledStateGraph = get_agent(agent_id)
+    limit = settings.BATCH_MAX_CONCURRENCY
+    semaphore = asyncio.Semaphore(min(batch.max_concurrency or limit, limit))
+
+    async def run(index: int, user_input: UserInput) -> BatchResult:
+        async with semaphore:
+            try:
+                output = await _ainvoke_agent(agent, agent_id, user_input)
+            except HTTPException as e:
+                return BatchResult(index=index, error=str(e.detail))
+            return BatchResult(index=index, output=output)
+
+    tasks = [asyncio.create_task(run(i, user_input)) for i, user_input in enumerate(batch.inputs)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield result.model_dump_json() + "\n"
+    finally:
+        # Stop the remaining inputs if the client went away
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/{agent_id}/batch", response_class=StreamingResponse)
+@router.post("/batch", response_class=StreamingResponse)
+async def batch(batch: BatchInput, agent_id: str = DEFAULT_AGENT) -> StreamingResponse:
+    """
+    Invoke an agent with many independent user inputs in a single request.
+
+    Inputs run concurrently, up to `max_concurrency` (capped by the service) at a time. The
+    response is newline-delimited JSON with one `BatchResult` per input, in completion order.
+    """
+    logger.info("#> /batch", extra={"agent_id": agent_id, "inputs": len(batch.inputs)})
+    if len(batch.inputs) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batches are limited to {settings.BATCH_MAX_SIZE} inputs",
+        )
+    return StreamingResponse(batch_generator(batch, agent_id), media_type="application/x-ndjson")
+
+
+@router.post("/{agent_id}/jobs", status_code=status.HTTP_202_ACCEPTED)
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(user_input: UserInput, agent_id: str = DEFAULT_AGENT) -> JobInfo:
+    """
+    Run an agent in the background and return a job to poll for its final response.
+
+    Poll `GET /jobs/{job_id}` until the job is done and cancel it with `DELETE /jobs/{job_id}`.
+    When all workers are busy and the queue is full, responds 503 with a `Retry-After` header.
+    """
+    logger.info("#> /jobs", extra=_input_fields(agent_id, user_input))
+    agent: CompiledStateGraph = get_agent(agent_id)
+    try:
+        return await job_manager.submit(
+            agent_id, lambda: _ainvoke_agent(agent, agent_id, user_input)
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Too many jobs, please retry later: {e}",
+            headers={"Retry-After": str(settings.JOB_RETRY_AFTER)},
+        ) from e
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> JobInfo:
+    """Get the status of a job and, once it succeeded, the agent's final response."""
+    if job := await job_manager.get(job_id):
+        return job
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> JobInfo:
+    """Cancel a queued or running job. Finished jobs are returned unchanged."""
+    if job := await job_manager.cancel(job_id):
+        return job
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+
 @router.post("/analyze-code")
 async def analyze_code(user_input: UserInput) -> ChatMessage:
     """
@@ -162,94 +334,155 @@ async def analyze_code(user_input: UserInput) -> ChatMessage:
     Use thread_id to persist and continue a multi-turn conversation. run_id kwarg
     is also attached to messages for recording feedback.
     """
-    logger.info("#> /analyze-code")
-    logger.info("#> user_input: %s", user_input)
-    
+    logger.info("#> /analyze-code", extra=_input_fields("code-reviewer", user_input))
+
     agent_id = "code-reviewer"
     agent: CompiledStateGraph = get_agent(agent_id)
-    kwargs, run_id = _parse_input(user_input)
+    kwargs, run_id = _parse_input(user_input, agent_id)
     try:
         response = await agent.ainvoke(**kwargs)
         output = langchain_to_chat_message(response["messages"][-1])
         output.run_id = str(run_id)
 
-        db_manager = DatabaseManager()
-        db_manager.add_record(code_snippet=user_input.message, suggestions=output.content)
+        await history_writer.submit(code_snippet=user_input.message, suggestions=output.content)
+        if user_input.profile:
+            output.response_metadata["timing"] = get_profiler(kwargs["config"]).breakdown()
         return output
     except Exception as e:
         logger.error("An exception occurred: %s", e)
         raise HTTPException(status_code=500, detail="Unexpected error") from e
 
 
+# Run types whose events message_generator never uses. Filtering them out in astream_events
+# keeps them from being queued and yielded at all, which matters on long tool-heavy runs.
+IGNORED_STREAM_RUN_TYPES = ("llm", "parser", "prompt", "retriever", "tool")
+# Model calls whose output is not part of the answer, and LangGraph's internal channel writes
+# and edge conditions, which LangGraph hides from its own message streaming too
+IGNORED_STREAM_TAGS = ("llama_guard", CONTEXT_SUMMARY_TAG, TAG_HIDDEN)
+
+
+def _stream_event_filters(user_input: StreamInput) -> dict[str, Any]:
+    """Filters for astream_events() that drop the events message_generator ignores."""
+    exclude_types = list(IGNORED_STREAM_RUN_TYPES)
+    if not user_input.stream_tokens:
+        exclude_types.append("chat_model")
+    return {"exclude_types": exclude_types, "exclude_tags": list(IGNORED_STREAM_TAGS)}
+
+
 async def message_generator(
     user_input: StreamInput, agent_id: str = DEFAULT_AGENT
-) -> AsyncGenerator[str, None]:
+) -> AsyncGenerator[bytes, None]:
     """
     Generate a stream of messages from the agent.
 
     This is the workhorse method for the /stream endpoint.
     """
-    logger.info("#> message_generator")
-    logger.info("#> agent: %s", agent_id)
-    logger.info("#> user_input: %s", user_input)
-
     agent: CompiledStateGraph = get_agent(agent_id)
-    kwargs, run_id = _parse_input(user_input)
+    kwargs, run_id = _parse_input(user_input, agent_id)
+
+    cache_key = response_cache.key(agent_id, user_input)
+    if cache_key and (cached := await response_cache.aget(cache_key)):
+        # Replay the cached answer as if it was being generated
+        cached.run_id = str(run_id)
+        if user_input.stream_tokens:
+            for token in split_tokens(cached.content):
+                yield encode_token(token)
+        yield encode_message(cached)
+        yield DONE_EVENT
+        return
+    final_message: ChatMessage | None = None
+    coalescer = TokenCoalescer()
+    stream_metrics = StreamMetrics(agent_id)
+    # Tokens generated while the user input is still being checked (see agents.safety)
+    held_tokens: list[str] = []
+    input_cleared = False
 
     # Process streamed events from the graph and yield messages over the SSE stream.
-    async for event in agent.astream_events(**kwargs, version="v2"):
+    async for event in agent.astream_events(
+        **kwargs, version="v2", **_stream_event_filters(user_input)
+    ):
         if not event:
             continue
+        kind = event["event"]
 
-        new_messages = []
-        # Yield messages written to the graph state after node execution finishes.
-        if (
-            event["event"] == "on_chain_end"
-            # on_chain_end gets called a bunch of times in a graph execution
-            # This filters out everything except for "graph node finished"
-            and any(t.startswith("graph:step:") for t in event.get("tags", []))
-        ):
-            if isinstance(event["data"]["output"], Command):
-                new_messages = event["data"]["output"].update.get("messages", [])
-            elif "messages" in event["data"]["output"]:
-                new_messages = event["data"]["output"]["messages"]
+        # Yield tokens streamed from LLMs. These are most of the events, so they come first.
+        if kind == "on_chat_model_stream":
+            tags = event.get("tags", [])
+            if not user_input.stream_tokens or "llama_guard" in tags or CONTEXT_SUMMARY_TAG in tags:
+                continue
+            content = remove_tool_calls(event["data"]["chunk"].content)
+            if content:
+                # Empty content in the context of OpenAI usually means
+                # that the model is asking for a tool to be invoked.
+                # So we only print non-empty content.
+                token = convert_message_content_to_string(content)
+                if AWAITING_SAFETY_TAG in tags and not input_cleared:
+                    held_tokens.append(token)
+                    continue
+                stream_metrics.token()
+                if frame := coalescer.add(token):
+                    yield frame
+            continue
 
-        # Also yield intermediate messages from agents.utils.CustomData.adispatch().
-        if event["event"] == "on_custom_event" and "custom_data_dispatch" in event.get("tags", []):
+        if kind == "on_custom_event":
+            if event.get("name") == SAFETY_CLEARED_EVENT:
+                input_cleared = True
+                for token in held_tokens:
+                    stream_metrics.token()
+                    if frame := coalescer.add(token):
+                        yield frame
+                held_tokens.clear()
+                continue
+            # Also yield intermediate messages from agents.utils.CustomData.adispatch().
+            if "custom_data_dispatch" not in event.get("tags", []):
+                continue
             new_messages = [event["data"]]
+        # Yield messages written to the graph state after node execution finishes.
+        # on_chain_end gets called a bunch of times in a graph execution
+        # This filters out everything except for "graph node finished"
+        elif kind == "on_chain_end" and any(
+            t.startswith("graph:step:") for t in event.get("tags", [])
+        ):
+            # Tokens still held when their node finishes answered an unsafe input
+            held_tokens.clear()
+            output = event["data"]["output"]
+            if isinstance(output, Command):
+                new_messages = output.update.get("messages", [])
+            elif "messages" in output:
+                new_messages = output["messages"]
+            else:
+                continue
+        else:
+            continue
 
+        if new_messages and (frame := coalescer.flush()):
+            yield frame
         for message in new_messages:
             try:
                 chat_message = langchain_to_chat_message(message)
                 chat_message.run_id = str(run_id)
             except Exception as e:
                 logger.error("Error parsing message: %s", e)
-                yield f"data: {json.dumps({'type': 'error', 'content': 'Unexpected error'})}\n\n"
+                yield encode_error("Unexpected error")
                 continue
             # LangGraph re-sends the input message, which feels weird, so drop it
             if chat_message.type == "human" and chat_message.content == user_input.message:
                 continue
-            yield f"data: {json.dumps({'type': 'message', 'content': chat_message.model_dump()})}\n\n"
-
-        # Yield tokens streamed from LLMs.
-        if (
-            event["event"] == "on_chat_model_stream"
-            and user_input.stream_tokens
-            and "llama_guard" not in event.get("tags", [])
-        ):
-            content = remove_tool_calls(event["data"]["chunk"].content)
-            if content:
-                # Empty content in the context of OpenAI usually means
-                # that the model is asking for a tool to be invoked.
-                # So we only print non-empty content.
-                yield f"data: {json.dumps({'type': 'token', 'content': convert_message_content_to_string(content)})}\n\n"
-            continue
+            if chat_message.type == "ai" and not chat_message.tool_calls:
+                final_message = chat_message
+            yield encode_message(chat_message)
 
-    yield "data: [DONE]\n\n"
+    if frame := coalescer.flush():
+        yield frame
+    stream_metrics.finish()
+    if cache_key and final_message:
+        await response_cache.aput(cache_key, final_message)
+    if user_input.profile:
+        yield encode_event("timing", get_profiler(kwargs["config"]).breakdown())
+    yield DONE_EVENT
 
 
 def _sse_response_example() -> dict[int, Any]:
-    logger.info("#> _sse_response_example")
     return {
         status.HTTP_200_OK: {
             "description": "Server Sent Event Response",
@@ -279,9 +512,7 @@ async def stream(user_input: StreamInput, agent_id: str = DEFAULT_AGENT) -> Stre
 
     Set `stream_tokens=false` to return intermediate messages but not token-by-token.
     """
-    logger.info("#> /stream")
-    logger.info("#> agent: %s", agent_id)
-    logger.info("#> user_input: %s", user_input)
+    logger.info("#> /stream", extra=_input_fields(agent_id, user_input))
     return StreamingResponse(
         message_generator(user_input, agent_id),
         media_type="text/event-stream",
@@ -309,34 +540,101 @@ async def feedback(feedback: Feedback) -> FeedbackResponse:
     return FeedbackResponse()
 
 
-@router.post("/history")
-def history(input: ChatHistoryInput) -> ChatHistory:
+async def history_generator(messages: list[AnyMessage]) -> AsyncGenerator[bytes, None]:
+    """Yield each message of a history page as an NDJSON line, converting them one at a time."""
+    for message in messages:
+        chat_message = langchain_to_chat_message(message)
+        yield chat_message.__pydantic_serializer__.to_json(chat_message) + b"\n"
+
+
+_HISTORY_ROUTE: dict[str, Any] = {
+    "response_model": ChatHistory,
+    # With `stream`, the messages are sent as NDJSON instead
+    "responses": {200: {"content": {"application/x-ndjson": {}}}},
+}
+
+
+@router.post("/{agent_id}/history", **_HISTORY_ROUTE)
+@router.post("/history", **_HISTORY_ROUTE)
+async def history(
+    input: ChatHistoryInput, agent_id: str = DEFAULT_AGENT
+) -> ChatHistory | StreamingResponse:
     """
-    Get chat history.
+    Get the chat history of a thread of an agent.
+
+    Long threads can be read in pages: `limit` returns only the newest messages, and passing
+    the returned `next_cursor` as `before` returns the page preceding them. With `stream`, the
+    messages are sent as NDJSON, one ChatMessage per line, as they are converted.
     """
     logger.info("#> /history")
-    # TODO: Hard-coding DEFAULT_AGENT here is wonky
-    agent: CompiledStateGraph = get_agent(DEFAULT_AGENT)
+    agent: CompiledStateGraph = get_agent(agent_id)
     try:
-        state_snapshot = agent.get_state(
+        state_snapshot = await agent.aget_state(
             config=RunnableConfig(
                 configurable={
                     "thread_id": input.thread_id,
                 }
             )
         )
-        messages: list[AnyMessage] = state_snapshot.values["messages"]
-        chat_messages: list[ChatMessage] = [langchain_to_chat_message(m) for m in messages]
-        return ChatHistory(messages=chat_messages)
     except Exception as e:
         logger.error("An exception occurred: %s", e)
         raise HTTPException(status_code=500, detail="Unexpected error") from e
 
+    messages: list[AnyMessage] = state_snapshot.values.get("messages", [])
+    end = len(messages) if input.before is None else min(input.before, len(messages))
+    start = 0 if input.limit is None else max(end - input.limit, 0)
+    page = messages[start:end]
+    next_cursor = start if start > 0 else None
+
+    if input.stream:
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+        return StreamingResponse(
+            history_generator(page), media_type="application/x-ndjson", headers=headers
+        )
+    try:
+        chat_messages: list[ChatMessage] = [langchain_to_chat_message(m) for m in page]
+    except Exception as e:
+        logger.error("An exception occurred: %s", e)
+        raise HTTPException(status_code=500, detail="Unexpected error") from e
+    return ChatHistory(messages=chat_messages, next_cursor=next_cursor)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """
+    Metrics of the service in the Prometheus text format.
+
+    Latency histograms of requests, /stream tokens, graph nodes, model and embedding calls, and
+    the stats of the database pool, queues and caches.
+    """
+    return render_metrics()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(reset: bool = False) -> str:
+    """
+    Time of the profiled agent runs per agent, node and call, in the folded stacks format.
+
+    Each line is a `agent;node;kind:name` stack and the microseconds spent in it, excluding its
+    children, e.g. for `flamegraph.pl` or speedscope. Runs are profiled when their request sets
+    `profile`, or all of them with PROFILE_ALL_RUNS. Set `reset` to clear the profile after
+    returning it.
+    """
+    folded = flame_profile.folded()
+    if reset:
+        flame_profile.reset()
+    return folded
+
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    logger.info("#> /health")
+    """Health check endpoint. Fails with 503 while the checkpointer's database is unusable."""
+    logger.debug("#> /health")
+    if not await check_database():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "error", "detail": "Database unavailable"},
+        )
     return {"status": "ok"}
 
 
@@ -0,0 +1,83 @@
+import time
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+
+from core.settings import settings
+
+DONE_EVENT = b"data: [DONE]\n\n"
+
+
+def sse_event(payload: bytes) -> bytes:
+    """Frame an already serialized JSON payload as a server-sent event."""
+    return b"data: " + payload + b"\n\n"
+
+
+def encode_event(event_type: str, content: Any) -> bytes:
+    """Serialize an event of the /stream protocol, e.g. `{"type": "token", "content": "Hi"}`."""
+    if isinstance(content, BaseModel):
+        # Let pydantic write the model's JSON directly instead of dumping it to a dict first
+        content_json = content.__pydantic_serializer__.to_json(content)
+        return sse_event(
+            b'{"type":' + orjson.dumps(event_type) + b',"content":' + content_json + b"}"
+        )
+    return sse_event(orjson.dumps({"type": event_type, "content": content}))
+
+
+def encode_token(token: str) -> bytes:
+    return encode_event("token", token)
+
+
+def encode_message(message: BaseModel) -> bytes:
+    return encode_event("message", message)
+
+
+def encode_error(error: str) -> bytes:
+    return encode_event("error", error)
+
+
+class TokenCoalescer:
+    """
+    Joins consecutive tokens into fewer, larger token events.
+
+    Tokens are buffered until `flush_interval` seconds have passed since the first buffered
+    token or `max_chars` characters are buffered, whichever comes first. The buffer is only
+    checked when a token is added, so callers must `flush()` before sending any other event and
+    at the end of the stream. With a `flush_interval` of 0 every token is sent on its own.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = settings.STREAM_TOKEN_FLUSH_INTERVAL,
+        max_chars: int = settings.STREAM_TOKEN_MAX_CHARS,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_chars = max_chars
+        self._tokens: list[str] = []
+        self._chars = 0
+        self._started_at = 0.0
+
+    def add(self, token: str) -> bytes | None:
+        """Buffer `token`, returning an event to send if the buffer is due to be flushed."""
+        if self.flush_interval <= 0:
+            return encode_token(token)
+        if not self._tokens:
+            self._started_at = time.monotonic()
+        self._tokens.append(token)
+        self._chars += len(token)
+        if (
+            self._chars >= self.max_chars
+            or time.monotonic() - self._started_at >= self.flush_interval
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes | None:
+        """Return an event with the buffered tokens, if there are any."""
+        if not self._tokens:
+            return None
+        event = encode_token("".join(self._tokens))
+        self._tokens.clear()
+        self._chars = 0
+        return event
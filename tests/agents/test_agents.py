@@ -0,0 +1,19 @@
+import pytest
+
+from agents.agents import AGENTS, default_agent, enabled_agents
+
+
+def test_enabled_agents():
+    assert enabled_agents(None) == AGENTS
+    assert list(enabled_agents(["research-assistant", "chatbot"])) == [
+        "chatbot",
+        "research-assistant",
+    ]
+    with pytest.raises(ValueError, match="Unknown agents in ENABLED_AGENTS: not-an-agent"):
+        enabled_agents(["chatbot", "not-an-agent"])
+
+
+def test_default_agent():
+    assert default_agent(AGENTS) == "resolutions-agent"
+    # The first enabled agent when resolutions-agent isn't enabled
+    assert default_agent(enabled_agents(["research-assistant", "chatbot"])) == "chatbot"
@@ -0,0 +1,92 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agents.context import ContextWindow, count_tokens_approximately
+
+
+def conversation(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(content=f"question {i} " + "x" * 200, id=f"h{i}"),
+            AIMessage(
+                content="",
+                id=f"c{i}",
+                tool_calls=[{"name": "Calculator", "args": {"expression": "1+1"}, "id": f"t{i}"}],
+            ),
+            ToolMessage(content="2", tool_call_id=f"t{i}", id=f"r{i}"),
+            AIMessage(content=f"answer {i} " + "y" * 200, id=f"a{i}"),
+        ]
+    return messages
+
+
+def test_unbounded_window_keeps_everything():
+    messages = conversation(5)
+    assert ContextWindow().trim(messages) == messages
+    built = ContextWindow().build({"messages": messages}, "system prompt")
+    assert built[0].type == "system"
+    assert built[1:] == messages
+
+
+def test_trim_by_turns_and_tokens():
+    messages = conversation(10)
+    assert [m.id for m in ContextWindow(max_turns=2).trim(messages)][0] == "h8"
+
+    window = ContextWindow(max_tokens=300)
+    kept = window.trim(messages)
+    assert kept[0].type == "human"
+    assert kept[-1].id == "a9"
+    assert count_tokens_approximately(kept) <= 300
+    assert len(kept) < len(messages)
+
+    # The latest turn is kept even if it alone is over budget
+    assert ContextWindow(max_tokens=10).trim(messages)[0].id == "h9"
+
+
+def test_build_reserves_tokens_for_system_prompt():
+    messages = conversation(10)
+    window = ContextWindow(max_tokens=400)
+    built = window.build({"messages": messages}, "s" * 800)
+    assert built[0].type == "system"
+    assert len(built) - 1 < len(window.trim(messages))
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary():
+    messages = conversation(4)
+    window = ContextWindow(max_turns=1, summarize=True)
+    model = FakeListChatModel(responses=["summary of turns 0-2", "summary of turns 0-3"])
+
+    update = await window.asummarize_state({"messages": messages}, model)
+    assert update["context_summary"] == {"content": "summary of turns 0-2", "until": "a2"}
+    state = {"messages": messages, **update}
+
+    # Nothing new was trimmed, so the summary is not recomputed
+    assert await window.asummarize_state(state, model) == {}
+
+    built = window.build(state, "system prompt")
+    assert built[1].type == "system"
+    assert "summary of turns 0-2" in built[1].content
+    assert built[2].id == "h3"
+
+    state["messages"] = messages + conversation(5)[-4:]
+    update = window.summarize_state(state, model)
+    assert update["context_summary"] == {"content": "summary of turns 0-3", "until": "a3"}
+
+
+def test_summary_covers_turns_pushed_out_by_system_prompt():
+    messages = conversation(2)
+    window = ContextWindow(max_tokens=300, summarize=True)
+    system_prompt = "s" * 400
+    # Both turns fit in the window, but not with the system prompt
+    assert window.trim(messages) == messages
+    assert window.build({"messages": messages}, system_prompt)[1].id == "h1"
+
+    model = FakeListChatModel(responses=["summary of turn 0"])
+    update = window.summarize_state({"messages": messages}, model, system_prompt=system_prompt)
+    assert update["context_summary"] == {"content": "summary of turn 0", "until": "a0"}
+
+    built = window.build({"messages": messages, **update}, system_prompt)
+    assert "summary of turn 0" in built[1].content
+    assert built[2].id == "h1"
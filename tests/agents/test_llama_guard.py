@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from pydantic import SecretStr
+
+from agents.llama_guard import LlamaGuard, SafetyAssessment
+
+
+class FakeGuardModel:
+    """Records the prompts it is sent and flags the ones whose last line mentions "unsafe"."""
+
+    def __init__(self, output: str | None = None) -> None:
+        self.prompts: list[str] = []
+        self.output = output
+
+    def __call__(self, messages):
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        if self.output is not None:
+            return AIMessage(content=self.output)
+        conversation = prompt.split("<BEGIN CONVERSATION>")[1].split("<END CONVERSATION>")[0]
+        last = conversation.strip().split("\n\n")[-1]
+        return AIMessage(content="unsafe\nS10" if "unsafe" in last else "safe")
+
+
+def make_guard(fake: FakeGuardModel, **kwargs) -> LlamaGuard:
+    with (
+        patch("agents.llama_guard.settings.GROQ_API_KEY", SecretStr("key")),
+        patch("agents.llama_guard.get_model", return_value=RunnableLambda(fake)),
+    ):
+        return LlamaGuard(**kwargs)
+
+
+CONVERSATION = [
+    HumanMessage(content="Hi"),
+    AIMessage(content="Hello! How can I help?"),
+    HumanMessage(content="What is Anatel?"),
+]
+
+
+@pytest.mark.asyncio
+async def test_verdicts_are_cached_by_role_and_conversation():
+    fake = FakeGuardModel()
+    guard = make_guard(fake, cache_size=10)
+
+    assert (await guard.ainvoke("User", CONVERSATION)).safety_assessment == SafetyAssessment.SAFE
+    assert guard.invoke("User", CONVERSATION).safety_assessment == SafetyAssessment.SAFE
+    await guard.ainvoke("Agent", CONVERSATION)
+    await guard.ainvoke("User", CONVERSATION + [HumanMessage(content="unsafe")])
+
+    assert len(fake.prompts) == 3
+    assert guard.stats() == {"entries": 3, "hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached_and_cache_is_bounded():
+    fake = FakeGuardModel(output="not a verdict")
+    guard = make_guard(fake, cache_size=1)
+    for _ in range(2):
+        output = await guard.ainvoke("User", CONVERSATION)
+        assert output.safety_assessment == SafetyAssessment.ERROR
+    assert len(fake.prompts) == 2
+
+    guard = make_guard(FakeGuardModel(), cache_size=1)
+    await guard.ainvoke("User", CONVERSATION[:1])
+    await guard.ainvoke("User", CONVERSATION)
+    assert guard.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_context_window_only_sends_newest_messages():
+    fake = FakeGuardModel()
+    guard = make_guard(fake, context_messages=2)
+
+    output = await guard.ainvoke("User", CONVERSATION + [HumanMessage(content="unsafe stuff")])
+    assert output.safety_assessment == SafetyAssessment.UNSAFE
+    assert output.unsafe_categories == ["Hate"]
+    assert "User: Hi" not in fake.prompts[0]
+    assert "User: What is Anatel?\n\nUser: unsafe stuff" in fake.prompts[0]
+
+    # A longer thread ending in the same window reuses the verdict
+    longer = [HumanMessage(content="Earlier"), *CONVERSATION, HumanMessage(content="unsafe stuff")]
+    await guard.ainvoke("User", longer)
+    assert len(fake.prompts) == 1
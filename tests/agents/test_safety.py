@@ -0,0 +1,130 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from agents.llama_guard import LlamaGuardOutput, SafetyAssessment
+from agents.safety import aguarded_model_call
+
+SAFE = LlamaGuardOutput(safety_assessment=SafetyAssessment.SAFE)
+UNSAFE = LlamaGuardOutput(safety_assessment=SafetyAssessment.UNSAFE, unsafe_categories=["Hate"])
+
+
+class FakeLlamaGuard:
+    """Flags any conversation whose last message contains "unsafe"."""
+
+    model = object()
+    calls: list[str] = []
+
+    async def ainvoke(self, role, messages):
+        self.calls.append(role)
+        await asyncio.sleep(0.01)
+        return UNSAFE if "unsafe" in messages[-1].content else SAFE
+
+
+@pytest.fixture(autouse=True)
+def llama_guard():
+    FakeLlamaGuard.calls = []
+    with patch("agents.safety.get_llama_guard", FakeLlamaGuard):
+        yield FakeLlamaGuard
+
+
+def model_runnable(answer: str):
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+    return RunnableLambda(lambda state: state["messages"]) | model
+
+
+async def guarded_call(answer: str, question: str):
+    """Run the guarded call inside a runnable, as a graph node would."""
+    state = {"messages": [HumanMessage(content=question)]}
+    runnable = model_runnable(answer)
+
+    async def node(state, config):
+        return await aguarded_model_call(runnable, state, config)
+
+    return await RunnableLambda(node).ainvoke(state)
+
+
+@pytest.mark.asyncio
+async def test_serial_mode_only_checks_output(llama_guard):
+    with patch("agents.safety.settings.LLAMA_GUARD_MODE", "serial"):
+        response, safety = await guarded_call("Hello there", "Hi")
+
+    assert response.content == "Hello there"
+    assert safety == SAFE
+    assert llama_guard.calls == ["Agent"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_mode_checks_input_and_output(llama_guard):
+    with patch("agents.safety.settings.LLAMA_GUARD_MODE", "parallel"):
+        response, safety = await guarded_call("Hello there", "Hi")
+
+    assert response.content == "Hello there"
+    assert safety == SAFE
+    assert sorted(llama_guard.calls) == ["Agent", "User"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_mode_discards_answer_to_unsafe_input(llama_guard):
+    with patch("agents.safety.settings.LLAMA_GUARD_MODE", "parallel"):
+        response, safety = await guarded_call("Hello there", "something unsafe")
+
+    assert response is None
+    assert safety == UNSAFE
+
+
+@pytest.mark.asyncio
+async def test_stream_check_stops_unsafe_answer_early(llama_guard):
+    answer = "this answer turns unsafe " + "and keeps going " * 200
+    with (
+        patch("agents.safety.settings.LLAMA_GUARD_MODE", "serial"),
+        patch("agents.safety.settings.LLAMA_GUARD_STREAM_CHECK_CHARS", 10),
+    ):
+        response, safety = await guarded_call(answer, "Hi")
+
+    assert safety == UNSAFE
+    assert len(response.content) < len(answer)
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_check_falls_back_to_full_answer_check(llama_guard):
+    class FailingOnPartialAnswers(FakeLlamaGuard):
+        async def ainvoke(self, role, messages):
+            if len(self.calls) == 0:
+                self.calls.append(role)
+                raise TimeoutError("LlamaGuard timed out")
+            return await super().ainvoke(role, messages)
+
+    answer = "a safe answer " * 100
+    with (
+        patch("agents.safety.get_llama_guard", FailingOnPartialAnswers),
+        patch("agents.safety.settings.LLAMA_GUARD_MODE", "serial"),
+        patch("agents.safety.settings.LLAMA_GUARD_STREAM_CHECK_CHARS", 10),
+    ):
+        response, safety = await guarded_call(answer, "Hi")
+
+    assert response.content == answer
+    assert safety == SAFE
+    # No more partial checks after the failed one, then the full answer is checked
+    assert FakeLlamaGuard.calls == ["Agent", "Agent"]
+
+
+@pytest.mark.asyncio
+async def test_stream_check_of_empty_answer(llama_guard):
+    async def nothing(state):
+        return
+        yield
+
+    state = {"messages": [HumanMessage(content="Hi")]}
+    with (
+        patch("agents.safety.settings.LLAMA_GUARD_MODE", "serial"),
+        patch("agents.safety.settings.LLAMA_GUARD_STREAM_CHECK_CHARS", 10),
+    ):
+        response, safety = await aguarded_model_call(RunnableLambda(nothing), state, {})
+
+    assert response.content == ""
+    assert safety == SAFE
@@ -1,11 +1,14 @@
 import pytest
 
-from client import AgentClient
+from client import AgentClient, RetryPolicy
 
 
 @pytest.fixture
 def agent_client(mock_env):
     """Fixture for creating a test client with a clean environment."""
-    ac = AgentClient(base_url="http://test", get_info=False)
+    # Retry without waiting, so error tests do not sleep through the backoff
+    ac = AgentClient(
+        base_url="http://test", get_info=False, retry_policy=RetryPolicy(backoff_base=0)
+    )
     ac.update_agent("test-agent", verify=False)
     return ac
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 from unittest.mock import AsyncMock, Mock, patch
@@ -53,14 +54,14 @@ def test_invoke(agent_client):
         json={"type": "ai", "content": ANSWER},
         request=mock_request,
     )
-    with patch("httpx.post", return_value=mock_response):
+    with patch("httpx.Client.post", return_value=mock_response):
         response = agent_client.invoke(QUESTION)
         assert isinstance(response, ChatMessage)
         assert response.type == "ai"
         assert response.content == ANSWER
 
     # Test with model and thread_id
-    with patch("httpx.post", return_value=mock_response) as mock_post:
+    with patch("httpx.Client.post", return_value=mock_response) as mock_post:
         response = agent_client.invoke(
             QUESTION,
             model="gpt-4o",
@@ -75,7 +76,7 @@ def test_invoke(agent_client):
 
     # Test error response
     error_response = Response(500, text="Internal Server Error", request=mock_request)
-    with patch("httpx.post", return_value=error_response):
+    with patch("httpx.Client.post", return_value=error_response):
         with pytest.raises(AgentClientError) as exc:
             agent_client.invoke(QUESTION)
         assert "500 Internal Server Error" in str(exc.value)
@@ -143,7 +144,7 @@ def test_stream(agent_client):
     mock_response.__enter__ = Mock(return_value=mock_response)
     mock_response.__exit__ = Mock(return_value=None)
 
-    with patch("httpx.stream", return_value=mock_response):
+    with patch("httpx.Client.stream", return_value=mock_response):
         # Collect all streamed responses
         responses = list(agent_client.stream(QUESTION))
 
@@ -165,7 +166,7 @@ def test_stream(agent_client):
     error_response_mock = Mock()
     error_response_mock.__enter__ = Mock(return_value=error_response)
     error_response_mock.__exit__ = Mock(return_value=None)
-    with patch("httpx.stream", return_value=error_response_mock):
+    with patch("httpx.Client.stream", return_value=error_response_mock):
         with pytest.raises(AgentClientError) as exc:
             list(agent_client.stream(QUESTION))
         assert "500 Internal Server Error" in str(exc.value)
@@ -277,7 +278,7 @@ def test_get_history(agent_client):
 
     # Mock successful response
     mock_response = Response(200, json=HISTORY, request=Request("POST", "http://test/history"))
-    with patch("httpx.post", return_value=mock_response):
+    with patch("httpx.Client.post", return_value=mock_response):
         history = agent_client.get_history(THREAD_ID)
         assert isinstance(history, ChatHistory)
         assert len(history.messages) == 2
@@ -288,12 +289,36 @@ def test_get_history(agent_client):
     error_response = Response(
         500, text="Internal Server Error", request=Request("POST", "http://test/history")
     )
-    with patch("httpx.post", return_value=error_response):
+    with patch("httpx.Client.post", return_value=error_response):
         with pytest.raises(AgentClientError) as exc:
             agent_client.get_history(THREAD_ID)
         assert "500 Internal Server Error" in str(exc.value)
 
 
+def test_get_history_page(agent_client):
+    """Test paged and streamed chat history of the selected agent."""
+    page = {"messages": [{"type": "ai", "content": "Hello"}], "next_cursor": 3}
+    request = Request("POST", "http://test/test-agent/history")
+    with patch("httpx.Client.post", return_value=Response(200, json=page, request=request)) as post:
+        history = agent_client.get_history("thread", limit=1, before=4)
+    assert post.call_args.args == ("http://test/test-agent/history",)
+    assert post.call_args.kwargs["json"]["limit"] == 1
+    assert post.call_args.kwargs["json"]["before"] == 4
+    assert history.next_cursor == 3
+
+    mock_response = Mock()
+    mock_response.iter_lines.return_value = [
+        json.dumps({"type": "human", "content": "Hi"}),
+        json.dumps({"type": "ai", "content": "Hello"}),
+    ]
+    mock_response.__enter__ = Mock(return_value=mock_response)
+    mock_response.__exit__ = Mock(return_value=None)
+    with patch("httpx.Client.stream", return_value=mock_response) as mock_stream:
+        messages = list(agent_client.stream_history("thread"))
+    assert mock_stream.call_args.kwargs["json"]["stream"] is True
+    assert [m.content for m in messages] == ["Hi", "Hello"]
+
+
 def test_info(agent_client):
     assert agent_client.info is None
     assert agent_client.agent == "test-agent"
@@ -310,7 +335,7 @@ def test_info(agent_client):
     )
 
     # Update an existing client with info
-    with patch("httpx.get", return_value=test_response):
+    with patch("httpx.Client.get", return_value=test_response):
         agent_client.retrieve_info()
 
     assert agent_client.info == test_info
@@ -322,7 +347,7 @@ def test_info(agent_client):
     assert "Agent unknown-agent not found in available agents: custom-agent" in str(exc.value)
 
     # Test a fresh client with info
-    with patch("httpx.get", return_value=test_response):
+    with patch("httpx.Client.get", return_value=test_response):
         agent_client = AgentClient(base_url="http://test")
     assert agent_client.info == test_info
     assert agent_client.agent == "custom-agent"
@@ -332,3 +357,128 @@ def test_info(agent_client):
     with pytest.raises(AgentClientError) as exc:
         agent_client.invoke("test")
     assert "No agent selected. Use update_agent() to select an agent." in str(exc.value)
+
+
+def test_http_client_is_reused_and_closed(mock_env):
+    """The sync HTTP client is pooled for the lifetime of the AgentClient."""
+    with AgentClient(base_url="http://test", get_info=False, max_keepalive_connections=5) as client:
+        http_client = client.client
+        assert client.client is http_client
+        assert http_client._transport._pool._max_keepalive_connections == 5
+    assert http_client.is_closed
+
+    # A closed client is replaced on next use
+    assert not client.client.is_closed
+    client.close()
+
+
+def test_async_http_client_per_event_loop(mock_env):
+    """The async HTTP client is reused within an event loop and closed by aclose."""
+    client = AgentClient(base_url="http://test", get_info=False)
+
+    async def get_clients():
+        return client.async_client, client.async_client
+
+    first, same = asyncio.run(get_clients())
+    assert first is same
+    # Closed before its loop was
+    assert first.is_closed
+    # A new event loop gets its own client, since connections are bound to their loop
+    second, _ = asyncio.run(get_clients())
+    assert second is not first
+
+    async def use_and_close():
+        async with client:
+            http_client = client.async_client
+        return http_client
+
+    assert asyncio.run(use_and_close()).is_closed
+
+
+def test_async_http_client_closed_in_its_loop_when_replaced(mock_env):
+    """A client replaced by one of another loop is closed in its own loop, if that is open."""
+    client = AgentClient(base_url="http://test", get_info=False)
+
+    async def get_client():
+        return client.async_client
+
+    old_loop = asyncio.new_event_loop()
+    try:
+        first = old_loop.run_until_complete(get_client())
+        second = asyncio.run(get_client())
+        assert second is not first
+        assert not first.is_closed
+        # Closed as soon as its loop runs again
+        old_loop.run_until_complete(asyncio.sleep(0))
+        assert first.is_closed
+    finally:
+        old_loop.close()
+
+
+def test_batch(agent_client):
+    """Test batch invocation, with results in completion order."""
+    lines = [
+        json.dumps({"index": 1, "output": {"type": "ai", "content": "two"}}),
+        json.dumps({"index": 0, "output": None, "error": "Unexpected error"}),
+    ]
+    mock_response = Mock()
+    mock_response.iter_lines.return_value = lines
+    mock_response.__enter__ = Mock(return_value=mock_response)
+    mock_response.__exit__ = Mock(return_value=None)
+
+    with patch("httpx.Client.stream", return_value=mock_response) as mock_stream:
+        results = list(agent_client.batch(["one", "two"], model="gpt-4o", max_concurrency=2))
+
+    args, kwargs = mock_stream.call_args
+    assert args == ("POST", "http://test/test-agent/batch")
+    assert [i["message"] for i in kwargs["json"]["inputs"]] == ["one", "two"]
+    assert kwargs["json"]["inputs"][0]["model"] == "gpt-4o"
+    assert kwargs["json"]["max_concurrency"] == 2
+    assert results[0].index == 1
+    assert results[0].output.content == "two"
+    assert results[1].error == "Unexpected error"
+
+
+@pytest.mark.asyncio
+async def test_abatch(agent_client):
+    """Test asynchronous batch invocation."""
+
+    async def lines():
+        yield json.dumps({"index": 0, "output": {"type": "ai", "content": "one"}})
+
+    mock_response = AsyncMock()
+    mock_response.raise_for_status = Mock()
+    mock_response.aiter_lines = Mock(return_value=lines())
+    mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+
+    with patch("httpx.AsyncClient.stream", return_value=mock_response):
+        results = [result async for result in agent_client.abatch(["one"])]
+    assert results[0].output.content == "one"
+
+
+def test_jobs(agent_client):
+    """Test submitting, polling and cancelling a job."""
+    queued = {"job_id": "job", "agent_id": "test-agent", "status": "queued", "created_at": 1.0}
+    done = queued | {"status": "succeeded", "output": {"type": "ai", "content": "Done"}}
+    request = Request("POST", "http://test/test-agent/jobs")
+
+    with patch("httpx.Client.post", return_value=Response(202, json=queued, request=request)):
+        job = agent_client.submit_job("Hi", thread_id="thread")
+    assert job.status == "queued"
+
+    responses = [Response(200, json=body, request=request) for body in (queued, done)]
+    with (
+        patch("httpx.Client.get", side_effect=responses) as mock_get,
+        patch("client.client.time.sleep"),
+    ):
+        job = agent_client.wait_for_job("job")
+    assert mock_get.call_args.args == ("http://test/jobs/job",)
+    assert job.output.content == "Done"
+
+    cancelled = queued | {"status": "cancelled"}
+    with patch("httpx.Client.delete", return_value=Response(200, json=cancelled, request=request)):
+        assert agent_client.cancel_job("job").status == "cancelled"
+
+    with patch("httpx.Client.get", return_value=Response(200, json=queued, request=request)):
+        with pytest.raises(AgentClientError):
+            agent_client.wait_for_job("job", poll_interval=0, timeout=0)
@@ -0,0 +1,147 @@
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+from httpx import Request, Response
+
+from client import AgentClientError, RetryBudget, RetryPolicy
+from client.client import AgentClientContextSizeError
+from client.retry import parse_retry_after
+
+REQUEST = Request("POST", "http://test/test-agent/invoke")
+GET_REQUEST = Request("GET", "http://test/jobs/1")
+ANSWER = Response(200, json={"type": "ai", "content": "Hi!"}, request=REQUEST)
+
+
+def error(status: int, headers: dict | None = None, request: Request = REQUEST) -> Response:
+    return Response(status, text="error", headers=headers, request=request)
+
+
+def status_error(
+    status: int, headers: dict | None = None, request: Request = REQUEST
+) -> httpx.HTTPStatusError:
+    response = error(status, headers, request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_backoff_and_retry_after():
+    policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+
+    jittered = RetryPolicy(backoff_base=1, jitter=0.5)
+    assert all(0.5 <= jittered.delay(0) <= 1 for _ in range(100))
+
+    assert policy.delay(0, status_error(429, {"Retry-After": "3"})) == 3
+    assert policy.delay(0, status_error(429, {"Retry-After": "3600"})) == policy.max_retry_after
+    in_two_minutes = format_datetime(datetime.now(UTC) + timedelta(minutes=2), usegmt=True)
+    assert 100 < parse_retry_after(in_two_minutes) <= 120
+    assert parse_retry_after("not a date") is None
+
+
+def test_retryable_errors_and_budget():
+    policy = RetryPolicy(max_retries=2, budget=None)
+    assert policy.should_retry(0, status_error(503))
+    assert policy.should_retry(1, httpx.ConnectError("reset"))
+    assert not policy.should_retry(2, status_error(503))
+    assert not policy.should_retry(0, status_error(400))
+
+    # POSTs that may have reached the agent are not retried, GETs are
+    assert not policy.should_retry(0, status_error(500))
+    assert not policy.should_retry(0, httpx.ReadTimeout("timeout", request=REQUEST))
+    assert policy.should_retry(0, httpx.ConnectTimeout("timeout", request=REQUEST))
+    assert policy.should_retry(0, status_error(500, request=GET_REQUEST))
+    assert policy.should_retry(0, httpx.ReadTimeout("timeout", request=GET_REQUEST))
+    assert not policy.should_retry(0, status_error(413, request=GET_REQUEST))
+
+    budget = RetryBudget(ratio=0.5, initial=1, capacity=2)
+    policy = RetryPolicy(budget=budget)
+    assert policy.should_retry(0, status_error(503))
+    assert not policy.should_retry(0, status_error(503))
+    policy.record_request()
+    policy.record_request()
+    assert policy.should_retry(0, status_error(503))
+
+
+def test_invoke_retries_transient_errors(agent_client):
+    responses = [error(503), error(429, {"Retry-After": "0"}), ANSWER]
+    with patch("httpx.Client.post", side_effect=responses) as mock_post:
+        assert agent_client.invoke("Hi").content == "Hi!"
+    assert mock_post.call_count == 3
+
+    with patch("httpx.Client.post", side_effect=[error(400), ANSWER]) as mock_post:
+        with pytest.raises(AgentClientError):
+            agent_client.invoke("Hi")
+    assert mock_post.call_count == 1
+
+    with patch("httpx.Client.post", side_effect=[error(500), ANSWER]) as mock_post:
+        with pytest.raises(AgentClientError):
+            agent_client.invoke("Hi")
+    assert mock_post.call_count == 1
+
+
+def test_invoke_raises_context_size_error(agent_client):
+    with patch("httpx.Client.post", return_value=error(413)) as mock_post:
+        with pytest.raises(AgentClientContextSizeError):
+            agent_client.invoke("Hi")
+    assert mock_post.call_count == 1
+
+
+def test_invoke_retry_waits_with_backoff(agent_client):
+    agent_client.retry_policy = RetryPolicy(backoff_base=0.5, jitter=0)
+    with (
+        patch("httpx.Client.post", side_effect=[httpx.ConnectError("reset"), ANSWER]),
+        patch("client.retry.time.sleep") as sleep,
+    ):
+        agent_client.invoke("Hi")
+    sleep.assert_called_once_with(0.5)
+
+
+@pytest.mark.asyncio
+async def test_ainvoke_retries_transient_errors(agent_client):
+    with patch("httpx.AsyncClient.post", side_effect=[error(503), ANSWER]) as mock_post:
+        assert (await agent_client.ainvoke("Hi")).content == "Hi!"
+    assert mock_post.await_count == 2
+
+
+def test_stream_retries_until_first_output(agent_client):
+    ok = Mock()
+    ok.iter_lines.return_value = ['data: {"type": "token", "content": "Hi"}', "data: [DONE]"]
+    ok.raise_for_status = Mock()
+    failing = Response(503, request=REQUEST)
+
+    def stream_context(response):
+        context = Mock()
+        context.__enter__ = Mock(return_value=response)
+        context.__exit__ = Mock(return_value=None)
+        return context
+
+    streams = [stream_context(failing), stream_context(ok)]
+    with patch("httpx.Client.stream", side_effect=streams) as mock_stream:
+        assert list(agent_client.stream("Hi")) == ["Hi"]
+    assert mock_stream.call_count == 2
+
+    # An error after output was yielded is not retried
+    def lines_then_reset():
+        yield 'data: {"type": "token", "content": "Hi"}'
+        raise httpx.ReadError("reset")
+
+    broken = Mock()
+    broken.raise_for_status = Mock()
+    broken.iter_lines.side_effect = lines_then_reset
+    with patch("httpx.Client.stream", return_value=stream_context(broken)) as mock_stream:
+        received = []
+        with pytest.raises(AgentClientError):
+            for token in agent_client.stream("Hi"):
+                received.append(token)
+    assert received == ["Hi"]
+    assert mock_stream.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_acreate_feedback_retries(agent_client):
+    feedback = Response(200, json={}, request=Request("POST", "http://test/feedback"))
+    with patch("httpx.AsyncClient.post", AsyncMock(side_effect=[error(503), feedback])) as post:
+        await agent_client.acreate_feedback("run", "key", 1.0)
+    assert post.await_count == 2
@@ -0,0 +1,72 @@
+from unittest.mock import Mock
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.embedding import CachedEmbeddings, SqliteEmbeddingStore
+
+
+@pytest.fixture
+def fake_embeddings():
+    return Mock(wraps=DeterministicFakeEmbedding(size=4))
+
+
+def test_cached_query_hits_model_once(fake_embeddings):
+    embeddings = CachedEmbeddings(fake_embeddings, model_name="fake")
+
+    first = embeddings.embed_query("Resolução 667")
+    assert embeddings.embed_query("Resolução 667") == first
+
+    fake_embeddings.embed_query.assert_called_once_with("Resolução 667")
+    assert embeddings.stats() == {"hits": 1, "persistent_hits": 0, "misses": 1, "size": 1}
+
+
+def test_cached_documents_only_embed_missing_texts(fake_embeddings):
+    embeddings = CachedEmbeddings(fake_embeddings, model_name="fake")
+    embeddings.embed_documents(["a", "b"])
+
+    vectors = embeddings.embed_documents(["a", "c", "c"])
+
+    fake_embeddings.embed_documents.assert_called_with(["c"])
+    assert vectors[1] == vectors[2]
+    assert vectors[0] == embeddings.embed_documents(["a"])[0]
+
+
+def test_queries_and_documents_are_cached_separately(fake_embeddings):
+    embeddings = CachedEmbeddings(fake_embeddings, model_name="fake")
+    embeddings.embed_documents(["a"])
+    embeddings.embed_query("a")
+
+    fake_embeddings.embed_query.assert_called_once_with("a")
+
+
+def test_lru_eviction(fake_embeddings):
+    embeddings = CachedEmbeddings(fake_embeddings, model_name="fake", max_size=2)
+    for text in ["a", "b", "a", "c"]:
+        embeddings.embed_query(text)
+    embeddings.embed_query("b")
+
+    assert fake_embeddings.embed_query.call_count == 4
+    assert embeddings.stats()["size"] == 2
+
+
+def test_persistent_tier(fake_embeddings, tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    vector = CachedEmbeddings(
+        fake_embeddings, model_name="fake", store=SqliteEmbeddingStore(path)
+    ).embed_query("a")
+
+    embeddings = CachedEmbeddings(
+        fake_embeddings, model_name="fake", store=SqliteEmbeddingStore(path)
+    )
+    assert embeddings.embed_query("a") == vector
+    assert embeddings.stats()["persistent_hits"] == 1
+    fake_embeddings.embed_query.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_cache(fake_embeddings):
+    embeddings = CachedEmbeddings(fake_embeddings, model_name="fake")
+    assert await embeddings.aembed_query("a") == embeddings.embed_query("a")
+    assert await embeddings.aembed_documents(["a"]) == embeddings.embed_documents(["a"])
+    assert embeddings.stats()["hits"] == 2
@@ -0,0 +1,74 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from core.fake_llm import FakeModelError, SimulatedChatModel
+from core.llm import get_model
+from schemas.models import FakeModelName
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look up a query."""
+    return query
+
+
+def instant_model(**kwargs) -> SimulatedChatModel:
+    return SimulatedChatModel(first_token_latency=0, token_delay=0, **kwargs)
+
+
+def test_streams_tokens_with_latency() -> None:
+    model = SimulatedChatModel(first_token_latency=0.05, token_delay=0.01, response_tokens=5)
+    start = time.perf_counter()
+    chunks = list(model.stream("Hi"))
+    elapsed = time.perf_counter() - start
+
+    assert len(chunks) == 5
+    assert elapsed >= 0.09
+    assert model.invoke("Hi").content == "".join(chunk.content for chunk in chunks)
+
+
+def test_response_length_distribution() -> None:
+    model = instant_model(response_tokens=20, response_tokens_stddev=5, seed=1)
+    lengths = {len(list(model.stream("Hi"))) for _ in range(20)}
+    assert len(lengths) > 1
+    assert min(lengths) >= 1
+
+
+def test_calls_bound_tool() -> None:
+    model = instant_model(tool_call_rate=1).bind_tools([lookup])
+
+    answer = model.invoke([HumanMessage(content="numbering rules")])
+    assert answer.content == ""
+    assert answer.tool_calls[0]["name"] == "lookup"
+    assert answer.tool_calls[0]["args"] == {"query": "numbering rules"}
+
+    # Tool results are answered with text
+    tool_result = ToolMessage(content="...", tool_call_id=answer.tool_calls[0]["id"])
+    answer = model.invoke([HumanMessage(content="numbering rules"), answer, tool_result])
+    assert answer.content and not answer.tool_calls
+    # So is a model without tools
+    assert not instant_model(tool_call_rate=1).invoke("Hi").tool_calls
+
+
+def test_error_injection() -> None:
+    with pytest.raises(FakeModelError):
+        instant_model(error_rate=1).invoke("Hi")
+    assert isinstance(instant_model(error_rate=0).invoke("Hi"), AIMessage)
+
+
+def test_get_model_simulated() -> None:
+    get_model.cache_clear()
+    try:
+        with (
+            patch("core.llm.settings.FAKE_MODEL_SIMULATED", True),
+            patch("core.llm.settings.FAKE_MODEL_TOKEN_DELAY", 0.5),
+        ):
+            model = get_model(FakeModelName.FAKE)
+        assert isinstance(model, SimulatedChatModel)
+        assert model.token_delay == 0.5
+    finally:
+        get_model.cache_clear()
@@ -0,0 +1,124 @@
+import json
+import logging
+import queue
+import sys
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.log import (
+    ContextFilter,
+    DroppingQueueHandler,
+    RequestLoggingMiddleware,
+    StructuredFormatter,
+    request_id_var,
+    sample_rate,
+    sampled_var,
+)
+
+
+def record(msg: str, *args, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    log_record = logging.makeLogRecord(
+        {"name": "test", "levelno": level, "levelname": logging.getLevelName(level)}
+    )
+    log_record.msg, log_record.args = msg, args
+    for key, value in extra.items():
+        setattr(log_record, key, value)
+    return log_record
+
+
+def test_filter_truncates_long_arguments() -> None:
+    log_filter = ContextFilter(max_chars=10)
+    long_input = record("input: %s %r %d", "x" * 100, "short", 12345678901234, thread_id="t" * 50)
+    assert log_filter.filter(long_input)
+    assert long_input.getMessage() == "input: xxxxxxxxxx... (100 chars) 'short' 12345678901234"
+    assert long_input.thread_id == "tttttttttt... (50 chars)"
+
+
+def test_filter_snapshots_mutable_arguments() -> None:
+    messages = ["hi"]
+    log_record = record("messages: %s %d", messages, 3, state={"step": 1})
+    assert ContextFilter().filter(log_record)
+    # Changed after logging, before the listener thread formats the record
+    messages.append("changed")
+    assert log_record.getMessage() == "messages: ['hi'] 3"
+    assert log_record.state == "{'step': 1}"
+
+
+def test_filter_adds_request_id_and_samples() -> None:
+    log_filter = ContextFilter()
+    request_token = request_id_var.set("abc")
+    sampled_token = sampled_var.set(False)
+    try:
+        info = record("info")
+        assert not log_filter.filter(info)
+        warning = record("warning", level=logging.WARNING)
+        assert log_filter.filter(warning)
+        assert warning.request_id == "abc"
+    finally:
+        sampled_var.reset(sampled_token)
+        request_id_var.reset(request_token)
+
+
+def test_structured_formatter() -> None:
+    log_record = record("hello %s", "world", agent_id="chatbot")
+    log_record.request_id = "abc"
+
+    text = StructuredFormatter().format(log_record)
+    assert text.endswith("hello world request_id=abc agent_id=chatbot")
+
+    entry = json.loads(StructuredFormatter(json=True).format(log_record))
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "abc"
+    assert entry["agent_id"] == "chatbot"
+
+
+def test_queue_handler_drops_records_when_full() -> None:
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(record("first"))
+    handler.handle(record("second"))
+    assert handler.stats() == {"queued": 1, "dropped": 1}
+
+
+def test_queued_exception_is_formatted_by_listener() -> None:
+    log_queue: queue.Queue = queue.Queue()
+    handler = DroppingQueueHandler(log_queue)
+    try:
+        raise ValueError("bad input")
+    except ValueError:
+        handler.handle(record("failed %s", "job", level=logging.ERROR, exc_info=sys.exc_info()))
+
+    queued = log_queue.get_nowait()
+    assert queued.msg == "failed %s" and queued.exc_info is not None
+    entry = json.loads(StructuredFormatter(json=True).format(queued))
+    assert entry["message"] == "failed job"
+    assert entry["exception"].endswith("ValueError: bad input")
+
+
+def test_sample_rate() -> None:
+    rates = {"/stream": 0.1, "/chatbot/invoke": 0.5}
+    with patch("core.log.settings.LOG_SAMPLE_RATES", rates):
+        assert sample_rate("/research-assistant/stream") == 0.1
+        assert sample_rate("/chatbot/invoke") == 0.5
+        assert sample_rate("/invoke") == 1.0
+
+
+def test_middleware_sets_request_id() -> None:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware)
+
+    @app.get("/ping")
+    async def ping() -> dict:
+        return {"request_id": request_id_var.get(), "sampled": sampled_var.get()}
+
+    client = TestClient(app)
+    response = client.get("/ping", headers={"X-Request-ID": "given"})
+    assert response.headers["X-Request-ID"] == "given"
+    assert response.json() == {"request_id": "given", "sampled": True}
+
+    response = client.get("/ping")
+    assert response.headers["X-Request-ID"] == response.json()["request_id"]
+
+    with patch("core.log.settings.LOG_SAMPLE_RATES", {"/ping": 0.0}):
+        assert client.get("/ping").json()["sampled"] is False
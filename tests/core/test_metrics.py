@@ -0,0 +1,63 @@
+import pytest
+
+from core.llm import get_model
+from core.metrics import LLM_DURATION, Counter, Gauge, Histogram, Registry
+from schemas.models import FakeModelName
+
+
+def test_render_prometheus_text_format() -> None:
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("route",), registry=registry)
+    in_flight = Gauge("in_flight", "In flight.", registry=registry)
+    latency = Histogram(
+        "latency_seconds", "Latency.", ("route",), buckets=(0.1, 1), registry=registry
+    )
+
+    requests.inc(route='/say "hi"')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    latency.observe(0.05, route="/a")
+    latency.observe(0.1, route="/a")
+    latency.observe(5, route="/a")
+
+    text = registry.render({"jobs": {"running": 2, "enabled": True, "name": "x"}})
+    assert text.splitlines() == [
+        "# HELP agent_service_requests_total Requests.",
+        "# TYPE agent_service_requests_total counter",
+        'agent_service_requests_total{route="/say \\"hi\\""} 1',
+        "# HELP agent_service_in_flight In flight.",
+        "# TYPE agent_service_in_flight gauge",
+        "agent_service_in_flight 1",
+        "# HELP agent_service_latency_seconds Latency.",
+        "# TYPE agent_service_latency_seconds histogram",
+        'agent_service_latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'agent_service_latency_seconds_bucket{route="/a",le="1"} 2',
+        'agent_service_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'agent_service_latency_seconds_sum{route="/a"} 5.15',
+        'agent_service_latency_seconds_count{route="/a"} 3',
+        "# TYPE agent_service_jobs_running gauge",
+        "agent_service_jobs_running 2",
+    ]
+
+
+def test_labels_are_checked() -> None:
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency.", ("route",), registry=registry)
+    with pytest.raises(ValueError, match="takes the labels"):
+        latency.observe(1, agent="chatbot")
+    with pytest.raises(ValueError, match="already registered"):
+        Counter("latency_seconds", "Latency.", registry=registry)
+
+
+def test_histogram_time() -> None:
+    latency = Histogram("latency_seconds", "Latency.", registry=Registry())
+    with pytest.raises(RuntimeError), latency.time():
+        raise RuntimeError
+    assert latency.count() == 1
+
+
+def test_model_calls_are_timed() -> None:
+    before = LLM_DURATION.count(provider="fake", status="ok")
+    get_model(FakeModelName.FAKE).invoke("Hello")
+    assert LLM_DURATION.count(provider="fake", status="ok") == before + 1
@@ -0,0 +1,43 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from db.agent_model import DatabaseManager
+
+PGVECTOR_ENV = {
+    "AGENT_PGVECTOR_USER": "user",
+    "AGENT_PGVECTOR_PWD": "pwd",
+    "AGENT_PGVECTOR_HOST": "localhost",
+    "AGENT_PGVECTOR_DB": "agent_db",
+}
+
+
+@pytest.fixture
+def db_manager():
+    with patch.dict(os.environ, PGVECTOR_ENV):
+        with (
+            patch("db.agent_model.settings.PGVECTOR_POOL_SIZE", 4),
+            patch("db.agent_model.settings.PGVECTOR_MAX_OVERFLOW", 2),
+        ):
+            yield DatabaseManager()
+
+
+def test_pool_configured_from_settings(db_manager):
+    status = db_manager.pool_status()
+    assert status["size"] == 4
+    assert status["checked_out"] == 0
+    assert db_manager.engine.pool._max_overflow == 2
+
+
+def test_vector_store_cached_per_collection(db_manager):
+    with (
+        patch("langchain_postgres.PGVector") as mock_pgvector,
+        patch("db.agent_model.get_embedding_model"),
+    ):
+        first = db_manager.get_vector_store("collection_a")
+        assert db_manager.get_vector_store("collection_a") is first
+        db_manager.get_vector_store("collection_b")
+
+    assert mock_pgvector.call_count == 2
+    assert mock_pgvector.call_args.kwargs["connection"] is db_manager.engine
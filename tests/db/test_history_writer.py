@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from db.history_writer import AnalysisHistoryWriter
+
+
+@pytest.fixture
+def db_manager():
+    return Mock()
+
+
+def make_writer(db_manager, **kwargs) -> AnalysisHistoryWriter:
+    kwargs = {"max_queue_size": 10, "batch_size": 3, "flush_interval": 0.05} | kwargs
+    return AnalysisHistoryWriter(db_manager_factory=lambda: db_manager, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_writer_batches_records(db_manager):
+    writer = make_writer(db_manager)
+    await writer.start()
+    for i in range(4):
+        await writer.submit(code_snippet=f"code {i}", suggestions="looks good")
+    await writer.stop()
+
+    batches = [call.args[0] for call in db_manager.add_records.call_args_list]
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert batches[0][0]["code_snippet"] == "code 0"
+    metrics = writer.metrics()
+    assert metrics["records_written"] == 4
+    assert metrics["batches_flushed"] == 2
+    assert metrics["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_interval(db_manager):
+    writer = make_writer(db_manager, batch_size=100, flush_interval=0.01)
+    await writer.start()
+    await writer.submit(code_snippet="code", suggestions="looks good")
+    await asyncio.sleep(0.1)
+
+    db_manager.add_records.assert_called_once()
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_writer_counts_failures(db_manager):
+    db_manager.add_records.side_effect = RuntimeError("database is down")
+    writer = make_writer(db_manager)
+    await writer.start()
+    await writer.submit(code_snippet="code", suggestions="looks good")
+    await writer.stop()
+
+    assert writer.metrics()["records_failed"] == 1
+    assert writer.metrics()["records_written"] == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_writes_directly_when_not_running(db_manager):
+    writer = make_writer(db_manager)
+    await writer.submit(code_snippet="code", suggestions="looks good")
+
+    db_manager.add_records.assert_called_once()
+    assert writer.metrics()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_database_manager_is_created_off_the_loop(db_manager):
+    threads = []
+
+    def factory():
+        # Connects and creates the tables on first use
+        threads.append(threading.get_ident())
+        return db_manager
+
+    writer = AnalysisHistoryWriter(db_manager_factory=factory)
+    await writer.submit(code_snippet="code", suggestions="looks good")
+
+    assert threads and threading.get_ident() not in threads
+    db_manager.add_records.assert_called_once()
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from db.ingestion import (
+    RESOLUTIONS_COLLECTION,
+    generate_content_hash,
+    generate_doc_id,
+    ingest_resolutions,
+    plan_chunk_changes,
+)
+
+URL = "https://example.com/resolucao"
+
+
+@pytest.fixture(autouse=True)
+def text_splitter():
+    """Split by characters so tests don't download the tiktoken encoding."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=0)
+    with patch("db.ingestion.get_text_splitter", return_value=splitter):
+        yield splitter
+
+
+def test_plan_chunk_changes():
+    kept, new, shared = Document("kept"), Document("new"), Document("shared")
+    previous_ids = {generate_doc_id(kept), "stale", "stale-shared"}
+    shared_ids = {generate_doc_id(shared), "stale-shared"}
+
+    to_add, to_remove = plan_chunk_changes([kept, new, new, shared], previous_ids, shared_ids)
+
+    assert to_add == {generate_doc_id(new): new}
+    assert to_remove == ["stale"]
+
+    # Forcing re-adds every chunk, and still removes the stale ones
+    to_add, to_remove = plan_chunk_changes([kept, shared], previous_ids, shared_ids, force=True)
+    assert to_add.keys() == {generate_doc_id(kept), generate_doc_id(shared)}
+    assert to_remove == ["stale"]
+
+
+def test_ingest_skips_unchanged_source():
+    docs = [Document("Resolução nº 667")]
+    db_manager = Mock()
+    db_manager.get_ingestion_record.return_value = SimpleNamespace(
+        content_hash=generate_content_hash(docs), chunk_ids=[generate_doc_id(docs[0])]
+    )
+    vector_store = Mock()
+
+    with patch("db.ingestion.load_url", return_value=docs):
+        reports = ingest_resolutions([URL], db_manager=db_manager, vector_store=vector_store)
+
+    assert reports[0].status == "unchanged"
+    vector_store.add_documents.assert_not_called()
+    vector_store.delete.assert_not_called()
+    db_manager.save_ingestion_record.assert_not_called()
+
+
+def test_ingest_changed_source_only_embeds_new_chunks():
+    docs = [Document("Resolução nº 754")]
+    chunk_id = generate_doc_id(docs[0])
+    db_manager = Mock()
+    db_manager.get_ingestion_record.return_value = SimpleNamespace(
+        content_hash="outdated", chunk_ids=["stale"]
+    )
+    db_manager.get_indexed_chunk_ids.return_value = set()
+    vector_store = Mock()
+
+    with patch("db.ingestion.load_url", return_value=docs):
+        reports = ingest_resolutions([URL], db_manager=db_manager, vector_store=vector_store)
+
+    assert reports[0].status == "indexed"
+    assert (reports[0].added, reports[0].removed) == (1, 1)
+    vector_store.add_documents.assert_called_once()
+    assert vector_store.add_documents.call_args.kwargs["ids"] == [chunk_id]
+    vector_store.delete.assert_called_once_with(ids=["stale"])
+    db_manager.save_ingestion_record.assert_called_once_with(
+        URL, RESOLUTIONS_COLLECTION, generate_content_hash(docs), [chunk_id]
+    )
+
+
+def test_ingest_failure_does_not_stop_other_sources():
+    db_manager = Mock()
+    db_manager.get_ingestion_record.return_value = None
+    db_manager.get_indexed_chunk_ids.return_value = set()
+    vector_store = Mock()
+
+    def load(url):
+        if url == "bad":
+            raise ConnectionError("unreachable")
+        return [Document("Resolução nº 765")]
+
+    with patch("db.ingestion.load_url", side_effect=load):
+        reports = ingest_resolutions(["bad", URL], db_manager=db_manager, vector_store=vector_store)
+
+    assert [r.status for r in reports] == ["failed", "indexed"]
+    db_manager.save_ingestion_record.assert_called_once()
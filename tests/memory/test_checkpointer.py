@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import END, MessagesState, StateGraph
+from langgraph.types import interrupt
+
+from memory.checkpointer import BoundedMemorySaver, CheckpointerProxy
+
+
+def put(saver: BoundedMemorySaver, thread_id: str, checkpoints: int = 1) -> None:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(checkpoints):
+        metadata = {"source": "loop", "step": step, "writes": {}, "parents": {}}
+        config = saver.put(config, empty_checkpoint(), metadata, {})
+
+
+def checkpoint_ids(saver: BoundedMemorySaver, thread_id: str) -> list[str]:
+    config = {"configurable": {"thread_id": thread_id}}
+    return [c.config["configurable"]["checkpoint_id"] for c in saver.list(config)]
+
+
+def test_keeps_newest_checkpoints_per_thread() -> None:
+    saver = BoundedMemorySaver(max_threads=None, max_checkpoints=3, max_bytes=None, ttl=None)
+    put(saver, "thread", checkpoints=5)
+    ids = checkpoint_ids(saver, "thread")
+    assert len(ids) == 3
+    latest = saver.get_tuple({"configurable": {"thread_id": "thread"}})
+    assert latest.config["configurable"]["checkpoint_id"] == max(ids)
+    # The parent of the oldest kept checkpoint was deleted, but the chain is still readable
+    assert saver.get_tuple({"configurable": {"thread_id": "thread", "checkpoint_id": min(ids)}})
+
+
+def test_evicts_least_recently_used_threads() -> None:
+    saver = BoundedMemorySaver(max_threads=2, max_checkpoints=None, max_bytes=None, ttl=None)
+    put(saver, "a")
+    put(saver, "b")
+    # Reading "a" makes "b" the least recently used thread
+    saver.get_tuple({"configurable": {"thread_id": "a"}})
+    put(saver, "c")
+
+    assert checkpoint_ids(saver, "a")
+    assert checkpoint_ids(saver, "c")
+    assert saver.get_tuple({"configurable": {"thread_id": "b"}}) is None
+    assert saver.stats()["evicted_threads"] == 1
+
+
+def test_evicts_threads_over_max_bytes() -> None:
+    saver = BoundedMemorySaver(max_threads=None, max_checkpoints=None, max_bytes=None, ttl=None)
+    put(saver, "a")
+    size = saver.total_bytes
+    saver.max_bytes = int(size * 2.5)
+    put(saver, "b")
+    put(saver, "c")
+    assert saver.stats()["threads"] == 2
+    assert saver.total_bytes <= saver.max_bytes
+    assert saver.get_tuple({"configurable": {"thread_id": "a"}}) is None
+
+
+def test_expires_unused_threads() -> None:
+    saver = BoundedMemorySaver(max_threads=None, max_checkpoints=None, max_bytes=None, ttl=60)
+    with patch("memory.checkpointer.time.monotonic", return_value=0):
+        put(saver, "old")
+    with patch("memory.checkpointer.time.monotonic", return_value=30):
+        put(saver, "recent")
+    with patch("memory.checkpointer.time.monotonic", return_value=70):
+        put(saver, "new")
+        assert saver.get_tuple({"configurable": {"thread_id": "old"}}) is None
+        assert saver.get_tuple({"configurable": {"thread_id": "recent"}}) is not None
+    assert saver.total_bytes == sum(saver._thread_bytes.values())
+
+
+@pytest.mark.asyncio
+async def test_proxy_switches_saver_of_compiled_graph() -> None:
+    graph = StateGraph(MessagesState)
+    graph.add_node("echo", lambda state: {"messages": [("ai", "echo")]})
+    graph.set_entry_point("echo")
+    graph.add_edge("echo", END)
+    proxy = CheckpointerProxy(BoundedMemorySaver())
+    agent = graph.compile(checkpointer=proxy)
+    config = {"configurable": {"thread_id": "thread"}}
+
+    await agent.ainvoke({"messages": [("human", "hi")]}, config)
+    assert len((await agent.aget_state(config)).values["messages"]) == 2
+
+    database = MemorySaver()
+    proxy.use(database)
+    assert (await agent.aget_state(config)).values == {}
+    await agent.ainvoke({"messages": [("human", "hi")]}, config)
+    assert database.get_tuple(config) is not None
+
+
+@pytest.mark.asyncio
+async def test_proxy_writes_to_saver_without_task_path() -> None:
+    """AsyncSqliteSaver.aput_writes doesn't take the task path other savers take."""
+
+    def ask(state: MessagesState) -> dict:
+        interrupt("Continue?")
+        return {}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("ask", ask)
+    graph.set_entry_point("ask")
+    graph.add_edge("ask", END)
+    proxy = CheckpointerProxy(BoundedMemorySaver())
+    agent = graph.compile(checkpointer=proxy)
+    config = {"configurable": {"thread_id": "thread"}}
+
+    async with AsyncSqliteSaver.from_conn_string(":memory:") as saver:
+        proxy.use(saver)
+        await agent.ainvoke({"messages": [("human", "hi")]}, config)
+        assert (await agent.aget_state(config)).tasks[0].interrupts
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from memory.compaction import checkpoint_id_at, compact_checkpoints, compact_periodically
+
+
+async def put(
+    saver: AsyncSqliteSaver, thread_id: str, checkpoint_id: str | None = None, size: int = 10
+) -> dict:
+    checkpoint = empty_checkpoint()
+    if checkpoint_id is not None:
+        checkpoint["id"] = checkpoint_id
+    checkpoint["channel_values"] = {"messages": "x" * size}
+    checkpoint["channel_versions"] = {"messages": 1}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    metadata = {"source": "loop", "step": 0, "writes": {}, "parents": {}}
+    config = await saver.aput(config, checkpoint, metadata, {"messages": 1})
+    await saver.aput_writes(config, [("messages", "y" * size)], task_id="task")
+    return config
+
+
+async def count(saver: AsyncSqliteSaver, table: str) -> int:
+    async with saver.conn.execute(f"SELECT COUNT(*) FROM {table}") as cur:
+        (rows,) = await cur.fetchone()
+    return rows
+
+
+def test_checkpoint_id_at_orders_like_checkpoint_ids() -> None:
+    now = time.time()
+    checkpoint_id = str(uuid6())
+    assert checkpoint_id_at(now - 1) < checkpoint_id < checkpoint_id_at(now + 1)
+
+
+@pytest.mark.asyncio
+async def test_keeps_newest_checkpoints_per_thread(tmp_path) -> None:
+    async with AsyncSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db")) as saver:
+        for thread_id in ("a", "b"):
+            for _ in range(5):
+                latest = await put(saver, thread_id)
+
+        report = await compact_checkpoints(saver, keep_last=2, ttl=None)
+
+        assert report.checkpoints_deleted == 6
+        assert report.writes_deleted == 6
+        assert report.threads_deleted == 0
+        assert await count(saver, "checkpoints") == 4
+        assert await count(saver, "writes") == 4
+        assert (await saver.aget_tuple(latest)).pending_writes
+
+
+@pytest.mark.asyncio
+async def test_deletes_idle_threads(tmp_path) -> None:
+    async with AsyncSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db")) as saver:
+        now = time.time()
+        await put(saver, "idle", checkpoint_id_at(now - 7200))
+        await put(saver, "idle", checkpoint_id_at(now - 7100))
+        await put(saver, "active", checkpoint_id_at(now - 7200))
+        await put(saver, "active")
+
+        report = await compact_checkpoints(saver, keep_last=None, ttl=3600)
+
+        assert report.threads_deleted == 1
+        assert report.checkpoints_deleted == 2
+        assert await saver.aget_tuple({"configurable": {"thread_id": "idle"}}) is None
+        assert await count(saver, "checkpoints") == 2
+
+
+@pytest.mark.asyncio
+async def test_vacuum_reclaims_space(tmp_path) -> None:
+    async with AsyncSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db")) as saver:
+        for _ in range(10):
+            await put(saver, "thread", size=100_000)
+
+        report = await compact_checkpoints(saver, keep_last=1, ttl=None)
+        assert report.bytes_reclaimed > 1_000_000
+
+        # Nothing left to delete or vacuum
+        report = await compact_checkpoints(saver, keep_last=1, ttl=None)
+        assert report.checkpoints_deleted == 0
+        assert report.bytes_reclaimed == 0
+
+
+@pytest.mark.asyncio
+async def test_unsupported_saver() -> None:
+    with pytest.raises(TypeError):
+        await compact_checkpoints(MemorySaver())
+
+
+@pytest.mark.asyncio
+async def test_compact_periodically_survives_failures() -> None:
+    compact = AsyncMock(side_effect=[RuntimeError("database is locked"), None, None])
+    with patch("memory.compaction.compact_checkpoints", compact):
+        task = asyncio.create_task(compact_periodically(MemorySaver(), interval=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+    assert compact.await_count >= 2
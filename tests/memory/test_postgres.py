@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from memory.postgres import MonitoredConnectionPool, PooledPostgresSaver, create_postgres_pool
+
+
+def test_create_postgres_pool_uses_settings() -> None:
+    with patch("memory.postgres.settings") as mock_settings:
+        mock_settings.POSTGRES_USER = "user"
+        mock_settings.POSTGRES_PASSWORD.get_secret_value.return_value = "secret"
+        mock_settings.POSTGRES_HOST = "db"
+        mock_settings.POSTGRES_PORT = 5432
+        mock_settings.POSTGRES_DB = "agents"
+        mock_settings.POSTGRES_MIN_SIZE = 2
+        mock_settings.POSTGRES_POOL_SIZE = 8
+        mock_settings.POSTGRES_MAX_IDLE = 60
+        mock_settings.POSTGRES_POOL_TIMEOUT = 3
+        pool = create_postgres_pool()
+
+    assert pool.conninfo == "postgresql://user:secret@db:5432/agents"
+    assert (pool.min_size, pool.max_size) == (2, 8)
+    assert pool.max_idle == 60
+    assert pool.timeout == 3
+    assert pool.kwargs["autocommit"] is True
+
+
+@pytest.mark.asyncio
+async def test_monitored_pool_records_acquisition_latency() -> None:
+    pool = MonitoredConnectionPool("postgresql://test", open=False)
+
+    async def slow_getconn(self, timeout=None):
+        await asyncio.sleep(0.01)
+        return "conn"
+
+    with patch.object(AsyncConnectionPool, "getconn", slow_getconn):
+        assert await pool.getconn() == "conn"
+        assert await pool.getconn() == "conn"
+
+    stats = pool.stats()
+    assert stats["acquisitions"] == 2
+    assert stats["acquire_seconds_max"] >= 0.01
+    assert stats["acquire_seconds_avg"] >= 0.01
+    assert "pool_size" in stats
+
+
+@pytest.mark.asyncio
+async def test_monitored_pool_health_check() -> None:
+    pool = MonitoredConnectionPool("postgresql://test", open=False)
+    conn = AsyncMock()
+
+    @asynccontextmanager
+    async def connection(timeout=None):
+        yield conn
+
+    with patch.object(pool, "connection", connection):
+        assert await pool.check_health() is True
+    conn.execute.assert_awaited_once_with("SELECT 1")
+
+    with patch.object(pool, "connection", MagicMock(side_effect=PoolTimeout("no connection"))):
+        assert await pool.check_health() is False
+
+
+@pytest.mark.asyncio
+async def test_pooled_saver_runs_queries_concurrently() -> None:
+    """Queries hold separate pooled connections at once instead of waiting on one lock."""
+    pool = MonitoredConnectionPool("postgresql://test", open=False)
+    saver = PooledPostgresSaver(pool)
+    active = 0
+    max_active = 0
+
+    @asynccontextmanager
+    async def cursor(**kwargs):
+        yield MagicMock()
+
+    @asynccontextmanager
+    async def connection(timeout=None):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        try:
+            yield MagicMock(cursor=cursor)
+        finally:
+            active -= 1
+
+    async def query() -> None:
+        async with saver._cursor():
+            await asyncio.sleep(0.01)
+
+    with patch.object(pool, "connection", connection):
+        await asyncio.gather(*(query() for _ in range(4)))
+    assert max_active == 4
+
+
+def test_pooled_saver_overrides_upstream_cursor() -> None:
+    """PooledPostgresSaver replaces the private upstream `_cursor`; fail loudly if it changes."""
+    upstream = inspect.signature(AsyncPostgresSaver._cursor)
+    assert list(upstream.parameters) == ["self", "pipeline"]
+    assert upstream.parameters["pipeline"].kind is inspect.Parameter.KEYWORD_ONLY
+    assert upstream.parameters["pipeline"].default is False
+    # The lock PooledPostgresSaver drops, and the pipeline fallback it reproduces
+    source = inspect.getsource(AsyncPostgresSaver._cursor)
+    assert "self.lock" in source
+    assert "self.supports_pipeline" in source
+    assert "conn.transaction()" in source
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from memory.sqlite import TunedSqliteSaver, get_sqlite_saver
+
+
+async def put(saver: AsyncSqliteSaver, thread_id: str) -> dict:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    metadata = {"source": "loop", "step": 0, "writes": {}, "parents": {}}
+    return await saver.aput(config, empty_checkpoint(), metadata, {})
+
+
+async def pragma(conn, name: str):
+    async with conn.execute(f"PRAGMA {name}") as cur:
+        (value,) = await cur.fetchone()
+    return value
+
+
+@pytest.mark.asyncio
+async def test_tuned_connections(tmp_path) -> None:
+    async with TunedSqliteSaver.from_conn_string(str(tmp_path / "db"), readers=2) as saver:
+        assert await pragma(saver.conn, "journal_mode") == "wal"
+        assert await pragma(saver.conn, "synchronous") == 1  # NORMAL
+        assert saver.readers.qsize() == 2
+        reader = saver.readers.get_nowait()
+        assert await pragma(reader.conn, "query_only") == 1
+        assert await pragma(reader.conn, "synchronous") == 1
+
+
+@pytest.mark.asyncio
+async def test_readers_see_checkpoints_and_pending_writes(tmp_path) -> None:
+    async with TunedSqliteSaver.from_conn_string(str(tmp_path / "db"), readers=2) as saver:
+        await saver.setup()
+        config = await put(saver, "thread")
+        await saver.aput_writes(config, [("messages", "pending")], task_id="task")
+
+        checkpoint = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        assert checkpoint.config == config
+        assert checkpoint.pending_writes == [("task", "messages", "pending")]
+        assert len([c async for c in saver.alist({"configurable": {"thread_id": "thread"}})]) == 1
+        assert saver.readers.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_reads_run_while_writer_is_busy(tmp_path) -> None:
+    async with TunedSqliteSaver.from_conn_string(str(tmp_path / "db"), readers=1) as saver:
+        await saver.setup()
+        await put(saver, "thread")
+        async with saver.lock:
+            # The upstream saver would wait for the lock held by a write
+            read = saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+            assert await asyncio.wait_for(read, timeout=5) is not None
+
+
+@pytest.mark.asyncio
+async def test_in_memory_database_has_no_readers() -> None:
+    async with TunedSqliteSaver.from_conn_string(":memory:") as saver:
+        await put(saver, "thread")
+        assert saver.reader_count == 0
+        assert await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+
+@pytest.mark.asyncio
+async def test_get_sqlite_saver_tuned(tmp_path) -> None:
+    with patch("memory.sqlite.settings") as mock_settings:
+        mock_settings.SQLITE_DB_PATH = str(tmp_path / "db")
+        mock_settings.SQLITE_TUNED = True
+        mock_settings.SQLITE_READERS = 1
+        mock_settings.SQLITE_BUSY_TIMEOUT = 5
+        mock_settings.SQLITE_MMAP_SIZE = 0
+        async with get_sqlite_saver() as saver:
+            assert isinstance(saver, TunedSqliteSaver)
+            assert saver.reader_count == 1
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
@@ -18,7 +19,6 @@ def mock_agent():
     """Fixture to create a mock agent that can be configured for different test scenarios."""
     agent_mock = AsyncMock()
     agent_mock.ainvoke = AsyncMock(return_value={"messages": [AIMessage(content="Test response")]})
-    agent_mock.get_state = Mock()  # Default empty mock for get_state
     with patch("service.service.get_agent", Mock(return_value=agent_mock)):
         yield agent_mock
 
@@ -32,7 +32,7 @@ def mock_settings(mock_env):
 
 @pytest.fixture
 def mock_httpx():
-    """Patch httpx.stream and httpx.get to use our test client."""
+    """Route the HTTP client of AgentClient to our test client."""
 
     with TestClient(app) as client:
 
@@ -46,6 +46,6 @@ def mock_httpx():
             path = url.replace("http://0.0.0.0", "")
             return client.get(path, **kwargs)
 
-        with patch("httpx.stream", mock_stream):
-            with patch("httpx.get", mock_get):
-                yield
+        http_client = SimpleNamespace(stream=mock_stream, get=mock_get)
+        with patch("client.client.AgentClient.client", property(lambda self: http_client)):
+            yield
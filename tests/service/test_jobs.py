@@ -0,0 +1,182 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from schemas import ChatMessage, JobInfo
+from service import app
+from service.jobs import InMemoryJobStore, JobManager, JobQueueFullError, SqliteJobStore
+
+
+async def wait_done(manager: JobManager, job_id: str) -> JobInfo:
+    for _ in range(100):
+        job = await manager.get(job_id)
+        if job.done:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def answer(content: str, delay: float = 0.0):
+    async def run() -> ChatMessage:
+        await asyncio.sleep(delay)
+        return ChatMessage(type="ai", content=content)
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_job_lifecycle():
+    manager = JobManager(store=InMemoryJobStore(), max_workers=1, max_pending=1)
+    await manager.start()
+    try:
+        first = await manager.submit("chatbot", answer("first", delay=0.05))
+        second = await manager.submit("chatbot", answer("second"))
+        assert first.status == "queued"
+        with pytest.raises(JobQueueFullError):
+            await manager.submit("chatbot", answer("third"))
+        assert manager.stats()["rejected"] == 1
+
+        await asyncio.sleep(0.01)
+        assert (await manager.get(first.job_id)).status == "running"
+        assert (await manager.get(second.job_id)).status == "queued"
+
+        first = await wait_done(manager, first.job_id)
+        assert first.status == "succeeded"
+        assert first.output.content == "first"
+        assert first.started_at >= first.created_at
+        assert (await wait_done(manager, second.job_id)).output.content == "second"
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_failure_and_cancel():
+    manager = JobManager(store=InMemoryJobStore(), max_workers=1)
+
+    async def fail() -> ChatMessage:
+        raise ValueError("boom")
+
+    failed = await wait_done(manager, (await manager.submit("chatbot", fail)).job_id)
+    assert failed.status == "failed"
+    assert failed.error == "boom"
+
+    running = await manager.submit("chatbot", answer("slow", delay=10))
+    queued = await manager.submit("chatbot", answer("never"))
+    await asyncio.sleep(0.01)
+    assert (await manager.cancel(queued.job_id)).status == "cancelled"
+    assert (await manager.cancel(running.job_id)).status == "cancelled"
+    assert await manager.cancel("unknown") is None
+    assert manager.stats()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.db"))
+    now = time.time()
+    old = JobInfo(job_id="old", agent_id="chatbot", status="succeeded", created_at=now - 100)
+    old.finished_at = now - 50
+    old.output = ChatMessage(type="ai", content="done")
+    running = JobInfo(job_id="running", agent_id="chatbot", status="running", created_at=now)
+    for job in (old, running):
+        await store.save(job)
+
+    assert (await store.get("old")).output.content == "done"
+    assert await store.get("missing") is None
+
+    # A restarted service fails the jobs it can no longer finish, then expires old results
+    reopened = SqliteJobStore(str(tmp_path / "jobs.db"))
+    assert await reopened.fail_orphaned("restarted", now - 10) == 1
+    assert (await reopened.get("running")).status == "failed"
+    assert await reopened.delete_finished_before(now - 10) == 1
+    assert await reopened.get("old") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_shared_by_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first, second = SqliteJobStore(path, owner="first"), SqliteJobStore(path, owner="second")
+    now = time.time()
+    for store in (first, second):
+        await store.save(
+            JobInfo(job_id=store.owner, agent_id="chatbot", status="running", created_at=now)
+        )
+        await store.heartbeat()
+
+    # A worker starting next to live ones leaves their jobs alone
+    third = SqliteJobStore(path, owner="third")
+    assert await third.fail_orphaned("gone", now - 10) == 0
+    assert (await third.get("first")).status == "running"
+
+    # Once a worker stops heartbeating, the others fail its jobs but never their own
+    assert await second.fail_orphaned("gone", time.time() + 1) == 1
+    assert (await second.get("first")).status == "failed"
+    assert (await second.get("second")).status == "running"
+
+
+@pytest.mark.asyncio
+async def test_cancel_leaves_jobs_of_other_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    other = SqliteJobStore(path, owner="other")
+    job = JobInfo(job_id="remote", agent_id="chatbot", status="running", created_at=time.time())
+    await other.save(job)
+    await other.heartbeat()
+
+    manager = JobManager(store=SqliteJobStore(path))
+    await manager.start()
+    try:
+        assert (await manager.cancel("remote")).status == "running"
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_concurrent_access(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.db"))
+    now = time.time()
+    jobs = [
+        JobInfo(job_id=str(i), agent_id="chatbot", status="succeeded", created_at=now)
+        for i in range(50)
+    ]
+
+    async def save_and_get(job: JobInfo) -> JobInfo | None:
+        await store.save(job)
+        await store.delete_finished_before(now)
+        return await store.get(job.job_id)
+
+    found = await asyncio.gather(*(save_and_get(job) for job in jobs))
+    assert [job.job_id for job in found] == [job.job_id for job in jobs]
+
+
+def test_job_endpoints(mock_agent) -> None:
+    async def slow_ainvoke(**kwargs):
+        await asyncio.sleep(0.05)
+        return {"messages": [AIMessage(content="Job done")]}
+
+    mock_agent.ainvoke = slow_ainvoke
+    manager = JobManager(store=InMemoryJobStore(), max_workers=1, max_pending=0)
+    with patch("service.service.job_manager", manager), TestClient(app) as client:
+        response = client.post("/chatbot/jobs", json={"message": "Hi"})
+        assert response.status_code == 202
+        job = JobInfo.model_validate(response.json())
+        assert job.agent_id == "chatbot"
+
+        busy = client.post("/jobs", json={"message": "Hi"})
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"]
+
+        for _ in range(100):
+            job = JobInfo.model_validate(client.get(f"/jobs/{job.job_id}").json())
+            if job.done:
+                break
+            time.sleep(0.01)
+        assert job.status == "succeeded"
+        assert job.output.content == "Job done"
+        assert job.output.run_id
+
+        assert client.delete(f"/jobs/{job.job_id}").json()["status"] == "succeeded"
+        assert client.get("/jobs/unknown").status_code == 404
+        assert client.delete("/jobs/unknown").status_code == 404
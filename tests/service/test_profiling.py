@@ -0,0 +1,94 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from langchain_community.chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from service.profiling import FlameProfile, ProfilingHandler, flame_profile
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look up a query."""
+    return f"Result for {query}"
+
+
+def build_graph():
+    model = FakeListChatModel(responses=["The answer"])
+
+    def call_model(state: MessagesState) -> dict:
+        return {"messages": [model.invoke(state["messages"])]}
+
+    def call_tools(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content=lookup.invoke({"query": "x"}))]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", call_tools)
+    graph.add_node("model", call_model)
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", "model")
+    graph.add_edge("model", END)
+    return graph.compile()
+
+
+def test_breakdown_and_flame_profile() -> None:
+    flame = FlameProfile()
+    profiler = ProfilingHandler("test-agent", flame=flame)
+    build_graph().invoke({"messages": [("user", "Hi")]}, config={"callbacks": [profiler]})
+
+    breakdown = profiler.breakdown()
+    assert [node["node"] for node in breakdown["nodes"]] == ["tools", "model"]
+    assert [(call["kind"], call["name"], call["node"]) for call in breakdown["calls"]] == [
+        ("tool", "lookup", "tools"),
+        ("llm", "FakeListChatModel", "model"),
+    ]
+    assert breakdown["total_ms"] >= sum(node["ms"] for node in breakdown["nodes"])
+
+    stacks = [line.rsplit(" ", 1)[0] for line in flame.folded().splitlines()]
+    assert sorted(stacks) == [
+        "test-agent",
+        "test-agent;model",
+        "test-agent;model;llm:FakeListChatModel",
+        "test-agent;tools",
+        "test-agent;tools;tool:lookup",
+    ]
+    flame.reset()
+    assert flame.folded() == ""
+
+
+@pytest.fixture
+def real_agent():
+    with patch("service.service.get_agent", return_value=build_graph()):
+        yield
+
+
+def test_invoke_returns_timing(test_client, real_agent) -> None:
+    response = test_client.post("/invoke", json={"message": "Hi", "profile": True})
+    timing = response.json()["response_metadata"]["timing"]
+    assert [node["node"] for node in timing["nodes"]] == ["tools", "model"]
+
+    response = test_client.post("/invoke", json={"message": "Hi"})
+    assert "timing" not in response.json()["response_metadata"]
+
+
+def test_stream_sends_timing_event(test_client, real_agent) -> None:
+    response = test_client.post("/stream", json={"message": "Hi", "profile": True})
+    events = [
+        json.loads(line[6:])
+        for line in response.text.splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+    assert events[-1]["type"] == "timing"
+    assert [node["node"] for node in events[-1]["content"]["nodes"]] == ["tools", "model"]
+
+
+def test_profile_endpoint(test_client, real_agent) -> None:
+    flame_profile.reset()
+    test_client.post("/test-agent/invoke", json={"message": "Hi", "profile": True})
+    response = test_client.get("/profile", params={"reset": True})
+    assert response.status_code == 200
+    assert "test-agent;model;llm:FakeListChatModel " in response.text
+    assert test_client.get("/profile").text == ""
@@ -0,0 +1,115 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from schemas import ChatMessage, UserInput
+from service.response_cache import ResponseCache, split_tokens
+
+ANSWER = "A Resolução 765 aprova o Regulamento Geral de Interconexão."
+
+
+def fake_embeddings(vectors: dict[str, list[float]]) -> AsyncMock:
+    embeddings = AsyncMock()
+    embeddings.aembed_query.side_effect = lambda text: vectors[text]
+    return embeddings
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_is_normalized_and_scoped():
+    cache = ResponseCache(enabled=True, ttl=60, max_entries=10, similarity_threshold=None)
+    key = cache.key("resolutions-agent", UserInput(message="O que é a  Resolução 765?"))
+    await cache.aput(key, ChatMessage(type="ai", content=ANSWER, run_id="run"))
+
+    same = cache.key("resolutions-agent", UserInput(message="o que é a resolução 765? "))
+    cached = await cache.aget(same)
+    assert cached.content == ANSWER
+    assert cached.run_id is None
+
+    other_agent = cache.key("chatbot", UserInput(message="O que é a Resolução 765?"))
+    assert await cache.aget(other_agent) is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_threads_and_disabled_cache_are_not_cached():
+    assert ResponseCache(enabled=False).key("chatbot", UserInput(message="hi")) is None
+    cache = ResponseCache(enabled=True)
+    assert cache.key("chatbot", UserInput(message="hi", thread_id="thread")) is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit():
+    embeddings = fake_embeddings(
+        {
+            "resolução 765": [1.0, 0.0],
+            "resolução nº 765": [0.99, 0.05],
+            "previsão do tempo": [0.0, 1.0],
+        }
+    )
+    cache = ResponseCache(enabled=True, similarity_threshold=0.95, embeddings=embeddings)
+    await cache.aput(
+        cache.key("chatbot", UserInput(message="Resolução 765")),
+        ChatMessage(type="ai", content=ANSWER),
+    )
+
+    hit = await cache.aget(cache.key("chatbot", UserInput(message="Resolução nº 765")))
+    assert hit.content == ANSWER
+    assert await cache.aget(cache.key("chatbot", UserInput(message="Previsão do tempo"))) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_size_eviction():
+    cache = ResponseCache(enabled=True, ttl=60, max_entries=2, similarity_threshold=None)
+    keys = [cache.key("chatbot", UserInput(message=str(i))) for i in range(3)]
+    for key in keys:
+        await cache.aput(key, ChatMessage(type="ai", content=key.prompt))
+    assert await cache.aget(keys[0]) is None
+    assert await cache.aget(keys[2]) is not None
+
+    with patch("service.response_cache.time.monotonic", return_value=1e12):
+        assert await cache.aget(keys[2]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_split_tokens():
+    assert split_tokens("Hello  big world") == ["Hello  ", "big ", "world"]
+    assert "".join(split_tokens(ANSWER)) == ANSWER
+
+
+@pytest.fixture
+def enabled_cache():
+    cache = ResponseCache(enabled=True, similarity_threshold=None)
+    with patch("service.service.response_cache", cache):
+        yield cache
+
+
+def test_invoke_uses_cache(test_client, mock_agent, enabled_cache) -> None:
+    mock_agent.ainvoke.return_value = {"messages": [AIMessage(content=ANSWER)]}
+
+    for _ in range(2):
+        response = test_client.post("/invoke", json={"message": "Resolução 765"})
+        assert response.status_code == 200
+        assert response.json()["content"] == ANSWER
+
+    mock_agent.ainvoke.assert_awaited_once()
+    assert enabled_cache.stats()["exact_hits"] == 1
+
+
+def test_stream_replays_cached_tokens(test_client, mock_agent, enabled_cache) -> None:
+    mock_agent.ainvoke.return_value = {"messages": [AIMessage(content=ANSWER)]}
+    test_client.post("/invoke", json={"message": "Resolução 765"})
+
+    with test_client.stream("POST", "/stream", json={"message": "Resolução 765"}) as response:
+        events = [
+            json.loads(line.removeprefix("data: "))
+            for line in response.iter_lines()
+            if line and line.strip() != "data: [DONE]"
+        ]
+
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    assert "".join(tokens) == ANSWER
+    assert events[-1]["type"] == "message"
+    assert events[-1]["content"]["content"] == ANSWER
@@ -1,6 +1,8 @@
+import asyncio
 import json
+from functools import partial
 from types import SimpleNamespace
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import langsmith
 import pytest
@@ -8,8 +10,11 @@ from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.pregel.types import StateSnapshot
 
 from agents.agents import Agent
+from agents.safety import AWAITING_SAFETY_TAG, SAFETY_CLEARED_EVENT
 from schemas import ChatHistory, ChatMessage, ServiceMetadata
 from schemas.models import OpenAIModelName
+from service.service import preload_agents
+from service.sse import TokenCoalescer
 
 
 def test_invoke(test_client, mock_agent) -> None:
@@ -142,13 +147,9 @@ def test_feedback(mock_client: langsmith.Client, test_client) -> None:
     )
 
 
-def test_history(test_client, mock_agent) -> None:
-    QUESTION = "What is the weather in Tokyo?"
-    ANSWER = "The weather in Tokyo is 70 degrees."
-    user_question = HumanMessage(content=QUESTION)
-    agent_response = AIMessage(content=ANSWER)
-    mock_agent.get_state.return_value = StateSnapshot(
-        values={"messages": [user_question, agent_response]},
+def state_snapshot(messages) -> StateSnapshot:
+    return StateSnapshot(
+        values={"messages": messages},
         next=(),
         config={},
         metadata=None,
@@ -157,6 +158,14 @@ def test_history(test_client, mock_agent) -> None:
         tasks=(),
     )
 
+
+def test_history(test_client, mock_agent) -> None:
+    QUESTION = "What is the weather in Tokyo?"
+    ANSWER = "The weather in Tokyo is 70 degrees."
+    user_question = HumanMessage(content=QUESTION)
+    agent_response = AIMessage(content=ANSWER)
+    mock_agent.aget_state.return_value = state_snapshot([user_question, agent_response])
+
     response = test_client.post(
         "/history", json={"thread_id": "7bcc7cc1-99d7-4b1d-bdb5-e6f90ed44de6"}
     )
@@ -167,6 +176,49 @@ def test_history(test_client, mock_agent) -> None:
     assert output.messages[0].content == QUESTION
     assert output.messages[1].type == "ai"
     assert output.messages[1].content == ANSWER
+    assert output.next_cursor is None
+
+    config = mock_agent.aget_state.await_args.kwargs["config"]
+    assert config["configurable"]["thread_id"] == "7bcc7cc1-99d7-4b1d-bdb5-e6f90ed44de6"
+
+
+def test_history_pagination(test_client, mock_agent) -> None:
+    """Pages are read newest first by passing next_cursor back as before."""
+    messages = [
+        HumanMessage(content=str(i)) if i % 2 == 0 else AIMessage(content=str(i)) for i in range(5)
+    ]
+    mock_agent.aget_state.return_value = state_snapshot(messages)
+
+    pages = []
+    before = None
+    while True:
+        body = {"thread_id": "thread", "limit": 2, "before": before}
+        output = ChatHistory.model_validate(test_client.post("/history", json=body).json())
+        pages.append([m.content for m in output.messages])
+        if (before := output.next_cursor) is None:
+            break
+    assert pages == [["3", "4"], ["1", "2"], ["0"]]
+
+    response = test_client.post("/history", json={"thread_id": "thread", "limit": 0})
+    assert response.status_code == 422
+
+
+def test_history_stream(test_client, mock_agent) -> None:
+    """The history of a given agent can be streamed as NDJSON."""
+    messages = [HumanMessage(content="Hi"), AIMessage(content="Hello"), AIMessage(content="!")]
+    mock_agent.aget_state.return_value = state_snapshot(messages)
+
+    with patch("service.service.get_agent", return_value=mock_agent) as get_agent:
+        response = test_client.post(
+            "/custom-agent/history",
+            json={"thread_id": "thread", "limit": 2, "stream": True},
+        )
+    get_agent.assert_called_once_with("custom-agent")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["x-next-cursor"] == "1"
+    lines = response.text.splitlines()
+    assert [ChatMessage.model_validate_json(line).content for line in lines] == ["Hello", "!"]
 
 
 @pytest.mark.asyncio
@@ -274,6 +326,22 @@ async def test_stream_no_tokens(test_client, mock_agent) -> None:
         assert final_messages[0]["content"]["type"] == "ai"
 
 
+def test_preload_agents() -> None:
+    graph = Mock()
+    loaded = Agent(description="Loads.", factory="tests.fake:graph")
+    broken = Agent(description="Fails to load.", factory="not_a_module:graph")
+    with (
+        patch.dict("agents.agents.agents", {"loaded": loaded, "broken": broken}, clear=True),
+        patch(
+            "agents.agents.import_module", side_effect=[SimpleNamespace(graph=graph), ImportError]
+        ),
+    ):
+        # A failing agent doesn't stop the others, or startup
+        asyncio.run(preload_agents())
+    assert loaded.graph is graph
+    assert broken.graph is None
+
+
 def test_info(test_client, mock_settings) -> None:
     """Test that /info returns the correct service metadata."""
 
@@ -343,4 +411,156 @@ async def test_stream_with_commands(test_client, mock_agent) -> None:
     else:
         assert second_message == "Hello C"
     assert final_messages[0]["content"]["type"] == "ai"
-    assert final_messages[1]["content"]["type"] == "ai"
\ No newline at end of file
+    assert final_messages[1]["content"]["type"] == "ai"
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_tokens_until_input_is_cleared(test_client, mock_agent) -> None:
+    """Tokens generated while the input is being checked are only sent once it is safe."""
+
+    def token(content, tags):
+        return {
+            "event": "on_chat_model_stream",
+            "data": {"chunk": SimpleNamespace(content=content)},
+            "tags": tags,
+        }
+
+    node_end = {
+        "event": "on_chain_end",
+        "data": {"output": {"messages": [AIMessage(content="Flagged.")]}},
+        "tags": ["graph:step:1"],
+    }
+    cleared = {"event": "on_custom_event", "name": SAFETY_CLEARED_EVENT, "data": {}, "tags": []}
+
+    def stream_tokens(events):
+        async def mock_astream_events(**kwargs):
+            for event in events:
+                yield event
+
+        mock_agent.astream_events = mock_astream_events
+        with test_client.stream("POST", "/stream", json={"message": "Hi"}) as response:
+            messages = [
+                json.loads(line.lstrip("data: "))
+                for line in response.iter_lines()
+                if line and line.strip() != "data: [DONE]"
+            ]
+        return [msg["content"] for msg in messages if msg["type"] == "token"]
+
+    held = [token("Hel", [AWAITING_SAFETY_TAG]), token("lo", [AWAITING_SAFETY_TAG])]
+    assert stream_tokens([*held, cleared, token("!", [AWAITING_SAFETY_TAG])]) == ["Hel", "lo", "!"]
+    assert stream_tokens([*held, node_end]) == []
+
+
+@pytest.mark.parametrize("stream_tokens", [True, False])
+def test_stream_filters_events(test_client, mock_agent, stream_tokens) -> None:
+    """Events the stream never uses are filtered out by astream_events itself."""
+    calls = []
+
+    async def mock_astream_events(**kwargs):
+        calls.append(kwargs)
+        yield {
+            "event": "on_chain_end",
+            "data": {"output": {"messages": [AIMessage(content="Hi!")]}},
+            "tags": ["graph:step:1"],
+        }
+
+    mock_agent.astream_events = mock_astream_events
+    response = test_client.post("/stream", json={"message": "Hi", "stream_tokens": stream_tokens})
+    assert response.status_code == 200
+
+    assert len(calls) == 1
+    assert calls[0]["version"] == "v2"
+    assert "tool" in calls[0]["exclude_types"]
+    assert ("chat_model" in calls[0]["exclude_types"]) is not stream_tokens
+    assert {"llama_guard", "context_summary", "langsmith:hidden"} <= set(calls[0]["exclude_tags"])
+
+
+def test_stream_coalesces_tokens(test_client, mock_agent) -> None:
+    """With coalescing enabled, tokens are joined and flushed before each message."""
+    TOKENS = ["The", " weather", " in", " Tokyo", " is", " sunny", "."]
+    events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": SimpleNamespace(content=token)}}
+        for token in TOKENS
+    ] + [
+        {
+            "event": "on_chain_end",
+            "data": {"output": {"messages": [AIMessage(content="".join(TOKENS))]}},
+            "tags": ["graph:step:1"],
+        }
+    ]
+
+    async def mock_astream_events(**kwargs):
+        for event in events:
+            yield event
+
+    mock_agent.astream_events = mock_astream_events
+    coalescer = partial(TokenCoalescer, flush_interval=60, max_chars=10)
+    with (
+        patch("service.service.TokenCoalescer", coalescer),
+        test_client.stream("POST", "/stream", json={"message": "Weather?"}) as response,
+    ):
+        messages = [
+            json.loads(line.lstrip("data: "))
+            for line in response.iter_lines()
+            if line and line.strip() != "data: [DONE]"
+        ]
+
+    assert [(msg["type"], msg["content"]) for msg in messages[:-1]] == [
+        ("token", "The weather"),
+        ("token", " in Tokyo is"),
+        ("token", " sunny."),
+    ]
+    assert messages[-1]["type"] == "message"
+
+
+def test_batch(test_client, mock_agent) -> None:
+    """Test that batch inputs run concurrently and stream back in completion order."""
+    running = 0
+    max_running = 0
+
+    async def mock_ainvoke(input, config):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        message = input["messages"][0].content
+        # Later inputs finish first
+        await asyncio.sleep(0.01 * (5 - int(message)))
+        running -= 1
+        if message == "3":
+            raise ValueError("boom")
+        return {"messages": [AIMessage(content=f"answer {message}")]}
+
+    mock_agent.ainvoke = mock_ainvoke
+    inputs = [{"message": str(i)} for i in range(5)]
+    with patch("service.service.settings.BATCH_MAX_CONCURRENCY", 5):
+        response = test_client.post("/batch", json={"inputs": inputs, "max_concurrency": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4]
+    assert results[0]["index"] == 1
+    by_index = {r["index"]: r for r in results}
+    assert by_index[3] == {"index": 3, "output": None, "error": "Unexpected error"}
+    assert by_index[4]["output"]["content"] == "answer 4"
+    assert max_running == 2
+
+
+def test_batch_limits(test_client, mock_agent) -> None:
+    with patch("service.service.settings.BATCH_MAX_SIZE", 2):
+        response = test_client.post("/batch", json={"inputs": [{"message": "hi"}] * 3})
+    assert response.status_code == 422
+    assert test_client.post("/batch", json={"inputs": []}).status_code == 422
+
+
+def test_health(test_client) -> None:
+    """Health checks fail while the checkpointer's database is unavailable."""
+    with patch("service.service.check_database", AsyncMock(return_value=True)):
+        response = test_client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+    with patch("service.service.check_database", AsyncMock(return_value=False)):
+        response = test_client.get("/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "error"
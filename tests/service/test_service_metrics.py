@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from service import app
+from service.metrics import (
+    NODE_DURATION,
+    REQUEST_DURATION,
+    TIME_TO_FIRST_TOKEN,
+    TOKENS_PER_SECOND,
+    NodeMetricsHandler,
+)
+
+
+def test_metrics_endpoint(test_client, mock_agent) -> None:
+    labels = {"method": "POST", "route": "/{agent_id}/invoke", "agent": "chatbot", "status": "200"}
+    before = REQUEST_DURATION.count(**labels)
+    assert test_client.post("/chatbot/invoke", json={"message": "Hi"}).status_code == 200
+    assert REQUEST_DURATION.count(**labels) == before + 1
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE agent_service_http_request_duration_seconds histogram" in response.text
+    assert 'route="/{agent_id}/invoke",agent="chatbot",status="200"' in response.text
+    assert "agent_service_jobs_running 0" in response.text
+
+
+def test_default_agent_label(test_client, mock_agent) -> None:
+    test_client.post("/invoke?agent_id=research-assistant", json={"message": "Hi"})
+    assert REQUEST_DURATION.count(
+        method="POST", route="/invoke", agent="research-assistant", status="200"
+    )
+    test_client.get("/not-a-route")
+    assert REQUEST_DURATION.count(method="GET", route="unmatched", agent="", status="404")
+
+
+def test_unknown_agent_label() -> None:
+    labels = {"method": "POST", "route": "/{agent_id}/invoke", "status": "500"}
+    before = REQUEST_DURATION.count(**labels, agent="unknown")
+    TestClient(app, raise_server_exceptions=False).post(
+        "/not-an-agent/invoke", json={"message": "Hi"}
+    )
+    assert REQUEST_DURATION.count(**labels, agent="unknown") == before + 1
+    assert REQUEST_DURATION.count(**labels, agent="not-an-agent") == 0
+
+
+def test_node_durations() -> None:
+    graph = StateGraph(MessagesState)
+    graph.add_node("model", lambda state: {"messages": [AIMessage(content="Hi")]})
+    graph.add_edge(START, "model")
+    graph.add_edge("model", END)
+
+    before = NODE_DURATION.count(agent="test-agent", node="model")
+    graph.compile().invoke(
+        {"messages": []}, config={"callbacks": [NodeMetricsHandler("test-agent")]}
+    )
+    assert NODE_DURATION.count(agent="test-agent", node="model") == before + 1
+    assert NODE_DURATION.count(agent="test-agent", node="__start__") == 0
+
+
+def test_stream_token_metrics(test_client, mock_agent) -> None:
+    events = [
+        {"event": "on_chat_model_stream", "data": {"chunk": SimpleNamespace(content=token)}}
+        for token in ["Hello", " world", "!"]
+    ]
+
+    async def mock_astream_events(**kwargs):
+        for event in events:
+            yield event
+
+    mock_agent.astream_events = mock_astream_events
+    first_token_before = TIME_TO_FIRST_TOKEN.count(agent="chatbot")
+    rate_before = TOKENS_PER_SECOND.count(agent="chatbot")
+    response = test_client.post("/chatbot/stream", json={"message": "Hi", "stream_tokens": True})
+    assert response.status_code == 200
+    assert TIME_TO_FIRST_TOKEN.count(agent="chatbot") == first_token_before + 1
+    assert TOKENS_PER_SECOND.count(agent="chatbot") == rate_before + 1
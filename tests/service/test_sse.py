@@ -0,0 +1,48 @@
+import json
+from unittest.mock import patch
+
+from schemas import ChatMessage
+from service.sse import DONE_EVENT, TokenCoalescer, encode_error, encode_message, encode_token
+
+
+def parse(event: bytes) -> dict:
+    assert event.startswith(b"data: ") and event.endswith(b"\n\n")
+    return json.loads(event[len(b"data: ") : -2])
+
+
+def test_encode_events() -> None:
+    assert parse(encode_token('He said "hi" ✓')) == {
+        "type": "token",
+        "content": 'He said "hi" ✓',
+    }
+    assert parse(encode_error("Unexpected error")) == {
+        "type": "error",
+        "content": "Unexpected error",
+    }
+    message = ChatMessage(type="ai", content="Hello", run_id="123")
+    assert parse(encode_message(message)) == {"type": "message", "content": message.model_dump()}
+    assert DONE_EVENT == b"data: [DONE]\n\n"
+
+
+def test_coalescer_disabled_sends_every_token() -> None:
+    coalescer = TokenCoalescer(flush_interval=0, max_chars=64)
+    assert parse(coalescer.add("a"))["content"] == "a"
+    assert parse(coalescer.add("b"))["content"] == "b"
+    assert coalescer.flush() is None
+
+
+def test_coalescer_joins_tokens_up_to_max_chars() -> None:
+    coalescer = TokenCoalescer(flush_interval=60, max_chars=5)
+    assert coalescer.add("ab") is None
+    assert coalescer.add("cd") is None
+    assert parse(coalescer.add("ef"))["content"] == "abcdef"
+    assert coalescer.add("g") is None
+    assert parse(coalescer.flush())["content"] == "g"
+    assert coalescer.flush() is None
+
+
+def test_coalescer_flushes_after_interval() -> None:
+    coalescer = TokenCoalescer(flush_interval=0.05, max_chars=1000)
+    with patch("service.sse.time.monotonic", side_effect=[10.0, 10.01, 10.06]):
+        assert coalescer.add("a") is None
+        assert parse(coalescer.add("b"))["content"] == "ab"